@@ -42,7 +42,9 @@ def analyze_docx_structure(docx_file):
     print("\n📝 Paragraph Analysis:")
     print("-" * 60)
     
-    speaker_pattern = re.compile(r'^(.+?)\s{2,}(\d+:\d+)')
+    # 話者ヘッダー: 最初の「2文字以上の空白 + mm:ss / h:mm:ss」より前が話者名
+    # （空白の連続は先頭位置からしか試さないため線形時間で判定できる）
+    speaker_pattern = re.compile(r'(?<!\s)\s{2,}(\d+:\d+(?::\d+)?)')
     
     for idx, para in enumerate(doc.paragraphs):
         text = para.text.strip()
@@ -75,11 +77,11 @@ def analyze_docx_structure(docx_file):
                         print(f"      🖼️ Image embedded: {embed}")
         
         # 話者パターンにマッチするか確認
-        lines = text.split('\n')
-        if lines and speaker_pattern.match(lines[0]):
-            match = speaker_pattern.match(lines[0])
-            speaker = match.group(1).strip()
-            timestamp = match.group(2)
+        first_line = text.partition('\n')[0]
+        match = speaker_pattern.search(first_line, 1)
+        if match:
+            speaker = first_line[:match.start()].strip()
+            timestamp = match.group(1)
             print(f"  👤 Speaker detected: {speaker}")
             print(f"  ⏰ Timestamp: {timestamp}")
     
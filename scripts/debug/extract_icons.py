@@ -104,7 +104,9 @@ def analyze_speaker_icons(docx_file):
     
     # 話者名のパターンを抽出
     doc = Document(docx_file)
-    speaker_pattern = re.compile(r'^(.+?)\s{2,}(\d+:\d+)')
+    # 話者ヘッダー: 最初の「2文字以上の空白 + mm:ss / h:mm:ss」より前が話者名
+    # （空白の連続は先頭位置からしか試さないため線形時間で判定できる）
+    speaker_pattern = re.compile(r'(?<!\s)\s{2,}(\d+:\d+(?::\d+)?)')
     
     speakers_with_icons = {}
     
@@ -113,23 +115,19 @@ def analyze_speaker_icons(docx_file):
         if not text:
             continue
         
-        # 段落内の改行で分割
-        lines = text.split('\n')
+        # 最初の行が話者情報かチェック（1段落につき1回だけ判定）
+        first_line = text.partition('\n')[0]
+        speaker_match = speaker_pattern.search(first_line, 1)
         
-        # 最初の行が話者情報かチェック
-        if lines and speaker_pattern.match(lines[0]):
-            first_line = lines[0]
-            speaker_match = speaker_pattern.match(first_line)
+        if speaker_match:
+            speaker = first_line[:speaker_match.start()].strip()
             
-            if speaker_match:
-                speaker = speaker_match.group(1).strip()
-                
-                # この段落にアイコンがあるかチェック
-                for img in images:
-                    if img['paragraph_index'] == i:
-                        if speaker not in speakers_with_icons:
-                            speakers_with_icons[speaker] = []
-                        speakers_with_icons[speaker].append(img)
+            # この段落にアイコンがあるかチェック
+            for img in images:
+                if img['paragraph_index'] == i:
+                    if speaker not in speakers_with_icons:
+                        speakers_with_icons[speaker] = []
+                    speakers_with_icons[speaker].append(img)
     
     if speakers_with_icons:
         print("\n📊 Speakers with icons:")
@@ -13,7 +13,8 @@ export function activate(context: vscode.ExtensionContext) {
         return;
       }
 
-      const markdown = editor.document.getText();
+      // アイコン参照定義（[icon:ID]: data:...）を解決
+      const markdown = resolveIconReferences(editor.document.getText());
       const originalFileName = editor.document.fileName;
       
       // Markdownファイルのディレクトリをリソースルートに追加（icons/フォルダーのため）
@@ -27,7 +28,10 @@ export function activate(context: vscode.ExtensionContext) {
           enableScripts: true,
           localResourceRoots: [
             vscode.Uri.file(path.join(context.extensionPath, 'media')),
-            vscode.Uri.file(documentDir) // iconsフォルダーを含むディレクトリ
+            vscode.Uri.file(documentDir), // iconsフォルダーを含むディレクトリ
+            // 出力ツリー共通のアイコンストア（../icons/ など）のため親ディレクトリも許可
+            ...(vscode.workspace.workspaceFolders || []).map(folder => folder.uri),
+            vscode.Uri.file(path.dirname(documentDir))
           ]
         }
       );
@@ -224,7 +228,11 @@ function generateSvgContent(markdown: string, styleContent: string, markdownDir:
             console.error('[SVG Export] Failed to load vscode-webview icon:', error);
             icon = role === 'ai' ? '🤖' : '👤';
           }
-        } else if (iconPath.startsWith('icons/')) {
+        } else if (iconPath.startsWith('data:image/')) {
+          // Base64埋め込みアイコンはそのまま使用
+          iconImageData = iconPath;
+          icon = '';
+        } else if (/^(?:\.\.\/)*icons\//.test(iconPath)) {
           // 相対パスの場合、Markdownファイルのディレクトリから読み込む
           try {
             const fullIconPath = markdownDir ? path.join(markdownDir, iconPath) : iconPath;
@@ -926,11 +934,26 @@ function stripMarkdown(text: string): string {
   s = s.replace(/^\s*\[\s*\]\s*/g, '');
 }
 
+// アイコン参照定義を解決する
+// [icon:ID]: data:image/...;base64,... の定義行を取り除き、<img src="icon:ID"> を実データに置き換える
+function resolveIconReferences(markdown: string): string {
+  const definitions = new Map<string, string>();
+  const body = markdown.replace(/^\[icon:([^\]\s]+)\]:[ \t]*(\S+)[ \t]*(?:\r?\n)?/gm, (match, id, src) => {
+    definitions.set(id, src);
+    return '';
+  });
+  if (definitions.size === 0) { return markdown; }
+  return body.replace(/src="icon:([^"]+)"/g, (match, id) => {
+    const src = definitions.get(id);
+    return src ? `src="${src}"` : match;
+  });
+}
+
 // iconsディレクトリの画像パスをwebview URIに変換
 function convertIconPathsToWebviewUris(markdown: string, baseDir: string, webview: vscode.Webview): string {
-  // <img src="icons/speaker_XXX.png" のパターンを検索して変換
+  // <img src="icons/<sha1>.png" や共有ストアの "../icons/<sha1>.png" を検索して変換
   return markdown.replace(
-    /<img\s+src="(icons\/[^"]+)"/g,
+    /<img\s+src="((?:\.\.\/)*icons\/[^"]+)"/g,
     (match, iconPath) => {
       const fullPath = path.join(baseDir, iconPath);
       const webviewUri = webview.asWebviewUri(vscode.Uri.file(fullPath));
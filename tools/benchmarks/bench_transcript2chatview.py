@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+transcript2chatview の処理段階ごとのベンチマーク
+
+合成したTeams形式のDOCX（アイコンあり／なし）とWebVTTファイルを
+発言数・話者数を変えて生成し、各段階の処理時間を計測してJSONに保存する。
+生成した入力ファイルはキャッシュディレクトリに保存し、次回以降は再利用する。
+
+使い方:
+    python tools/benchmarks/bench_transcript2chatview.py                     # 1k / 10k / 100k 発言
+    python tools/benchmarks/bench_transcript2chatview.py --sizes 1000 10000 -o before.json
+    python tools/benchmarks/bench_transcript2chatview.py --speakers 2 20 --repeat 5
+    python tools/benchmarks/bench_transcript2chatview.py -o after.json --compare before.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.shared import Inches
+from lxml import etree
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transcript2chatview import (  # noqa: E402
+    convert_file,
+    convert_to_chatview_markdown,
+    extract_paragraph_images,
+    merge_consecutive_speakers,
+    parse_caption_file,
+    parse_teams_docx_simple,
+    parse_teams_docx_stream,
+)
+
+# 結果JSONの形式バージョン（項目を変えたら上げる）
+RESULT_FORMAT_VERSION = 1
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_SPEAKERS = (2, 10)
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / 'transcript2chatview-bench'
+
+SAMPLE_SENTENCES = (
+    'おはようございます。本日の議題について説明します。',
+    'ありがとうございます。質問があります。',
+    'はい、どうぞ。',
+    '前回の打ち合わせで出た課題の進捗を共有します。',
+    'スケジュールについては来週までに再調整が必要です。',
+    'その件は担当者に確認してから回答します。',
+    'Let me share my screen and walk through the numbers.',
+    '了解しました。',
+)
+
+ICON_COLORS = (
+    (66, 133, 244), (219, 68, 55), (244, 180, 0), (15, 157, 88),
+    (171, 71, 188), (0, 172, 193), (255, 112, 67), (124, 179, 66),
+)
+
+
+def speaker_names(count):
+    """ベンチマーク用の話者名"""
+    return [f'SPEAKER{i:02d} Taro 話者{i:02d}' for i in range(count)]
+
+
+def synthetic_utterances(count, speakers, seed=0):
+    """
+    合成した発言を返す（同じ引数なら毎回同じ内容）
+
+    同一話者の連続発言も混ざるようにし、結合処理も計測対象になるようにする。
+
+    Yields:
+        tuple: (開始秒, 話者名, 本文)
+    """
+    rng = random.Random(seed)
+    names = speaker_names(speakers)
+    speaker = names[0]
+    seconds = 0
+    for _ in range(count):
+        if rng.random() < 0.6:
+            speaker = rng.choice(names)
+        text = ' '.join(rng.choice(SAMPLE_SENTENCES)
+                        for _ in range(rng.randint(1, 4)))
+        yield seconds, speaker, text
+        seconds += rng.randint(1, 20)
+
+
+def format_teams_timestamp(seconds):
+    """Teams形式のタイムスタンプ（mm:ss または h:mm:ss）"""
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f'{hours}:{minutes:02d}:{secs:02d}'
+    return f'{minutes:02d}:{secs:02d}'
+
+
+def format_vtt_timestamp(seconds):
+    """WebVTT形式のタイムスタンプ（hh:mm:ss.mmm）"""
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f'{hours:02d}:{minutes:02d}:{secs:02d}.000'
+
+
+def icon_png(index, size=96):
+    """話者ごとに色の異なる円形アイコン（PNG）"""
+    img = Image.new('RGBA', (size, size), (255, 255, 255, 0))
+    draw = ImageDraw.Draw(img)
+    color = ICON_COLORS[index % len(ICON_COLORS)]
+    draw.ellipse([0, 0, size - 1, size - 1], fill=color + (255,))
+    # 色が一巡したあとも画像が重複しないよう、番号を点で描き分ける
+    draw.rectangle([index, 0, index, 0], fill=(0, 0, 0, 255))
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def write_teams_docx(path, count, speakers, with_icons=True, seed=0):
+    """
+    Teams形式の合成DOCXを作成
+
+    python-docx で段落を1つずつ追加すると段落数に対して二次時間になるため、
+    話者ごとのアイコン画像と書式だけを python-docx で作成し、本文の段落は
+    document.xml に直接書き込む。段落の構成は scripts/debug/create_sample_meeting.py
+    と同じ（アイコン画像、"話者名  mm:ss" + 改行 + 本文、空段落）。
+    """
+    doc = Document()
+    icon_runs = {}
+    if with_icons:
+        for index, name in enumerate(speaker_names(speakers)):
+            run = doc.add_paragraph().add_run()
+            run.add_picture(io.BytesIO(icon_png(index)), width=Inches(0.3))
+            icon_runs[name] = etree.tostring(run._r, encoding='unicode')
+    # 画像のリレーションシップだけ残し、作業用の段落は削除
+    body = doc.element.body
+    for p in body.findall('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p'):
+        body.remove(p)
+
+    template = io.BytesIO()
+    doc.save(template)
+
+    paragraphs = []
+    for seconds, speaker, text in synthetic_utterances(count, speakers, seed):
+        paragraphs.append(
+            '<w:p>'
+            f'{icon_runs.get(speaker, "")}'
+            '<w:r><w:rPr><w:sz w:val="22"/></w:rPr>'
+            f'<w:t xml:space="preserve">{escape(speaker)}  '
+            f'{format_teams_timestamp(seconds)}</w:t><w:br/></w:r>'
+            '<w:r><w:rPr><w:sz w:val="20"/></w:rPr>'
+            f'<w:t xml:space="preserve">{escape(text)}</w:t></w:r>'
+            '</w:p><w:p/>')
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(template) as src, \
+            zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item)
+            if item.filename == 'word/document.xml':
+                xml = data.decode('utf-8')
+                xml = xml.replace('<w:sectPr', ''.join(paragraphs) + '<w:sectPr', 1)
+                data = xml.encode('utf-8')
+            dst.writestr(item, data)
+
+
+def write_vtt(path, count, speakers, seed=0):
+    """WebVTT形式の合成字幕ファイルを作成"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('WEBVTT\n\n')
+        for seconds, speaker, text in synthetic_utterances(count, speakers, seed):
+            f.write(f'{format_vtt_timestamp(seconds)} --> '
+                    f'{format_vtt_timestamp(seconds + 1)}\n'
+                    f'<v {speaker}>{text}</v>\n\n')
+
+
+def fixture_path(cache_dir, kind, count, speakers, with_icons=False):
+    """入力ファイルのキャッシュパス（なければ作成）"""
+    if kind == 'vtt':
+        path = cache_dir / f'captions_{count}_{speakers}spk.vtt'
+        if not path.exists():
+            write_vtt(path, count, speakers)
+    else:
+        icons = 'icons' if with_icons else 'noicons'
+        path = cache_dir / f'teams_{count}_{speakers}spk_{icons}.docx'
+        if not path.exists():
+            write_teams_docx(path, count, speakers, with_icons=with_icons)
+    return path
+
+
+def measure(func, repeat):
+    """func を repeat 回実行し、各回の経過時間（秒）と最後の戻り値を返す"""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def benchmark_case(path, kind, repeat, work_dir):
+    """
+    1つの入力ファイルについて各段階を計測
+
+    Returns:
+        list: [(段階名, [経過時間, ...]), ...]
+    """
+    timings = []
+
+    if kind == 'vtt':
+        runs, transcript = measure(lambda: parse_caption_file(path), repeat)
+        timings.append(('parse_caption_file', runs))
+    else:
+        icons_dir = work_dir / 'icons'
+        runs, _ = measure(
+            lambda: extract_paragraph_images(path, work_dir, icons_dir=icons_dir),
+            repeat)
+        timings.append(('extract_paragraph_images', runs))
+        runs, transcript = measure(
+            lambda: parse_teams_docx_simple(path, work_dir, icons_dir=icons_dir),
+            repeat)
+        timings.append(('parse_teams_docx_simple', runs))
+        runs, _ = measure(
+            lambda: parse_teams_docx_stream(path, work_dir, icons_dir=icons_dir),
+            repeat)
+        timings.append(('parse_teams_docx_stream', runs))
+
+    runs, merged = measure(
+        lambda: list(merge_consecutive_speakers(transcript)), repeat)
+    timings.append(('merge_consecutive_speakers', runs))
+    runs, _ = measure(lambda: convert_to_chatview_markdown(merged), repeat)
+    timings.append(('convert_to_chatview_markdown', runs))
+
+    output_path = work_dir / 'output.md'
+    runs, _ = measure(
+        lambda: convert_file(str(path), str(output_path), merge_speaker=True,
+                             verbose=False),
+        repeat)
+    timings.append(('convert_file', runs))
+    return timings
+
+
+def run_benchmarks(sizes, speaker_counts, repeat, cache_dir, kinds, log=print):
+    """
+    すべての組み合わせを計測
+
+    Returns:
+        list: 結果レコード（JSONにそのまま保存できるdict）
+    """
+    cases = []
+    for kind in kinds:
+        for count in sizes:
+            for speakers in speaker_counts:
+                if kind == 'docx':
+                    cases.append(('docx', count, speakers, True))
+                    cases.append(('docx', count, speakers, False))
+                else:
+                    cases.append(('vtt', count, speakers, False))
+
+    results = []
+    for kind, count, speakers, with_icons in cases:
+        start = time.perf_counter()
+        path = fixture_path(cache_dir, kind, count, speakers, with_icons)
+        log(f'{path.name} (準備 {time.perf_counter() - start:.1f}s)')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            timings = benchmark_case(path, kind, repeat, Path(tmp))
+
+        for stage, runs in timings:
+            record = {
+                'input': kind,
+                'utterances': count,
+                'speakers': speakers,
+                'icons': with_icons,
+                'stage': stage,
+                'min_s': min(runs),
+                'median_s': statistics.median(runs),
+                'mean_s': statistics.fmean(runs),
+                'utterances_per_s': count / min(runs) if min(runs) else None,
+                'runs_s': runs,
+            }
+            results.append(record)
+            log(f'  {stage:<30} {record["min_s"] * 1e3:>10.1f}ms'
+                f' (median {record["median_s"] * 1e3:.1f}ms)')
+    return results
+
+
+def result_key(record):
+    return (record['input'], record['utterances'], record['speakers'],
+            record['icons'], record['stage'])
+
+
+def compare_results(baseline, current, log=print):
+    """基準となる結果と比較し、段階ごとの比率（現在 / 基準）を表示"""
+    base = {result_key(r): r for r in baseline['results']}
+    log('\n--- 比較（min, 現在 / 基準） ---')
+    for record in current:
+        old = base.get(result_key(record))
+        if old is None or not old['min_s']:
+            continue
+        ratio = record['min_s'] / old['min_s']
+        icons = 'icons' if record['icons'] else 'noicons'
+        log(f'{record["input"]:<4} {record["utterances"]:>7} '
+            f'{record["speakers"]:>3}spk {icons:<7} {record["stage"]:<30} '
+            f'{old["min_s"] * 1e3:>10.1f}ms → {record["min_s"] * 1e3:>10.1f}ms'
+            f' (x{ratio:.2f})')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='transcript2chatview の処理段階ごとのベンチマーク')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='発言数（デフォルト: 1000 10000 100000）')
+    parser.add_argument('--speakers', type=int, nargs='+',
+                        default=list(DEFAULT_SPEAKERS),
+                        help='話者数（デフォルト: 2 10）')
+    parser.add_argument('--inputs', nargs='+', choices=('docx', 'vtt'),
+                        default=['docx', 'vtt'], help='入力形式')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='各段階の実行回数（デフォルト: 3）')
+    parser.add_argument('--cache-dir', type=Path, default=DEFAULT_CACHE_DIR,
+                        help='生成した入力ファイルの保存先')
+    parser.add_argument('-o', '--output', type=Path,
+                        help='結果を保存するJSONファイル')
+    parser.add_argument('--compare', type=Path, metavar='BASELINE',
+                        help='比較対象の結果JSONファイル')
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.speakers, args.repeat,
+                             args.cache_dir, args.inputs)
+
+    report = {
+        'version': RESULT_FORMAT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\n✅ 結果を保存しました: {args.output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_results(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+ChatView形式のマークダウンのメッセージ索引（サイドカー .idx）の読み書き
+
+transcript2chatview.py --message-index は meeting.md の隣に meeting.idx を作り、
+各メッセージ（ヘッダー行と本文）のバイト位置・長さ、話者、開始・終了時刻を
+固定長のレコードで記録する。MessageIndex で開くと、マークダウン全体を
+読み直さずに時刻（bisect）や話者でメッセージを探し、その部分だけを
+マークダウンのmmapから読み出せる。
+
+ファイル形式（リトルエンディアン）:
+    ヘッダー   <4sHHQQ  マジック b'CVIX'、バージョン、フラグ、レコード数、話者表の位置
+    レコード   <QIIII   バイト位置、バイト長、開始ms、終了ms、話者ID（レコード数だけ続く）
+    話者表     UTF-8のJSON配列（話者IDの順の話者名）
+
+使い方:
+    python chatview_index.py meeting.idx --from 01:10:00 --to 01:20:00 --speaker "田中"
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from bisect import bisect_left
+from collections import namedtuple
+from pathlib import Path
+
+
+INDEX_MAGIC = b'CVIX'
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.idx'
+HEADER = struct.Struct('<4sHHQQ')
+RECORD = struct.Struct('<QIIII')
+
+# ヘッダーのフラグ: レコードが開始時刻の昇順に並んでいる（bisectで検索できる）
+FLAG_SORTED = 0x1
+
+
+class IndexedMessage(namedtuple('IndexedMessage',
+                                'number offset length start_ms end_ms speaker')):
+    """
+    索引の1メッセージ
+
+    Attributes:
+        number: メッセージ番号（0から）
+        offset: マークダウンファイル内のバイト位置（ヘッダー行の先頭）
+        length: ヘッダー行と本文のバイト長（末尾の改行を含まない）
+        start_ms: 開始時刻（ミリ秒）
+        end_ms: 終了時刻（ミリ秒）
+        speaker: 話者名
+    """
+    __slots__ = ()
+
+
+def message_index_path(markdown_path):
+    """マークダウンファイルに対応する索引のパス（meeting.md → meeting.idx）"""
+    return Path(markdown_path).with_suffix(INDEX_SUFFIX)
+
+
+class MessageIndexWriter:
+    """
+    メッセージ索引を書き出す
+
+    レコードは add() のたびに書き込み、話者表とヘッダーは close() で確定する。
+    レコード数と並び順は最後まで分からないため、ヘッダーは先頭に仮に書いて
+    おき、close() で書き直す。
+    """
+
+    def __init__(self, index_path):
+        """
+        Args:
+            index_path: 索引ファイルのパス
+        """
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.index_path, 'wb')
+        self._file.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, 0, 0))
+        self._speaker_ids = {}
+        self._count = 0
+        self._sorted = True
+        self._last_start_ms = 0
+
+    def add(self, offset, length, start_ms, end_ms, speaker):
+        """
+        メッセージを1件追加
+
+        Args:
+            offset: マークダウンファイル内のバイト位置
+            length: ヘッダー行と本文のバイト長
+            start_ms: 開始時刻（ミリ秒）
+            end_ms: 終了時刻（ミリ秒）
+            speaker: 話者名
+        """
+        speaker_id = self._speaker_ids.setdefault(speaker, len(self._speaker_ids))
+        if start_ms < self._last_start_ms:
+            self._sorted = False
+        self._last_start_ms = start_ms
+        self._file.write(RECORD.pack(offset, length, start_ms,
+                                     max(end_ms, start_ms), speaker_id))
+        self._count += 1
+
+    def close(self):
+        """話者表とヘッダーを書いて閉じる"""
+        if self._file.closed:
+            return
+        speakers_offset = self._file.tell()
+        self._file.write(json.dumps(list(self._speaker_ids),
+                                    ensure_ascii=False).encode('utf-8'))
+        self._file.seek(0)
+        self._file.write(HEADER.pack(
+            INDEX_MAGIC, INDEX_VERSION, FLAG_SORTED if self._sorted else 0,
+            self._count, speakers_offset))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class _StartTimes:
+    """レコードの開始時刻を bisect 用のシーケンスとして見せる"""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, i):
+        return self._index._record(i)[2]
+
+
+class MessageIndex:
+    """
+    メッセージ索引を開き、時刻・話者でメッセージを探して本文を読み出す
+
+    索引もマークダウンもmmapで開くため、探したメッセージの分しか読まない。
+
+    使用例:
+        with MessageIndex('meeting.idx') as index:
+            for message in index.between(70 * 60000, 80 * 60000, speaker='田中'):
+                print(index.read(message))
+    """
+
+    def __init__(self, index_path, markdown_path=None):
+        """
+        Args:
+            index_path: 索引ファイルのパス
+            markdown_path: マークダウンファイルのパス（Noneの場合は索引と同名の .md）
+
+        Raises:
+            ValueError: 索引ファイルの形式が違う場合
+        """
+        self.index_path = Path(index_path)
+        self.markdown_path = (Path(markdown_path) if markdown_path
+                              else self.index_path.with_suffix('.md'))
+        with open(self.index_path, 'rb') as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, count, speakers_offset = HEADER.unpack_from(
+            self._index_map, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._index_map.close()
+            raise ValueError(f'メッセージ索引ではありません: {self.index_path}')
+        self.sorted = bool(flags & FLAG_SORTED)
+        self._count = count
+        self.speakers = json.loads(self._index_map[speakers_offset:].decode('utf-8'))
+        self._speaker_ids = {name: i for i, name in enumerate(self.speakers)}
+        self._markdown_map = None
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, i):
+        return RECORD.unpack_from(self._index_map, HEADER.size + i * RECORD.size)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        offset, length, start_ms, end_ms, speaker_id = self._record(i)
+        return IndexedMessage(i, offset, length, start_ms, end_ms,
+                              self.speakers[speaker_id])
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+    def find_time(self, ms):
+        """
+        指定時刻以降に始まる最初のメッセージ番号
+
+        Args:
+            ms: 時刻（ミリ秒）
+
+        Returns:
+            int: メッセージ番号（該当がなければ len(index)）
+        """
+        if self.sorted:
+            return bisect_left(_StartTimes(self), ms)
+        return next((i for i in range(self._count) if self._record(i)[2] >= ms),
+                    self._count)
+
+    def between(self, start_ms=None, end_ms=None, speaker=None):
+        """
+        開始時刻が [start_ms, end_ms) の範囲にあるメッセージ
+
+        Args:
+            start_ms: 範囲の開始（ミリ秒、Noneの場合は先頭から）
+            end_ms: 範囲の終了（ミリ秒、Noneの場合は最後まで）
+            speaker: 話者名で絞り込む場合に指定
+
+        Yields:
+            IndexedMessage: 該当するメッセージ
+        """
+        speaker_id = None
+        if speaker is not None:
+            speaker_id = self._speaker_ids.get(speaker)
+            if speaker_id is None:
+                return
+        first = self.find_time(start_ms) if start_ms is not None and self.sorted else 0
+        for i in range(first, self._count):
+            record = self._record(i)
+            if end_ms is not None and record[2] >= end_ms:
+                if self.sorted:
+                    break
+                continue
+            if start_ms is not None and record[2] < start_ms:
+                continue
+            if speaker_id is not None and record[4] != speaker_id:
+                continue
+            yield self[i]
+
+    def by_speaker(self, speaker):
+        """話者のメッセージ（時刻順）"""
+        return self.between(speaker=speaker)
+
+    def read(self, message):
+        """
+        メッセージのマークダウン（ヘッダー行と本文）を読み出す
+
+        Args:
+            message: IndexedMessage またはメッセージ番号
+
+        Returns:
+            str: マークダウンの該当部分
+        """
+        if not isinstance(message, IndexedMessage):
+            message = self[message]
+        if self._markdown_map is None:
+            with open(self.markdown_path, 'rb') as f:
+                self._markdown_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._markdown_map[
+            message.offset:message.offset + message.length].decode('utf-8')
+
+    def close(self):
+        """mmapを閉じる"""
+        self._index_map.close()
+        if self._markdown_map is not None:
+            self._markdown_map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def parse_time_ms(value):
+    """'mm:ss'、'h:mm:ss'、'h:mm:ss.fff' をミリ秒に変換"""
+    seconds_part, _, fraction = value.strip().partition('.')
+    total = 0
+    for part in seconds_part.split(':'):
+        total = total * 60 + int(part)
+    return total * 1000 + (int((fraction + '000')[:3]) if fraction else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='メッセージ索引（.idx）から時刻・話者でメッセージを取り出す')
+    parser.add_argument('index', type=Path, help='索引ファイル（meeting.idx）')
+    parser.add_argument('--markdown', type=Path,
+                        help='マークダウンファイル（省略時は索引と同名の .md）')
+    parser.add_argument('--from', dest='start', type=parse_time_ms, metavar='TIME',
+                        help='この時刻以降に始まるメッセージ（例: 01:10:00）')
+    parser.add_argument('--to', dest='end', type=parse_time_ms, metavar='TIME',
+                        help='この時刻より前に始まるメッセージ（例: 01:20:00）')
+    parser.add_argument('--speaker', help='話者名で絞り込む')
+
+    args = parser.parse_args()
+
+    if not args.index.exists():
+        print(f'エラー: ファイルが見つかりません: {args.index}')
+        return 1
+
+    with MessageIndex(args.index, args.markdown) as index:
+        for message in index.between(args.start, args.end, args.speaker):
+            print(index.read(message))
+            print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+会議をまたいで発言を全文検索するSQLite FTS5索引（--index）の読み書き
+
+transcript2chatview.py --index meetings.sqlite は、変換した会議の発言（結合後、
+マークダウンと同じ順）を1つのSQLiteデータベースに登録する。再変換した会議の
+発言は置き換わる。search サブコマンドまたはこのスクリプトで、話者・会議で
+絞り込みながら発言を検索し、前後の発言とともに表示する。
+
+使い方:
+    python transcript2chatview.py search meetings.sqlite 予算 見直し --speaker "田中"
+    python chatview_search.py meetings.sqlite 予算 --json
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+
+# 全文検索索引（--index）のスキーマ
+# 発言は通常のテーブルに保存し、FTS5は外部コンテンツとして本文と話者だけを索引する
+# （会議の再変換時に、meeting_id の索引で古い発言をまとめて削除できるようにするため）
+SEARCH_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    source TEXT,
+    markdown TEXT,
+    utterance_count INTEGER NOT NULL DEFAULT 0,
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS utterances (
+    id INTEGER PRIMARY KEY,
+    meeting_id INTEGER NOT NULL REFERENCES meetings(id),
+    seq INTEGER NOT NULL,
+    speaker TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS utterances_meeting ON utterances(meeting_id, seq);
+CREATE VIRTUAL TABLE IF NOT EXISTS utterances_fts USING fts5(
+    text, speaker, content='utterances', content_rowid='id', tokenize='{tokenizer}'
+);
+CREATE TRIGGER IF NOT EXISTS utterances_after_insert AFTER INSERT ON utterances BEGIN
+    INSERT INTO utterances_fts(rowid, text, speaker)
+    VALUES (new.id, new.text, new.speaker);
+END;
+CREATE TRIGGER IF NOT EXISTS utterances_after_delete AFTER DELETE ON utterances BEGIN
+    INSERT INTO utterances_fts(utterances_fts, rowid, text, speaker)
+    VALUES ('delete', old.id, old.text, old.speaker);
+END;
+"""
+
+
+# 全文検索索引に登録する発言を一時テーブルへまとめて書き込む件数（変換中に保持する発言数の上限）
+SEARCH_INDEX_BATCH_ROWS = 1000
+
+
+class SearchIndexMeetingWriter:
+    """
+    1つの会議の発言を、変換と並行して全文検索索引に書き込む
+    
+    発言は batch_rows 件ごとに接続専用の一時テーブルへ書き込むため、変換中に
+    保持する発言は batch_rows 件までになる。commit() で1つのトランザクションを
+    開き、会議の古い発言を削除して一時テーブルの発言に置き換える。一時テーブルへの
+    書き込みは索引のデータベースをロックしないため、バッチ変換の他のワーカーは
+    変換の間も待たされない。
+    """
+
+    def __init__(self, connection, path, source=None, markdown=None,
+                 batch_rows=SEARCH_INDEX_BATCH_ROWS):
+        """
+        Args:
+            connection: TranscriptSearchIndex のSQLite接続
+            path: 会議を識別するパス
+            source: 入力ファイルのパス
+            markdown: 出力マークダウンのパス
+            batch_rows: 一時テーブルへまとめて書き込む件数
+        """
+        self.connection = connection
+        self.path = str(path)
+        self.source = source and str(source)
+        self.markdown = markdown and str(markdown)
+        self.batch_rows = batch_rows
+        self.count = 0
+        self.committed = False
+        self._batch = []
+        connection.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS pending_utterances ('
+            'seq INTEGER PRIMARY KEY, speaker TEXT NOT NULL, start_ms INTEGER NOT NULL, '
+            'end_ms INTEGER NOT NULL, text TEXT NOT NULL)')
+        connection.execute('DELETE FROM temp.pending_utterances')
+
+    def add(self, entry):
+        """
+        発言を1件追加
+        
+        Args:
+            entry: Utterance（マークダウンと同じ順に渡す）
+        """
+        self._batch.append((self.count, entry.speaker, entry.start_ms,
+                            entry.end_ms, entry.text.strip()))
+        self.count += 1
+        if len(self._batch) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self.connection.executemany(
+                'INSERT INTO temp.pending_utterances (seq, speaker, start_ms, end_ms, text) '
+                'VALUES (?, ?, ?, ?, ?)', self._batch)
+            self._batch = []
+
+    def commit(self):
+        """
+        会議の発言を1つのトランザクションで置き換える
+        
+        Returns:
+            int: 登録した発言数
+        """
+        self._flush()
+        db = self.connection
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT id FROM meetings WHERE path = ?',
+                             (self.path,)).fetchone()
+            indexed_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+            if row is None:
+                meeting_id = db.execute(
+                    'INSERT INTO meetings (path, source, markdown, indexed_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    (self.path, self.source, self.markdown, indexed_at)).lastrowid
+            else:
+                meeting_id = row[0]
+                db.execute('DELETE FROM utterances WHERE meeting_id = ?', (meeting_id,))
+                db.execute('UPDATE meetings SET source = ?, markdown = ?, indexed_at = ? '
+                           'WHERE id = ?',
+                           (self.source, self.markdown, indexed_at, meeting_id))
+            db.execute(
+                'INSERT INTO utterances (meeting_id, seq, speaker, start_ms, end_ms, text) '
+                'SELECT ?, seq, speaker, start_ms, end_ms, text '
+                'FROM temp.pending_utterances ORDER BY seq', (meeting_id,))
+            db.execute('UPDATE meetings SET utterance_count = ? WHERE id = ?',
+                       (self.count, meeting_id))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        finally:
+            db.execute('DELETE FROM temp.pending_utterances')
+        self.committed = True
+        return self.count
+
+    def rollback(self):
+        """書き込み途中の発言を破棄する（索引は変更しない）"""
+        self._batch = []
+        self.connection.execute('DELETE FROM temp.pending_utterances')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.committed:
+            self.rollback()
+        return False
+
+
+class TranscriptSearchIndex:
+    """
+    会議をまたいで発言を全文検索するためのSQLite FTS5索引
+    
+    日本語は単語の区切りがないため、trigramトークナイザー（SQLite 3.34以降）で
+    3文字単位に索引し、2文字以下の検索語は本文の LIKE で絞り込む。
+    trigramが使えないSQLiteでは unicode61 トークナイザーにする。
+    """
+
+    def __init__(self, db_path, timeout=60):
+        """
+        Args:
+            db_path: SQLiteデータベースファイルのパス
+            timeout: バッチ変換で他のプロセスが書き込み中の場合に待つ秒数
+            
+        Raises:
+            RuntimeError: SQLiteがFTS5に対応していない場合
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # トランザクションは upsert_meeting で明示的に開始する
+        self.connection = sqlite3.connect(str(self.db_path), timeout=timeout,
+                                          isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        try:
+            self._create_schema('trigram')
+        except sqlite3.OperationalError as e:
+            if 'tokenizer' not in str(e):
+                self.connection.close()
+                raise RuntimeError(f'SQLiteがFTS5に対応していません: {e}') from e
+            self._create_schema('unicode61')
+        sql = self.connection.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'utterances_fts'").fetchone()[0]
+        self.trigram = 'trigram' in sql
+
+    def _create_schema(self, tokenizer):
+        self.connection.executescript(
+            'BEGIN;' + SEARCH_INDEX_SCHEMA.format(tokenizer=tokenizer) + 'COMMIT;')
+
+    def begin_meeting(self, path, source=None, markdown=None):
+        """
+        会議の発言を変換と並行して書き込む SearchIndexMeetingWriter を作成
+        
+        Args:
+            path: 会議を識別するパス（出力マークダウンまたは入力ファイル）
+            source: 入力ファイルのパス
+            markdown: 出力マークダウンのパス
+            
+        Returns:
+            SearchIndexMeetingWriter: add() で発言を追加し、commit() で確定する
+        """
+        return SearchIndexMeetingWriter(self.connection, path, source, markdown)
+
+    def upsert_meeting(self, path, utterances, source=None, markdown=None):
+        """
+        会議の発言を1つのトランザクションで登録（既にあれば置き換え）
+        
+        Args:
+            path: 会議を識別するパス（出力マークダウンまたは入力ファイル）
+            utterances: Utteranceのイテラブル（マークダウンと同じ順）
+            source: 入力ファイルのパス
+            markdown: 出力マークダウンのパス
+            
+        Returns:
+            int: 登録した発言数
+        """
+        with self.begin_meeting(path, source, markdown) as writer:
+            for entry in utterances:
+                writer.add(entry)
+            return writer.commit()
+
+    def search(self, query, speaker=None, meeting=None, limit=20, context=1):
+        """
+        発言を全文検索（空白区切りの語をすべて含む発言）
+        
+        Args:
+            query: 検索語（空白区切りでAND）
+            speaker: 話者名で絞り込む場合に指定
+            meeting: 会議のパスの一部で絞り込む場合に指定
+            limit: 最大件数
+            context: 前後に含める発言数
+            
+        Returns:
+            list: [{'meeting', 'source', 'markdown', 'seq', 'speaker', 'start_ms',
+                    'end_ms', 'text', 'before', 'after'}, ...]
+                  before / after は前後の発言の {'speaker', 'start_ms', 'text'}
+        """
+        terms = query.split()
+        min_length = 3 if self.trigram else 1
+        match_terms = [term for term in terms if len(term) >= min_length]
+        like_terms = [term for term in terms if len(term) < min_length]
+        
+        where = []
+        params = []
+        if match_terms:
+            # 各語をフレーズとして引用し、FTS5の演算子として解釈させない
+            tables = 'utterances_fts JOIN utterances u ON u.id = utterances_fts.rowid'
+            where.append('utterances_fts MATCH ?')
+            params.append(' '.join('"' + term.replace('"', '""') + '"'
+                                   for term in match_terms))
+            order = 'utterances_fts.rank'
+        else:
+            tables = 'utterances u'
+            order = 'u.meeting_id, u.seq'
+        for term in like_terms:
+            escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            where.append("u.text LIKE ? ESCAPE '\\'")
+            params.append(f'%{escaped}%')
+        if speaker is not None:
+            where.append('u.speaker = ?')
+            params.append(speaker)
+        if meeting is not None:
+            where.append('m.path LIKE ?')
+            params.append(f'%{meeting}%')
+        
+        sql = (f'SELECT u.meeting_id, u.seq, u.speaker, u.start_ms, u.end_ms, u.text, '
+               f'm.path, m.source, m.markdown '
+               f'FROM {tables} JOIN meetings m ON m.id = u.meeting_id '
+               f'WHERE {" AND ".join(where) or "1"} ORDER BY {order} LIMIT ?')
+        hits = []
+        for (meeting_id, seq, hit_speaker, start_ms, end_ms, text,
+             path, source, markdown) in self.connection.execute(sql, params + [limit]):
+            around = self.connection.execute(
+                'SELECT seq, speaker, start_ms, text FROM utterances '
+                'WHERE meeting_id = ? AND seq BETWEEN ? AND ? AND seq != ? ORDER BY seq',
+                (meeting_id, seq - context, seq + context, seq)).fetchall()
+            hits.append({
+                'meeting': path,
+                'source': source,
+                'markdown': markdown,
+                'seq': seq,
+                'speaker': hit_speaker,
+                'start_ms': start_ms,
+                'end_ms': end_ms,
+                'text': text,
+                'before': [{'speaker': s, 'start_ms': ms, 'text': t}
+                           for n, s, ms, t in around if n < seq],
+                'after': [{'speaker': s, 'start_ms': ms, 'text': t}
+                          for n, s, ms, t in around if n > seq],
+            })
+        return hits
+
+    def close(self):
+        """データベースを閉じる"""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def format_time_ms(ms):
+    """ミリ秒を HH:MM:SS.mmm 形式に変換"""
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}'
+
+
+def main(argv=None, prog=None):
+    """
+    --index で作成した索引から発言を検索して表示（transcript2chatview.py search と同じ）
+    
+    Args:
+        argv: コマンドライン引数（Noneの場合は sys.argv[1:]）
+        prog: ヘルプに表示するコマンド名（Noneの場合はスクリプト名）
+        
+    Returns:
+        int: 終了コード
+    """
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description='--index で作成した全文検索索引から発言を検索'
+    )
+    parser.add_argument('db', type=Path, help='索引のSQLiteデータベース（--index で指定したファイル）')
+    parser.add_argument('query', nargs='+', help='検索語（複数指定でAND）')
+    parser.add_argument('--speaker', help='話者名で絞り込む')
+    parser.add_argument('--meeting', help='会議のパスの一部で絞り込む')
+    parser.add_argument('--limit', type=int, default=20, help='最大件数（デフォルト: 20）')
+    parser.add_argument('--context', type=int, default=1, metavar='N',
+                        help='前後に表示する発言数（デフォルト: 1）')
+    parser.add_argument('--json', action='store_true', help='結果をJSONで出力')
+    
+    args = parser.parse_args(argv)
+    
+    if not args.db.exists():
+        print(f'エラー: ファイルが見つかりません: {args.db}')
+        return 1
+    
+    with TranscriptSearchIndex(args.db) as index:
+        hits = index.search(' '.join(args.query), speaker=args.speaker,
+                            meeting=args.meeting, limit=args.limit,
+                            context=args.context)
+    
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+        return 0
+    
+    for hit in hits:
+        print(f'{hit["meeting"]}  {format_time_ms(hit["start_ms"])}')
+        for turn in hit['before']:
+            print(f'    {turn["speaker"]}: {turn["text"]}')
+        print(f'  > {hit["speaker"]}: {hit["text"]}')
+        for turn in hit['after']:
+            print(f'    {turn["speaker"]}: {turn["text"]}')
+        print()
+    print(f'{len(hits)}件')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""
+常駐して変換リクエストを受け付けるHTTPサーバー（serve サブコマンド）
+
+パーサーを読み込んだままのプロセスプールで変換し、POST /convert の本文（または
+--path-root の下の ?path= のファイル）をマークダウンかZIPで返す。認証がないため
+ループバックアドレスかUnixソケットでのみ待ち受ける。
+
+使い方:
+    python transcript2chatview.py serve --port 8765 -j 4
+    curl --data-binary @meeting.docx 'http://127.0.0.1:8765/convert?name=meeting.docx'
+"""
+
+import argparse
+import io
+import ipaddress
+import json
+import math
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from chatview_watch import ignore_sigint
+from transcript2chatview import (
+    CAPTION_TIMING_PATTERN,
+    INPUT_SUFFIXES,
+    IconNormalizer,
+    MessageIndexWriter,
+    convert_file,
+    has_pillow,
+)
+
+
+# serve モードの既定の待ち受けポート（127.0.0.1のみ）
+SERVE_DEFAULT_PORT = 8765
+
+# serve モードで受け付けるリクエスト本文の上限（バイト）
+SERVE_MAX_REQUEST_BYTES = 512 * 1024 * 1024
+
+# serve モードでリクエスト本文を一時ファイルに書き出す単位（バイト）
+SERVE_READ_CHUNK_BYTES = 1024 * 1024
+
+# serve モードの統計: 秒間リクエスト数とレイテンシの百分位数を求める直近の時間幅と最大サンプル数
+SERVE_STATS_WINDOW_SECONDS = 60
+SERVE_STATS_MAX_SAMPLES = 100000
+
+# serve モードで画像を再圧縮せずにZIPへ格納する拡張子
+SERVE_STORED_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+
+def _parse_flag(value):
+    """クエリ文字列の真偽値（1/true/yes/on、0/false/no/off）"""
+    lowered = value.strip().lower()
+    if lowered in ('1', 'true', 'yes', 'on', ''):
+        return True
+    if lowered in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f'真偽値ではありません: {value}')
+
+
+# serve モードでクエリ文字列から受け付ける変換オプション（convert_fileの引数名 -> 変換関数）
+SERVE_OPTIONS = {
+    'merge_speaker': _parse_flag,
+    'merge_max_gap': float,
+    'merge_max_chars': int,
+    'show_timestamp': _parse_flag,
+    'show_icon': _parse_flag,
+    'embed_icons': _parse_flag,
+    'icon_refs': _parse_flag,
+    'stream': _parse_flag,
+    'icon_size': int,
+    'icon_format': str,
+    'page_messages': int,
+    'page_bytes': int,
+    'page_minutes': float,
+    'message_index': _parse_flag,
+}
+
+
+# serve モードでSRTかどうかを判定するために調べる先頭のバイト数
+SERVE_SNIFF_BYTES = 64 * 1024
+
+
+def sniff_transcript_suffix(data):
+    """
+    リクエスト本文の先頭から入力形式の拡張子を推定
+    
+    Args:
+        data: 入力ファイルの先頭のバイト列（SERVE_SNIFF_BYTES まで）
+        
+    Returns:
+        str: '.docx'（ZIP）、'.vtt'（WEBVTTで始まる）、'.srt'（タイミング行がある）、
+             どれにも当てはまらなければNone
+    """
+    if data[:4] == b'PK\x03\x04':
+        return '.docx'
+    if data[:16].lstrip(b'\xef\xbb\xbf').startswith(b'WEBVTT'):
+        return '.vtt'
+    head = data[:SERVE_SNIFF_BYTES].decode('utf-8', errors='replace')
+    if any(CAPTION_TIMING_PATTERN.match(line.strip()) for line in head.splitlines()):
+        return '.srt'
+    return None
+
+
+def _warm_worker():
+    """ワーカープロセスを起動しておく（最初のリクエストで起動を待たないため）"""
+    return os.getpid()
+
+
+def _serve_convert(input_path, options, as_zip):
+    """
+    プロセスプール用: 1件の変換リクエストを処理
+    
+    convert_file で一時ディレクトリに変換し、マークダウン（as_zip の場合は
+    マークダウン・ページ・索引・icons/ をまとめたZIP）のバイト列を返す。
+    
+    Args:
+        input_path: 入力ファイルのパス（本文で送られた場合はリクエストスレッドが
+                    書き出した一時ファイル。拡張子で形式を判定し、出力名にも使う）
+        options: convert_fileに渡す変換オプション
+        as_zip: ZIPで返すか
+        
+    Returns:
+        tuple: (本文のバイト列, 出力したエントリ数)
+    """
+    with tempfile.TemporaryDirectory(prefix='transcript2chatview-') as tmp:
+        output_dir = Path(tmp) / 'out'
+        output_path = output_dir / Path(input_path).with_suffix('.md').name
+        count = convert_file(input_path, output_path, verbose=False,
+                             icon_workers=0, **options)
+        if not as_zip:
+            return output_path.read_bytes(), count
+        
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for path in sorted(output_dir.rglob('*')):
+                if not path.is_file():
+                    continue
+                compress_type = (zipfile.ZIP_STORED
+                                 if path.suffix.lower() in SERVE_STORED_SUFFIXES
+                                 else zipfile.ZIP_DEFLATED)
+                zf.write(path, path.relative_to(output_dir).as_posix(),
+                         compress_type=compress_type)
+        return buffer.getvalue(), count
+
+
+class ServerStats:
+    """
+    serve モードのリクエスト数とレイテンシの集計（スレッドセーフ）
+    
+    秒間リクエスト数とレイテンシの百分位数は直近 window 秒のリクエストから求める。
+    """
+
+    def __init__(self, window=SERVE_STATS_WINDOW_SECONDS,
+                 max_samples=SERVE_STATS_MAX_SAMPLES):
+        """
+        Args:
+            window: 集計する直近の時間幅（秒）
+            max_samples: 保持するレイテンシの最大件数
+        """
+        self.window = window
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._samples = deque(maxlen=max_samples)  # (完了時刻, レイテンシ秒)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        """
+        1件のリクエストを計測する
+        
+        Yields:
+            dict: 'ok' を False にすると失敗として数える
+        """
+        result = {'ok': True}
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield result
+        except BaseException:
+            result['ok'] = False
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.requests += 1
+                if not result['ok']:
+                    self.errors += 1
+                self._samples.append((time.monotonic(), latency))
+
+    def snapshot(self):
+        """
+        現在の統計
+        
+        Returns:
+            dict: 起動からの秒数、累計件数、処理中の件数、直近の秒間リクエスト数と
+                  レイテンシ（ミリ秒）の p50 / p90 / p99 / 最大
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._samples and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+            latencies = sorted(latency for _, latency in self._samples)
+            requests, errors, in_flight = self.requests, self.errors, self.in_flight
+        uptime = now - self.started
+        
+        def percentile(p):
+            if not latencies:
+                return None
+            # nearest-rank 法
+            rank = max(1, math.ceil(p / 100 * len(latencies)))
+            return round(latencies[rank - 1] * 1000, 3)
+        
+        return {
+            'uptime_seconds': round(uptime, 3),
+            'requests': requests,
+            'errors': errors,
+            'in_flight': in_flight,
+            'window_seconds': self.window,
+            'requests_per_second': round(
+                len(latencies) / max(min(self.window, uptime), 1e-9), 3),
+            'latency_ms': {
+                'p50': percentile(50),
+                'p90': percentile(90),
+                'p99': percentile(99),
+                'max': round(latencies[-1] * 1000, 3) if latencies else None,
+            },
+        }
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """
+    serve モードのHTTPリクエストハンドラー
+    
+    POST /convert  本文のDOCX / VTT / SRT（または ?path= のファイル）を変換
+    GET  /stats    ServerStats の統計をJSONで返す
+    GET  /health   ワーカーが動いていれば ok を返す
+    """
+
+    server_version = 'transcript2chatview'
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Unixソケットではクライアントアドレスがない
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return 'unix'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'),
+                   'application/json; charset=utf-8')
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'error': message})
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/stats':
+            stats = self.server.stats.snapshot()
+            stats['workers'] = self.server.jobs
+            self._send_json(200, stats)
+        elif path == '/health':
+            self._send(200, b'ok\n', 'text/plain; charset=utf-8')
+        else:
+            self._send_error(404, f'見つかりません: {path}')
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/convert':
+            # 本文を読まずに応答するため、この接続は閉じる
+            self.close_connection = True
+            self._send_error(404, f'見つかりません: {url.path}')
+            return
+        
+        with self.server.stats.track() as result:
+            status, body, content_type, headers = self._convert(url.query)
+            result['ok'] = status == 200
+        self._send(status, body, content_type, headers)
+
+    def _read_body(self, spool_dir):
+        """
+        リクエスト本文を spool_dir の一時ファイルに書き出す
+        
+        大きな本文をメモリに溜めず、ワーカーにはファイルのパスだけを渡すため。
+        
+        Returns:
+            tuple: (一時ファイルのパス, 本文のバイト数)
+        """
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            self.close_connection = True
+            raise _RequestError(411, 'Content-Length が必要です（chunked には対応していません）')
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # 本文の長さが分からないため、この接続では以降のリクエストを読めない
+            self.close_connection = True
+            raise _RequestError(400, 'Content-Length が正しくありません')
+        if length > SERVE_MAX_REQUEST_BYTES:
+            self.close_connection = True
+            raise _RequestError(413, f'リクエストが大きすぎます（上限 {SERVE_MAX_REQUEST_BYTES} バイト）')
+        body_path = Path(spool_dir) / 'body'
+        remaining = length
+        with open(body_path, 'wb') as f:
+            while remaining:
+                chunk = self.rfile.read(min(remaining, SERVE_READ_CHUNK_BYTES))
+                if not chunk:
+                    self.close_connection = True
+                    raise _RequestError(400, '本文が Content-Length より短いです')
+                f.write(chunk)
+                remaining -= len(chunk)
+        return body_path, length
+
+    def _convert(self, query):
+        """
+        /convert の処理
+        
+        本文は一時ディレクトリに書き出し、変換が終わったら削除する。
+        
+        Returns:
+            tuple: (ステータス, 本文, Content-Type, 追加ヘッダー)
+        """
+        with tempfile.TemporaryDirectory(prefix='transcript2chatview-') as spool:
+            return self._convert_spooled(query, spool)
+
+    def _convert_spooled(self, query, spool_dir):
+        try:
+            body_path, length = self._read_body(spool_dir)
+            params = parse_qs(query, keep_blank_values=True)
+            as_zip = _parse_flag(params.pop('zip', ['0'])[-1])
+            path = params.pop('path', [None])[-1]
+            name = params.pop('name', [None])[-1]
+            options = {}
+            for key, values in params.items():
+                if key not in SERVE_OPTIONS:
+                    raise _RequestError(400, f'不明なパラメーター: {key}')
+                options[key] = SERVE_OPTIONS[key](values[-1])
+            options = _validate_serve_options(options, as_zip)
+            
+            if path:
+                input_path = self.server.resolve_input_path(path)
+                if input_path.suffix.lower() not in INPUT_SUFFIXES:
+                    raise _RequestError(400, f'対応していない形式です: {input_path.name}')
+                if not input_path.is_file():
+                    raise _RequestError(404, f'ファイルが見つかりません: {path}')
+            else:
+                if not length:
+                    raise _RequestError(400, '本文に入力ファイルを送るか、path を指定してください')
+                filename = Path(name or 'transcript').name
+                if Path(filename).suffix.lower() not in INPUT_SUFFIXES:
+                    with open(body_path, 'rb') as f:
+                        suffix = sniff_transcript_suffix(f.read(SERVE_SNIFF_BYTES))
+                    if suffix is None:
+                        raise _RequestError(422, '文字起こしの形式（DOCX / WebVTT / SRT）を判定できません')
+                    filename = Path(filename).stem + suffix
+                # 形式は拡張子で判定するため、入力ファイル名に付け替える
+                input_path = body_path.rename(Path(spool_dir) / filename)
+        except _RequestError as e:
+            return e.status, *self._error_body(e.message)
+        except ValueError as e:
+            return 400, *self._error_body(str(e))
+        
+        future = self.server.submit(_serve_convert, input_path, options, as_zip)
+        try:
+            body, count = future.result()
+        except BrokenProcessPool as e:
+            return 503, *self._error_body(f'{type(e).__name__}: {e}')
+        except Exception as e:  # 壊れた入力など（サーバーは止めない）
+            return 422, *self._error_body(f'{type(e).__name__}: {e}')
+        # 発言が1つもなければ文字起こしとして読めなかったものとして扱う
+        if count == 0:
+            return 422, *self._error_body(f'発言が見つかりません: {input_path.name}')
+        
+        headers = {'X-Utterances': str(count)}
+        if as_zip:
+            archive_name = input_path.with_suffix('.zip').name
+            headers['Content-Disposition'] = f'attachment; filename="{archive_name}"'
+            return 200, body, 'application/zip', headers
+        return 200, body, 'text/markdown; charset=utf-8', headers
+
+    @staticmethod
+    def _error_body(message):
+        body = json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+        return body, 'application/json; charset=utf-8', {}
+
+
+class _RequestError(Exception):
+    """serve モードでHTTPのエラー応答にする例外"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _validate_serve_options(options, as_zip):
+    """
+    serve モードの変換オプションを検査して補う
+    
+    ZIPで返さない場合はアイコンファイルを返せないため、アイコンをBase64で埋め込む。
+    ページ分割とメッセージ索引は複数ファイルになるためZIPでのみ受け付ける。
+    
+    Raises:
+        _RequestError: 受け付けられないオプションの場合
+    """
+    paged = any(options.get(key) for key in ('page_messages', 'page_bytes', 'page_minutes'))
+    if (paged or options.get('message_index')) and not as_zip:
+        raise _RequestError(400, 'ページ分割とメッセージ索引には zip=1 が必要です')
+    for key in ('page_messages', 'page_bytes', 'page_minutes', 'icon_size', 'merge_max_chars'):
+        if options.get(key) is not None and options[key] <= 0:
+            raise _RequestError(400, f'{key} には正の値を指定してください')
+    if options.get('merge_max_gap') is not None and options['merge_max_gap'] < 0:
+        raise _RequestError(400, 'merge_max_gap には0以上の値を指定してください')
+    if options.get('icon_format') and options['icon_format'] not in IconNormalizer.FORMATS:
+        raise _RequestError(400, f'icon_format は {", ".join(sorted(IconNormalizer.FORMATS))} のいずれかです')
+    if (options.get('icon_size') or options.get('icon_format')) and not has_pillow():
+        raise _RequestError(400, 'icon_size / icon_format には Pillow が必要です')
+    if options.get('message_index') and MessageIndexWriter is None:
+        raise _RequestError(400, 'message_index には chatview_index.py が必要です')
+    if not as_zip:
+        options['embed_icons'] = True
+    return options
+
+
+class _ConversionServerMixin:
+    """変換サーバー共通: プロセスプールと統計を持つ"""
+
+    daemon_threads = True
+
+    def setup_conversion(self, executor, jobs, quiet=False, path_root=None):
+        self.executor = executor
+        self.jobs = jobs
+        self.quiet = quiet
+        self.path_root = Path(path_root).resolve() if path_root else None
+        self.stats = ServerStats()
+        self._executor_lock = threading.Lock()
+
+    def resolve_input_path(self, path):
+        """
+        ?path= のファイルを path_root の下に限って解決する
+        
+        Args:
+            path: クエリで指定されたパス（相対パスは path_root から）
+            
+        Returns:
+            Path: シンボリックリンクを解決した絶対パス
+            
+        Raises:
+            _RequestError: path_root が未設定、またはその外を指している場合
+        """
+        if self.path_root is None:
+            raise _RequestError(403, 'path の指定は serve --path-root で許可したディレクトリでのみ使用できます')
+        resolved = (self.path_root / path).resolve()
+        if not resolved.is_relative_to(self.path_root):
+            raise _RequestError(403, f'--path-root の外のファイルは変換できません: {path}')
+        return resolved
+
+    def submit(self, fn, *args):
+        """プロセスプールに処理を渡す（ワーカーの異常終了でプールが壊れていたら作り直す）"""
+        with self._executor_lock:
+            try:
+                return self.executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self.executor.shutdown(wait=False)
+                self.executor = ProcessPoolExecutor(max_workers=self.jobs,
+                                                    initializer=ignore_sigint)
+                return self.executor.submit(fn, *args)
+
+
+class ConversionHTTPServer(_ConversionServerMixin, ThreadingHTTPServer):
+    """localhost のTCPポートで待ち受ける変換サーバー"""
+
+    def __init__(self, server_address, handler_class):
+        # ::1 などIPv6のアドレスで待ち受ける場合
+        if ':' in server_address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(server_address, handler_class)
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class ConversionUnixServer(_ConversionServerMixin, socketserver.ThreadingUnixStreamServer):
+        """Unixソケットで待ち受ける変換サーバー（HTTP/1.1 over Unix socket）"""
+else:
+    ConversionUnixServer = None  # Windows など Unixソケットのない環境
+
+
+def _is_loopback_host(host):
+    """ホスト名がループバックアドレスだけに解決されればTrue"""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return bool(addresses) and all(
+        ipaddress.ip_address(address.split('%')[0]).is_loopback for address in addresses)
+
+
+def main(argv=None, prog=None):
+    """
+    serve サブコマンド: 変換サーバーを起動して待ち受ける
+    
+    パーサーと正規表現を読み込んだままのプロセスプールで変換するため、
+    1件ごとにPythonの起動やpython-docx・lxmlの読み込みを繰り返さない。
+    
+    Args:
+        argv: serve 以降のコマンドライン引数（Noneの場合は sys.argv[1:]）
+        prog: ヘルプに表示するプログラム名
+        
+    Returns:
+        int: 終了コード
+    """
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description='常駐して変換リクエストを受け付ける（POST /convert、GET /stats、GET /health）'
+    )
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='待ち受けるアドレス（ループバックのみ、デフォルト: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=SERVE_DEFAULT_PORT,
+                        help=f'待ち受けるポート（デフォルト: {SERVE_DEFAULT_PORT}）')
+    parser.add_argument('--socket', type=Path, metavar='PATH',
+                        help='TCPの代わりにこのUnixソケットで待ち受ける')
+    parser.add_argument('--path-root', type=Path, metavar='DIR',
+                        help='POST /convert?path= でこのディレクトリの下のファイルの変換を許可（省略時は path を受け付けない）')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='変換ワーカープロセス数（省略時はCPU数）')
+    parser.add_argument('--quiet', action='store_true', help='リクエストごとのログを出力しない')
+    
+    args = parser.parse_args(argv)
+    
+    # 認証がないため、ネットワークに公開するアドレスでは待ち受けない
+    if not args.socket and not _is_loopback_host(args.host):
+        print(f'エラー: --host にはループバックアドレス（127.0.0.1、::1、localhost）を指定してください: {args.host}')
+        return 1
+    if args.path_root and not args.path_root.is_dir():
+        print(f'エラー: ディレクトリが見つかりません: {args.path_root}')
+        return 1
+    if args.socket and ConversionUnixServer is None:
+        print('エラー: このOSでは --socket を使用できません')
+        return 1
+    jobs = args.jobs or os.cpu_count() or 1
+    
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=ignore_sigint)
+    for future in [executor.submit(_warm_worker) for _ in range(jobs)]:
+        future.result()
+    
+    if args.socket:
+        # 前回の異常終了で残ったソケットファイルを削除
+        if args.socket.is_socket():
+            args.socket.unlink()
+        server = ConversionUnixServer(str(args.socket), ConversionRequestHandler)
+        address = f'unix:{args.socket}'
+    else:
+        server = ConversionHTTPServer((args.host, args.port), ConversionRequestHandler)
+        host = f'[{args.host}]' if ':' in args.host else args.host
+        address = f'http://{host}:{server.server_address[1]}'
+    server.setup_conversion(executor, jobs, quiet=args.quiet, path_root=args.path_root)
+    
+    # サービスとして動かす場合の停止（SIGTERM）もCtrl+Cと同じく終了
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    
+    print(f'{address} で待ち受けています（ワーカー {jobs}、Ctrl+Cで終了）', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.executor.shutdown(wait=True, cancel_futures=True)
+        if args.socket and args.socket.is_socket():
+            args.socket.unlink()
+    print('終了しました', flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
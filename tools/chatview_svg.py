@@ -0,0 +1,653 @@
+#!/usr/bin/env python3
+"""
+ChatView形式のマークダウンをSVGに変換するツール（VS Codeなしで実行可能）
+
+VS Code拡張機能のSVGエクスポート（src/extension.ts の generateSvgContent）と
+同じ吹き出しレイアウト・背景色（media/style.css）・アイコン埋め込み・折り返しで
+描画する。アイコン画像は話者ごとに1回だけ読み込んで <defs> に定義し、
+各メッセージからは <use> で参照するため、メッセージ数が多くても出力が膨らまない。
+
+使い方:
+    python chatview_svg.py meeting.md -o meeting.svg
+    python chatview_svg.py meeting.md -o meeting.svg --style media/style.css
+    python chatview_svg.py meeting.md -o meeting.svg --font NotoSansCJK-Regular.ttc  # 折り返しに使うフォント
+"""
+
+import argparse
+import base64
+import mimetypes
+import re
+import shutil
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+
+try:
+    from PIL import ImageFont  # フォントからグリフ幅を取得する場合のみ使用
+except ImportError:
+    ImageFont = None
+
+
+# 既定のスタイルシート（リポジトリの media/style.css）と、見つからない場合の背景色
+DEFAULT_STYLE_PATH = Path(__file__).resolve().parent.parent / 'media' / 'style.css'
+DEFAULT_BACKGROUND_COLOR = '#a7b6d9'
+
+# レイアウト（generateSvgContent と同じ値）
+SVG_WIDTH = 800
+MAX_BUBBLE_WIDTH = 450
+LINE_HEIGHT = 20
+BUBBLE_PADDING = 12
+ICON_SIZE = 48
+ICON_GAP = 10
+NAME_FONT_SIZE = 11
+TIME_FONT_SIZE = 9
+TEXT_FONT_SIZE = 14
+TAIL_SIZE = 8
+BUBBLE_NUDGE_UP = 8
+MESSAGE_GAP = 15
+
+# 本文のフォント（TEXT_FONT_FAMILY）に近い、日本語を含むフォントの候補
+# （--font を省略した場合に上から順に探し、どれもなければ推定値で折り返す）
+DEFAULT_FONT_CANDIDATES = (
+    '/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc',
+    'C:/Windows/Fonts/meiryo.ttc',
+    'C:/Windows/Fonts/YuGothR.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+)
+
+FILL_COLORS = {'ai': '#ffffff', 'me': '#9efb7a'}
+TEXT_COLOR = '#0b2b2b'
+DEFAULT_ICONS = {'ai': '🤖', 'me': '👤'}
+
+LABEL_FONT_FAMILY = ("-apple-system, BlinkMacSystemFont, 'Segoe UI', "
+                     "'Hiragino Sans', 'Meiryo', sans-serif")
+TEXT_FONT_FAMILY = ("-apple-system, BlinkMacSystemFont, 'Segoe UI', "
+                    "'Hiragino Sans', 'Hiragino Kaku Gothic ProN', Meiryo, sans-serif")
+
+# @ai[アイコン 名前]{タイムスタンプ} 本文
+HEADER_PATTERN = re.compile(r'^@(ai|me)(?:\[([^\]]*)\])?(?:\{([^}]*)\})?\s*(.*)')
+# [icon:ID]: data:image/...（--icon-refs の参照定義）
+ICON_DEFINITION_PATTERN = re.compile(r'^\[icon:([^\]\s]+)\]:[ \t]*(\S+)[ \t]*$')
+ICON_REFERENCE_PREFIX = 'icon:'
+IMG_SRC_PATTERN = re.compile(r'src="([^"]+)"')
+ICON_PATH_PATTERN = re.compile(r'^(?:\.\./)*icons/')
+ENGLISH_WORD_PATTERN = re.compile(r'^[a-zA-Z]+$')
+# 英単語は直後の空白1つまで、それ以外は1文字ずつ
+WORD_TOKEN_PATTERN = re.compile(r'[a-zA-Z0-9]+ ?|.', re.DOTALL)
+INLINE_FORMAT_PATTERN = re.compile(r'`([^`]+?)`|\*\*(.+?)\*\*|\*(.+?)\*')
+BACKGROUND_COLOR_PATTERN = re.compile(r'background-color:\s*([^;]+)')
+
+STRIP_MARKDOWN_RULES = [
+    (re.compile(r'^#{1,6}\s+', re.MULTILINE), ''),
+    (re.compile(r'```[\s\S]*?```'), ''),
+    (re.compile(r'\*\*(.+?)\*\*'), r'\1'),
+    (re.compile(r'\*(.+?)\*'), r'\1'),
+    (re.compile(r'`([^`]+?)`'), r'\1'),
+    (re.compile(r'!\[([^\]]*)\]\(([^)]+)\)'), ''),
+    (re.compile(r'\[([^\]]+)\]\(([^)]+)\)'), r'\1'),
+    (re.compile(r'^>\s+', re.MULTILINE), ''),
+    (re.compile(r'^[-*]\s+', re.MULTILINE), ''),
+    (re.compile(r'^\d+\.\s+', re.MULTILINE), ''),
+]
+
+
+def escape_xml(text):
+    """XMLの特殊文字をエスケープ"""
+    return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            .replace('"', '&quot;').replace("'", '&apos;'))
+
+
+def read_background_color(style_path=None):
+    """
+    スタイルシートから最初の background-color を取得
+
+    Args:
+        style_path: CSSファイルのパス（Noneの場合は media/style.css）
+
+    Returns:
+        str: 背景色（取得できなければ既定の色）
+    """
+    style_path = Path(style_path) if style_path else DEFAULT_STYLE_PATH
+    try:
+        style_content = style_path.read_text(encoding='utf-8')
+    except OSError:
+        return DEFAULT_BACKGROUND_COLOR
+    match = BACKGROUND_COLOR_PATTERN.search(style_content)
+    return match.group(1).strip() if match else DEFAULT_BACKGROUND_COLOR
+
+
+def split_speaker_name(text):
+    """英語名と日本語名の間で改行する（両方ある場合のみ）"""
+    parts = text.split()
+    english = [part for part in parts if ENGLISH_WORD_PATTERN.match(part)]
+    japanese = [part for part in parts if not ENGLISH_WORD_PATTERN.match(part)]
+    if english and japanese:
+        return ' '.join(english) + '\n' + ' '.join(japanese)
+    return ' '.join(parts)
+
+
+def parse_header(line):
+    """
+    @ai / @me のヘッダー行を解析
+
+    Returns:
+        dict: {'role', 'icon', 'name', 'timestamp', 'text'}、ヘッダーでなければNone
+    """
+    match = HEADER_PATTERN.match(line)
+    if match is None:
+        return None
+    role, content, timestamp, text = match.groups()
+    icon = DEFAULT_ICONS[role]
+    name = ''
+    if content is not None:
+        content = content.strip()
+        if content.startswith('<img'):
+            img_end = content.find('/>')
+            if img_end != -1:
+                icon = content[:img_end + 2]
+                name = split_speaker_name(content[img_end + 2:])
+        else:
+            parts = content.split()
+            icon = parts[0] if parts else DEFAULT_ICONS[role]
+            if len(parts) > 1:
+                name = split_speaker_name(' '.join(parts[1:]))
+    return {'role': role, 'icon': icon, 'name': name,
+            'timestamp': timestamp or '', 'text': text}
+
+
+def strip_markdown(text):
+    """マークダウンの記号を取り除いてプレーンテキストにする"""
+    for pattern, replacement in STRIP_MARKDOWN_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def measure_text_width(text):
+    """テキスト幅を推定（日本語・全角は15px、それ以外は8px）"""
+    width = 0
+    for char in text:
+        code = ord(char)
+        if (0x3040 <= code <= 0x30FF or 0x4E00 <= code <= 0x9FFF
+                or 0xFF01 <= code <= 0xFF5E):
+            width += 15
+        else:
+            width += 8
+    return width
+
+
+class GlyphWidthTable:
+    """
+    フォントのグリフの送り幅（ImageFont.getlength）を表にしてテキスト幅を求める
+
+    よく使う範囲（ASCII・ラテン文字・記号・かな・全角英数）は初期化時に
+    配列へ展開し、漢字など基本多言語面の他の文字は初めて使ったときに
+    同じ配列へ書き込み、絵文字など追加面の文字は辞書にメモ化する。
+    フォントにない文字と、フォントを使わない場合は拡張機能と同じ
+    推定値（measure_text_width）にする。カーニングと合字は考慮しない。
+    """
+
+    COMMON_RANGES = (
+        (0x0020, 0x007E),  # ASCII
+        (0x00A0, 0x024F),  # ラテン文字
+        (0x2000, 0x206F),  # 一般句読点
+        (0x3000, 0x30FF),  # 和文の記号・ひらがな・カタカナ
+        (0xFF00, 0xFFEF),  # 全角英数・半角カナ
+    )
+    UNMEASURED = -1.0
+    # どのフォントにもない文字（.notdef のグリフと比べて未収録を判定する）
+    NOTDEF_PROBE = '\U0010FFFD'
+
+    def __init__(self, font_path=None, font_size=TEXT_FONT_SIZE):
+        """
+        Args:
+            font_path: フォントファイルのパス（Noneの場合は推定値を使う）
+            font_size: フォントサイズ（ピクセル）
+
+        Raises:
+            RuntimeError: Pillowがない場合
+            OSError: フォントを読み込めない場合
+        """
+        self.font_path = str(font_path) if font_path else None
+        self._font = None
+        if font_path:
+            if ImageFont is None:
+                raise RuntimeError(
+                    'フォントからグリフ幅を取得するには Pillow が必要です（pip install Pillow）')
+            self._font = ImageFont.truetype(self.font_path, font_size)
+            self._notdef_width = self._font.getlength(self.NOTDEF_PROBE)
+            self._notdef_mask = self._font.getmask(self.NOTDEF_PROBE)
+        self._widths = array('f', [self.UNMEASURED]) * 0x10000
+        self._rare = {}
+        for start, end in self.COMMON_RANGES:
+            for code in range(start, end + 1):
+                self._widths[code] = self._glyph_width(chr(code))
+
+    @classmethod
+    def load(cls, font_path=None, font_size=TEXT_FONT_SIZE):
+        """
+        フォントを指定または候補から探して表を作る
+
+        font_path を省略した場合は DEFAULT_FONT_CANDIDATES から探し、
+        見つからないかPillowがなければ推定値の表にする。
+
+        Args:
+            font_path: フォントファイルのパス
+            font_size: フォントサイズ（ピクセル）
+
+        Returns:
+            GlyphWidthTable: グリフ幅の表
+        """
+        if font_path is None and ImageFont is not None:
+            font_path = next((path for path in DEFAULT_FONT_CANDIDATES
+                              if Path(path).is_file()), None)
+        return cls(font_path, font_size)
+
+    def _glyph_width(self, char):
+        """1文字の送り幅（フォントにない文字は推定値）"""
+        if self._font is None:
+            return float(measure_text_width(char))
+        width = self._font.getlength(char)
+        if width == self._notdef_width:
+            mask = self._font.getmask(char)
+            if mask.size == self._notdef_mask.size and bytes(mask) == bytes(self._notdef_mask):
+                return float(measure_text_width(char))
+        return width
+
+    def width(self, char):
+        """1文字の送り幅"""
+        code = ord(char)
+        if code < 0x10000:
+            width = self._widths[code]
+            if width == self.UNMEASURED:
+                width = self._widths[code] = self._glyph_width(char)
+            return width
+        width = self._rare.get(char)
+        if width is None:
+            width = self._rare[char] = self._glyph_width(char)
+        return width
+
+    def measure(self, text):
+        """テキスト幅（送り幅の合計）"""
+        return sum(map(self.width, text))
+
+
+def wrap_text_naturally(text, max_width, measure=measure_text_width):
+    """
+    単語を途中で切らずに折り返す（英数字は単語単位、それ以外は1文字単位）
+
+    行の幅は追加した単語の幅を足していくため、段落の長さに対して線形時間。
+    measure に GlyphWidthTable.measure を渡すとフォントの実際の幅で折り返す。
+
+    Args:
+        text: プレーンテキスト（改行で段落を区切る）
+        max_width: 1行の最大幅（ピクセル）
+        measure: テキスト幅を返す関数
+
+    Returns:
+        list: 折り返した行
+    """
+    lines = []
+    for p_index, paragraph in enumerate(text.split('\n')):
+        if not paragraph.strip():
+            if p_index > 0:
+                lines.append('')  # 段落間の空行
+            continue
+
+        current = []
+        current_width = 0
+        for word in WORD_TOKEN_PATTERN.findall(paragraph):
+            word_width = measure(word)
+            if current_width + word_width <= max_width:
+                current.append(word)
+                current_width += word_width
+                continue
+
+            line = ''.join(current)
+            if line.strip():
+                # 現在の行を確定して改行
+                lines.append(line.rstrip())
+                word = word.lstrip()
+                current = [word]
+                current_width = measure(word)
+            else:
+                # 1単語が長すぎる場合はそのまま1行にする
+                current = [word]
+                current_width = word_width
+
+        line = ''.join(current)
+        if line.strip():
+            lines.append(line.rstrip())
+
+    return lines or ['']
+
+
+def svg_inline_format(text, color, base_font_size=TEXT_FONT_SIZE):
+    """`code`・**太字**・*斜体* を tspan に変換し、それ以外はエスケープ"""
+    parts = []
+    position = 0
+    for match in INLINE_FORMAT_PATTERN.finditer(text):
+        parts.append(escape_xml(text[position:match.start()]))
+        code, bold, italic = match.groups()
+        if code is not None:
+            parts.append(f'<tspan font-family="monospace" '
+                         f'font-size="{int(base_font_size * 0.9)}" '
+                         f'fill="{color}">{escape_xml(code)}</tspan>')
+        elif bold is not None:
+            parts.append(f'<tspan font-weight="bold" fill="{color}">'
+                         f'{escape_xml(bold)}</tspan>')
+        else:
+            parts.append(f'<tspan font-style="italic" fill="{color}">'
+                         f'{escape_xml(italic)}</tspan>')
+        position = match.end()
+    parts.append(escape_xml(text[position:]))
+    return ''.join(parts)
+
+
+def bubble_path(role, x, y, width, height):
+    """吹き出しのパス（AIは左下、ユーザーは右下に尻尾）"""
+    right = x + width
+    bottom = y + height
+    if role == 'ai':
+        tail = (f'L {x + 25} {bottom} L {x + 14} {bottom + TAIL_SIZE} '
+                f'L {x + 14} {bottom} ')
+    else:
+        tail = (f'L {right - 14} {bottom + TAIL_SIZE} L {right - 25} {bottom} '
+                f'L {x + 14} {bottom} ')
+    return (f'M {x + 14} {y} L {right - 14} {y} Q {right} {y} {right} {y + 14} '
+            f'L {right} {bottom - 14} Q {right} {bottom} {right - 14} {bottom} '
+            f'{tail}'
+            f'Q {x} {bottom} {x} {bottom - 14} L {x} {y + 14} Q {x} {y} {x + 14} {y} Z')
+
+
+def _label(x, y, font_size, color, text):
+    return (f'<text x="{x}" y="{y}" text-anchor="middle" dominant-baseline="middle" '
+            f'font-family="{LABEL_FONT_FAMILY}" font-size="{font_size}" '
+            f'fill="{color}">{escape_xml(text)}</text>\n')
+
+
+class SvgChatRenderer:
+    """
+    ChatView形式のマークダウンを1行ずつ受け取りSVGを組み立てる
+
+    メッセージの要素は一時ファイルに書き出し、全体の高さが決まった
+    write() の時点でSVGのヘッダーとアイコン定義の後ろにつなげるため、
+    メッセージ数が多くてもメモリ使用量は増えない。
+    アイコン画像はファイルごとに1回だけ読み込んでBase64エンコードする。
+    """
+
+    def __init__(self, markdown_dir='', background_color=None, glyph_widths=None):
+        """
+        Args:
+            markdown_dir: アイコンの相対パスの基準ディレクトリ
+            background_color: 背景色（Noneの場合は media/style.css から取得）
+            glyph_widths: 折り返しに使う GlyphWidthTable（Noneの場合は
+                          拡張機能と同じ推定値）
+        """
+        self.markdown_dir = Path(markdown_dir) if markdown_dir else Path('.')
+        self.background_color = background_color or read_background_color()
+        self.glyph_widths = glyph_widths or GlyphWidthTable()
+        self.measure = self.glyph_widths.measure
+        self.message_count = 0
+        self._y = 30
+        self._current = None
+        self._icon_definitions = {}  # data URI -> 参照定義ID（--icon-refs）
+        self._icon_ids = {}  # アイコンのsrc -> <defs> のID
+        self._icon_roles = {}  # <defs> のID -> 最初に使った話者のロール
+        self._elements = tempfile.SpooledTemporaryFile(
+            max_size=8 * 1024 * 1024, mode='w+', encoding='utf-8')
+
+    def feed(self, line):
+        """マークダウンの1行を追加（改行を含む場合は行ごとに分けて処理）"""
+        if '\n' in line:
+            for part in line.split('\n'):
+                self.feed(part)
+            return
+        line = line.rstrip('\r')
+
+        definition = ICON_DEFINITION_PATTERN.match(line)
+        if definition:
+            self._icon_definitions[definition.group(1)] = definition.group(2)
+            return
+
+        header = parse_header(line)
+        if header is not None:
+            self._flush_message()
+            self._current = header
+        elif self._current is not None:
+            # ロールのない行は直前のメッセージの続き
+            self._current['text'] += '\n' + line
+
+    def feed_lines(self, lines):
+        """複数行を追加"""
+        for line in lines:
+            self.feed(line)
+
+    def _icon_id(self, src, role):
+        """アイコンのsrcに対応する <defs> のIDを返す（初出時に登録）"""
+        if src.startswith(ICON_REFERENCE_PREFIX):
+            src = self._icon_definitions.get(src[len(ICON_REFERENCE_PREFIX):], src)
+        if src not in self._icon_ids:
+            icon_id = f'icon-{len(self._icon_ids)}'
+            self._icon_ids[src] = icon_id
+            self._icon_roles[icon_id] = role
+        return self._icon_ids[src]
+
+    def _icon_href(self, src):
+        """アイコンのsrcをSVGに埋め込めるdata URIにする（読めなければNone）"""
+        if src.startswith('data:image/'):
+            return src
+        if not ICON_PATH_PATTERN.match(src):
+            return None
+        icon_path = self.markdown_dir / src
+        try:
+            data = icon_path.read_bytes()
+        except OSError:
+            return None
+        content_type = mimetypes.guess_type(icon_path.name)[0] or 'image/png'
+        return f'data:{content_type};base64,{base64.b64encode(data).decode("ascii")}'
+
+    def _flush_message(self):
+        """組み立て中のメッセージを描画"""
+        msg, self._current = self._current, None
+        if msg is None:
+            return
+        self.message_count += 1
+        write = self._elements.write
+        role = msg['role']
+        icon = msg['icon']
+        name = msg['name']
+        timestamp = msg['timestamp']
+
+        icon_ref = None
+        if icon.startswith('<img'):
+            src_match = IMG_SRC_PATTERN.search(icon)
+            if src_match:
+                icon_ref = self._icon_id(src_match.group(1), role)
+            icon = ''
+
+        # 折り返しとバブルのサイズ
+        text_lines = wrap_text_naturally(
+            strip_markdown(msg['text']), MAX_BUBBLE_WIDTH, self.measure)
+        while text_lines and not text_lines[-1].strip():
+            text_lines.pop()
+        if not text_lines:
+            text_lines = ['']
+        bubble_height = len(text_lines) * LINE_HEIGHT + BUBBLE_PADDING * 2
+        text_width = max(map(self.measure, text_lines))
+        bubble_width = round(min(MAX_BUBBLE_WIDTH, text_width + BUBBLE_PADDING * 3))
+
+        if role == 'ai':
+            icon_x = 20
+            bubble_x = icon_x + ICON_SIZE + ICON_GAP
+        else:
+            icon_x = SVG_WIDTH - 20 - ICON_SIZE
+            bubble_x = icon_x - ICON_GAP - bubble_width
+
+        # 名前とタイムスタンプはアイコンの下（名前は最大3行）
+        y = self._y
+        non_empty_name_lines = [line for line in name.split('\n') if line.strip()]
+        name_lines = [line for line in non_empty_name_lines if 'src=' not in line][:3]
+        name_line_count = min(len(non_empty_name_lines), 3)
+        if name and timestamp:
+            name_section_height = name_line_count * (NAME_FONT_SIZE + 2) + TIME_FONT_SIZE + 6
+        elif name:
+            name_section_height = name_line_count * (NAME_FONT_SIZE + 2) + 4
+        elif timestamp:
+            name_section_height = TIME_FONT_SIZE + 6
+        else:
+            name_section_height = 0
+        column_height = ICON_SIZE + name_section_height + 6
+        bubble_y = y + max(0, (column_height - bubble_height) // 2) - BUBBLE_NUDGE_UP
+        bubble_y = max(bubble_y, y - 20)
+
+        # アイコン（画像は <defs> の定義を参照、絵文字はテキスト）
+        icon_cx = icon_x + ICON_SIZE // 2
+        icon_cy = y + ICON_SIZE // 2
+        if icon_ref is not None:
+            write(f'<use href="#{icon_ref}" x="{icon_x}" y="{y}" />\n')
+        elif icon:
+            write(f'<text x="{icon_cx}" y="{icon_cy}" text-anchor="middle" '
+                  f'dominant-baseline="middle" font-family="{LABEL_FONT_FAMILY}" '
+                  f'font-size="{int(ICON_SIZE * 0.6)}" fill="{TEXT_COLOR}">'
+                  f'{escape_xml(icon)}</text>\n')
+
+        label_y = y + ICON_SIZE + 12
+        for line in name_lines if name else []:
+            write(_label(icon_cx, label_y, NAME_FONT_SIZE, '#666666', line))
+            label_y += NAME_FONT_SIZE + 2
+        if timestamp:
+            write(_label(icon_cx, label_y, TIME_FONT_SIZE, '#999999', timestamp))
+
+        # 吹き出しと本文
+        write(f'<path d="{bubble_path(role, bubble_x, bubble_y, bubble_width, bubble_height)}" '
+              f'fill="{FILL_COLORS[role]}" stroke="rgba(3, 30, 32, 0.06)" stroke-width="1"/>\n')
+        text_x = bubble_x + BUBBLE_PADDING
+        for index, text_line in enumerate(text_lines):
+            text_y = bubble_y + BUBBLE_PADDING + index * LINE_HEIGHT + 16
+            write(f'<text x="{text_x}" y="{text_y}" fill="{TEXT_COLOR}" '
+                  f'font-family="{TEXT_FONT_FAMILY}" font-size="{TEXT_FONT_SIZE}">'
+                  f'{svg_inline_format(text_line, TEXT_COLOR)}</text>\n')
+
+        self._y += max(bubble_height, column_height) + MESSAGE_GAP
+
+    def _icon_defs(self):
+        """アイコンの <defs> 定義（ファイルはここで1回だけ読み込む）"""
+        for src, icon_id in self._icon_ids.items():
+            href = self._icon_href(src)
+            if href is not None:
+                yield (f'<image id="{icon_id}" x="0" y="0" width="{ICON_SIZE}" '
+                       f'height="{ICON_SIZE}" href="{href}" style="border-radius: 50%;" />\n')
+            else:
+                # 読み込めないアイコンはロールの既定の絵文字にする
+                emoji = DEFAULT_ICONS[self._icon_roles[icon_id]]
+                yield (f'<text id="{icon_id}" x="{ICON_SIZE // 2}" y="{ICON_SIZE // 2}" '
+                       f'text-anchor="middle" dominant-baseline="middle" '
+                       f'font-family="{LABEL_FONT_FAMILY}" font-size="{int(ICON_SIZE * 0.6)}" '
+                       f'fill="{TEXT_COLOR}">{emoji}</text>\n')
+
+    def write(self, file):
+        """
+        SVG全体を書き出す（アイコンファイルはこの時点で読み込む）
+
+        Args:
+            file: 書き込み先のテキストファイルオブジェクト
+        """
+        self._flush_message()
+        total_height = self._y + 20
+        file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" '
+            f'height="{total_height}" viewBox="0 0 {SVG_WIDTH} {total_height}">\n'
+            '  <defs>\n'
+            '    <style>\n'
+            '      text {\n'
+            '        font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", '
+            '"Hiragino Sans", "Hiragino Kaku Gothic ProN", Meiryo, sans-serif;\n'
+            f'        fill: {TEXT_COLOR};\n'
+            '      }\n'
+            '    </style>\n')
+        for definition in self._icon_defs():
+            file.write(definition)
+        file.write('  </defs>\n'
+                   f'  <rect width="100%" height="100%" fill="{self.background_color}"/>\n')
+        self._elements.seek(0)
+        shutil.copyfileobj(self._elements, file)
+        file.write('</svg>\n')
+
+    def save(self, svg_path):
+        """SVGをファイルに保存"""
+        svg_path = Path(svg_path)
+        svg_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(svg_path, 'w', encoding='utf-8') as f:
+            self.write(f)
+
+    def close(self):
+        """一時ファイルを削除"""
+        self._elements.close()
+
+
+def convert_markdown_to_svg(markdown_path, svg_path, style_path=None, font_path=None):
+    """
+    ChatView形式のマークダウンファイルをSVGに変換
+
+    Args:
+        markdown_path: 入力マークダウンファイル
+        svg_path: 出力SVGファイル
+        style_path: 背景色を取得するCSSファイル（Noneの場合は media/style.css）
+        font_path: 折り返しに使うフォント（Noneの場合は DEFAULT_FONT_CANDIDATES
+                   から探し、なければ推定値）
+
+    Returns:
+        int: 描画したメッセージ数
+    """
+    markdown_path = Path(markdown_path)
+    renderer = SvgChatRenderer(markdown_path.parent,
+                               background_color=read_background_color(style_path),
+                               glyph_widths=GlyphWidthTable.load(font_path))
+    try:
+        with open(markdown_path, encoding='utf-8') as f:
+            for line in f:
+                renderer.feed(line.rstrip('\n'))
+        renderer.save(svg_path)
+    finally:
+        renderer.close()
+    return renderer.message_count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='ChatView形式のマークダウンをSVGに変換')
+    parser.add_argument('input', type=Path, help='入力マークダウンファイル')
+    parser.add_argument('-o', '--output', type=Path,
+                        help='出力SVGファイル（省略時は入力と同名の .svg）')
+    parser.add_argument('--style', type=Path,
+                        help='背景色を取得するCSSファイル（省略時は media/style.css）')
+    parser.add_argument('--font', type=Path,
+                        help='折り返しの幅を測るフォント（.ttf / .otf / .ttc、Pillowが必要、'
+                             '省略時はヒラギノ・メイリオ・Noto Sans CJKを探し、なければ推定値）')
+
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        print(f'エラー: ファイルが見つかりません: {args.input}')
+        return 1
+
+    if args.font and ImageFont is None:
+        print('エラー: --font には Pillow が必要です（pip install Pillow）')
+        return 1
+
+    output = args.output or args.input.with_suffix('.svg')
+    try:
+        count = convert_markdown_to_svg(args.input, output, args.style, args.font)
+    except OSError as e:
+        print(f'エラー: {e}')
+        return 1
+    print(f'✅ {count}件のメッセージをSVGに変換しました: {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
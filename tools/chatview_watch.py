@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+ディレクトリを監視して文字起こしを変換し続ける常駐モード（--watch）
+
+transcript2chatview.py --watch DIR は、DIR（サブディレクトリを含む）に追加・
+変更された文字起こしを、起動したままのプロセスプールで変換する。Linuxでは
+inotify で変更を待ち、それ以外の環境や --watch-poll の指定時はポーリングする。
+出力名とマニフェストの扱いはバッチ変換と同じ。
+
+使い方:
+    python transcript2chatview.py --watch incoming/ --output-dir chatview/
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from transcript2chatview import (
+    DOCX_SUFFIXES,
+    INPUT_SUFFIXES,
+    ConversionManifest,
+    _batch_output_paths,
+    _convert_batch_item,
+    file_digest,
+)
+
+
+# --watch: 書き込み途中のファイルを変換しないよう、サイズと更新時刻がこの秒数変わらなくなるまで待つ
+WATCH_SETTLE_SECONDS = 2.0
+
+# --watch: ポーリングの間隔（inotify使用時はイベントを待つ最大時間）
+WATCH_POLL_SECONDS = 1.0
+
+# inotify のイベントマスクとフラグ（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len（この後に名前が len バイト続く）
+
+
+def _load_inotify():
+    """inotify を呼び出せる libc（Linux以外や見つからない場合はNone）"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p,
+                                           ctypes.c_uint32)
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def _file_signature(path):
+    """ファイルのサイズと更新時刻（存在しなければNone）"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_complete_transcript(path):
+    """書き込みが終わって読める状態か（DOCXはZIPの中央ディレクトリまで書かれているか）"""
+    if path.suffix.lower() in DOCX_SUFFIXES:
+        return zipfile.is_zipfile(path)
+    return True
+
+
+class DirectoryWatcher:
+    """
+    ディレクトリ（サブディレクトリを含む）の入力ファイルの追加・変更を検出する
+    
+    Linuxでは inotify でイベントを待つ。inotify が使えない場合（他のOS、監視数の
+    上限、イベントの届かないネットワーク共有で poll=True を指定した場合）は、
+    一定間隔でツリーを走査してサイズと更新時刻を比べる。
+    """
+
+    def __init__(self, directory, suffixes=INPUT_SUFFIXES, poll=False,
+                 interval=WATCH_POLL_SECONDS):
+        """
+        Args:
+            directory: 監視するディレクトリ
+            suffixes: 対象とする入力ファイルの拡張子
+            poll: Trueの場合は inotify を使わずポーリングする
+            interval: ポーリングの間隔（秒）
+        """
+        self.directory = Path(directory)
+        self.suffixes = suffixes
+        self.interval = interval
+        self._snapshot = {}  # 入力ファイル -> (サイズ, 更新時刻)（ポーリング用）
+        self._dirs = {}      # inotify の watch descriptor -> ディレクトリ
+        self._fd = None
+        self._libc = None if poll else _load_inotify()
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                try:
+                    self._watch_tree(self.directory)
+                except OSError:
+                    self._close_inotify()
+
+    @property
+    def mode(self):
+        """'inotify' または 'poll'"""
+        return 'inotify' if self._fd is not None else 'poll'
+
+    def _is_input(self, path):
+        # Wordの一時ファイル（~$xxx.docx）は除外
+        return path.suffix.lower() in self.suffixes and not path.name.startswith('~$')
+
+    def scan(self):
+        """
+        ツリー内の入力ファイルをすべて返す（ポーリングの比較元も更新する）
+        
+        Returns:
+            list: 入力ファイルのパス
+        """
+        files = [path for path in sorted(self.directory.rglob('*'))
+                 if self._is_input(path) and path.is_file()]
+        self._snapshot = {path: _file_signature(path) for path in files}
+        return files
+
+    def changes(self):
+        """
+        追加・変更された可能性のある入力ファイルを、最大 interval 秒待って返す
+        
+        Returns:
+            set: 入力ファイルのパス（変化がなければ空）
+        """
+        if self._fd is None:
+            time.sleep(self.interval)
+            previous = self._snapshot
+            self.scan()
+            return {path for path, signature in self._snapshot.items()
+                    if previous.get(path) != signature}
+        readable, _, _ = select.select([self._fd], [], [], self.interval)
+        if not readable:
+            return set()
+        try:
+            return self._read_events()
+        except OSError:
+            # 新しいディレクトリを登録できない（監視数の上限など）場合はポーリングに切り替える
+            self._close_inotify()
+            return set(self.scan())
+
+    def _watch_tree(self, directory):
+        """ディレクトリとその下のディレクトリを inotify に登録"""
+        directories = [directory]
+        directories.extend(path for path in directory.rglob('*') if path.is_dir())
+        for path in directories:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path),
+                                              INOTIFY_WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno), str(path))
+            self._dirs[wd] = path
+
+    def _read_events(self):
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        pos = 0
+        while pos < len(data):
+            wd, mask, _cookie, length = INOTIFY_EVENT.unpack_from(data, pos)
+            pos += INOTIFY_EVENT.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+            if mask & IN_Q_OVERFLOW:
+                # イベントがあふれた場合はツリー全体を確認し直す
+                changed.update(self.scan())
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & IN_ISDIR:
+                # 新しいディレクトリを監視に加え、すでに入っているファイルも拾う
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(path)
+                    changed.update(found for found in path.rglob('*')
+                                   if self._is_input(found) and found.is_file())
+            elif self._is_input(path):
+                changed.add(path)
+        return changed
+
+    def _close_inotify(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._dirs.clear()
+
+    def close(self):
+        """inotify のファイル記述子を閉じる"""
+        self._close_inotify()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def ignore_sigint():
+    """
+    常駐モードのワーカープロセスの初期化: Ctrl+C（SIGINT）を無視する
+    
+    Ctrl+C はプロセスグループ全体に届くため、ワーカーが KeyboardInterrupt で
+    トレースバックを出して落ちないようにし、終了処理は親プロセスに任せる。
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _watch_output_path(input_path, directory, output_dir=None):
+    """
+    --watch: 同じディレクトリにある拡張子だけが違う入力も含めて出力先を決定
+    
+    Args:
+        input_path: 入力ファイル
+        directory: 監視しているディレクトリ（出力ツリーの基準）
+        output_dir: 出力ツリーのルート（Noneの場合は入力ファイルの隣に出力）
+        
+    Returns:
+        Path: 出力ファイル（規則は _batch_output_paths と同じ）
+    """
+    siblings = [path for path in input_path.parent.iterdir()
+                if path.stem.casefold() == input_path.stem.casefold()
+                and path.suffix.lower() in INPUT_SUFFIXES
+                and not path.name.startswith('~$') and path.is_file()]
+    if input_path not in siblings:
+        siblings.append(input_path)
+    outputs = _batch_output_paths([(path, directory) for path in siblings], output_dir)
+    return dict(outputs)[input_path]
+
+
+def watch_directory(directory, output_dir=None, jobs=None, options=None,
+                    settle=WATCH_SETTLE_SECONDS, poll=False, stop_event=None):
+    """
+    ディレクトリを監視し、追加・変更された文字起こしを変換し続ける
+    
+    1つのプロセスで監視を続け、変換は起動したままのプロセスプールで行うため、
+    ファイルごとにPythonの起動やpython-docxの読み込みを繰り返さない。
+    書き込み途中のファイルは、サイズと更新時刻が settle 秒変わらず、DOCXの場合は
+    ZIPとして読めるようになるまで待つ。プールに渡す変換は jobs の2倍までとし、
+    残りは監視側で順番を待つ。起動時には既存のファイルも確認し、マニフェストと
+    一致しないものを変換する。入力ファイルが削除されても出力は削除しない。
+    拡張子だけが違う入力（meet.docx と meet.vtt）はバッチ変換と同じ規則で別の
+    出力名にし、後から来たDOCXに meet.md を譲ったファイルは meet.vtt.md に変換し直す。
+    
+    Args:
+        directory: 監視するディレクトリ
+        output_dir: 出力ツリーのルート（Noneの場合は入力ファイルの隣に出力）
+        jobs: ワーカープロセス数（Noneの場合はCPU数）
+        options: convert_fileに渡す変換オプション
+        settle: 変化が止まってから変換するまでの秒数
+        poll: Trueの場合は inotify を使わずポーリングする（ネットワーク共有向け）
+        stop_event: セットされたら監視を終了する threading.Event（Noneの場合はCtrl+Cまで）
+        
+    Returns:
+        list: [(入力ファイル, 出力ファイル, 成功したか, メッセージ), ...]
+    """
+    # マニフェストの入力パス（絶対パス）と同じ形で扱う
+    directory = Path(directory).resolve()
+    options = dict(options or {})
+    jobs = jobs or os.cpu_count() or 1
+    stop_event = stop_event or threading.Event()
+    results = []
+    manifests = {}  # 出力ディレクトリ -> ConversionManifest
+    pending = {}    # 入力ファイル -> ((サイズ, 更新時刻), 最後に変化を見た時刻)
+    ready = {}      # 変換待ちの入力ファイル（dictを順序付き集合として使う）
+    running = {}    # future -> (入力ファイル, 出力ファイル, マニフェスト, ハッシュ)
+    incomplete = set()  # 読めないDOCXとして通知済みのファイル
+    
+    # 出力ツリー全体で1つのアイコンストアを共有
+    if output_dir is not None and not options.get('icons_dir'):
+        options['icons_dir'] = str(Path(output_dir) / 'icons')
+    
+    def report(input_path, output_path, ok, message):
+        status = '✓' if ok else '✗'
+        print(f'{time.strftime("%H:%M:%S")} {status} {input_path}: {message}',
+              flush=True)
+        results.append((input_path, output_path, ok, message))
+    
+    def submit(executor, input_path):
+        try:
+            output_path = _watch_output_path(input_path, directory, output_dir)
+            digest = file_digest(input_path)
+        except OSError as e:
+            report(input_path, None, False, f'{type(e).__name__}: {e}')
+            return
+        # 同じ出力ファイルを変換中なら（出力名が入れ替わった直後など）終わるまで待つ
+        if any(item[1] == output_path for item in running.values()):
+            pending[input_path] = (_file_signature(input_path), time.monotonic())
+            return
+        manifest_dir = output_path.parent
+        if manifest_dir not in manifests:
+            manifests[manifest_dir] = ConversionManifest(manifest_dir)
+        manifest = manifests[manifest_dir]
+        # 内容が変わっていなければ（更新時刻だけの変化、起動時の既存ファイルなど）変換しない
+        if manifest.is_current(output_path, input_path, digest, options):
+            return
+        future = executor.submit(_convert_batch_item, input_path, output_path, options)
+        running[future] = (input_path, output_path, manifest, digest)
+    
+    def collect(now):
+        """完了した変換の結果を記録し、プールが壊れていればTrueを返す"""
+        broken = False
+        for future in [f for f in running if f.done()]:
+            input_path, output_path, manifest, digest = running.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                ok, message = future.result()
+            except Exception as e:  # ワーカーの異常終了など
+                ok, message = False, f'{type(e).__name__}: {e}'
+                broken = broken or isinstance(e, BrokenProcessPool)
+            report(input_path, output_path, ok, message)
+            if ok:
+                previous = manifest.source(output_path)
+                manifest.record(output_path, input_path, digest, options)
+                manifest.save()
+                # 出力名を譲った入力（meet.md → meet.vtt.md）を変換し直す
+                if (previous is not None
+                        and previous != input_path.resolve()
+                        and previous.is_file()):
+                    pending[previous] = (_file_signature(previous), now)
+        return broken
+    
+    with DirectoryWatcher(directory, poll=poll) as watcher:
+        print(f'{directory} を監視しています（{watcher.mode}、Ctrl+Cで終了）...',
+              flush=True)
+        changed = watcher.scan()
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=ignore_sigint)
+        try:
+            while not stop_event.is_set():
+                now = time.monotonic()
+                for path in changed:
+                    pending[path] = (_file_signature(path), now)
+                    incomplete.discard(path)
+                
+                # 変化が止まったファイルを変換待ちにする
+                busy = {item[0] for item in running.values()}
+                for path, (signature, since) in list(pending.items()):
+                    current = _file_signature(path)
+                    if current is None:
+                        del pending[path]
+                    elif current != signature:
+                        pending[path] = (current, now)
+                    elif now - since >= settle and path not in busy:
+                        if not _is_complete_transcript(path):
+                            if path not in incomplete:
+                                incomplete.add(path)
+                                print(f'{time.strftime("%H:%M:%S")} … {path}: '
+                                      'DOCXとして読めないため書き込みの完了を待っています',
+                                      flush=True)
+                            continue
+                        del pending[path]
+                        ready[path] = None
+                
+                while ready and len(running) < jobs * 2:
+                    path = next(iter(ready))
+                    del ready[path]
+                    submit(executor, path)
+                
+                if collect(now):
+                    # ワーカーが異常終了したプールは使えないため作り直す
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=jobs,
+                                                   initializer=ignore_sigint)
+                
+                changed = watcher.changes()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # 終了時に実行中だった変換の結果も表示してマニフェストに記録
+            collect(time.monotonic())
+    
+    print('監視を終了しました', flush=True)
+    return results
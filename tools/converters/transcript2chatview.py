@@ -5,6 +5,7 @@ Microsoft Teams DOCX文字起こしをChatView形式のマークダウンに変
 使い方:
     python transcript2chatview.py input.docx -o output.md
     python transcript2chatview.py input.docx --merge-speaker   # 同一話者の連続発言を結合
+    python transcript2chatview.py input.docx --merge-speaker --merge-max-gap 30 --merge-max-chars 400  # 結合の上限
     python transcript2chatview.py input.docx --no-timestamp    # タイムスタンプ非表示
     python transcript2chatview.py input.docx --no-icon         # アイコン絵文字非表示
     python transcript2chatview.py input.docx --merge-speaker --no-timestamp --no-icon  # 複数オプション併用
@@ -74,36 +75,66 @@ def parse_teams_docx(docx_file):
     return transcript
 
 
-def merge_consecutive_speakers(transcript):
+def _timestamp_to_ms(timestamp):
     """
-    同一話者の連続した発言を結合
+    タイムスタンプ文字列（h:mm:ss.fff）をミリ秒に変換
+    
+    tools/transcript2chatview.py の parse_timestamp_ms と同じ規則
+    （このスクリプトは python-docx だけで単体で動かせるよう、読み込まずに持つ）
+    """
+    seconds_part, _, fraction = timestamp.strip().partition('.')
+    total = 0
+    for part in seconds_part.split(':'):
+        total = total * 60 + int(part)
+    return total * 1000 + (int((fraction + '000')[:3]) if fraction else 0)
+
+
+def merge_consecutive_speakers(transcript, max_gap_ms=None, max_chars=None):
+    """
+    同一話者の連続した発言を結合（ジェネレーター）
+    
+    同じ話者の本文をバッファに集め、話者が変わったときに1回だけ結合して返す
     
     Args:
-        transcript: パースされた文字起こしデータ
+        transcript: パースされた文字起こしデータ（イテラブル）
+        max_gap_ms: 前の発言の終了から次の発言の開始までがこれを超えたら
+                    結合しない（ミリ秒、Noneの場合は無制限）
+        max_chars: 結合後の本文がこの文字数を超える場合は新しい発言にする
+                   （Noneの場合は無制限）
         
-    Returns:
-        list: 結合後のデータ
+    Yields:
+        dict: 結合後のデータ
     """
-    if not transcript:
-        return []
-    
-    merged = []
-    current = transcript[0].copy()
+    current = None
+    fragments = []  # 結合待ちの本文
+    length = 0  # 結合後の本文の文字数
     
-    for entry in transcript[1:]:
-        if entry['speaker'] == current['speaker']:
-            # 同じ話者なら結合
-            current['text'] += ' ' + entry['text']
+    for entry in transcript:
+        if (current is not None
+                and entry['speaker'] == current['speaker']
+                and (max_gap_ms is None
+                     or _timestamp_to_ms(entry['start'])
+                     - _timestamp_to_ms(current['end']) <= max_gap_ms)
+                and (max_chars is None
+                     or length + 1 + len(entry['text']) <= max_chars)):
+            # 同じ話者なら本文をバッファに追加
+            fragments.append(entry['text'])
+            length += 1 + len(entry['text'])
             current['end'] = entry['end']  # 終了時刻を更新
-        else:
-            # 違う話者なら保存して新規開始
-            merged.append(current)
-            current = entry.copy()
-    
-    # 最後のエントリを追加
-    merged.append(current)
+            continue
+        
+        # 違う話者（または上限超過）なら確定して新規開始
+        if current is not None:
+            current['text'] = ' '.join(fragments)
+            yield current
+        current = entry.copy()
+        fragments = [entry['text']]
+        length = len(entry['text'])
     
-    return merged
+    # 最後のエントリを確定
+    if current is not None:
+        current['text'] = ' '.join(fragments)
+        yield current
 
 
 def get_speaker_icon(speaker_name, speaker_index):
@@ -192,6 +223,18 @@ def main():
         action='store_true',
         help='同一話者の連続発言を結合'
     )
+    parser.add_argument(
+        '--merge-max-gap',
+        type=float,
+        metavar='SECONDS',
+        help='--merge-speaker時、発言の間隔がこの秒数を超えたら結合しない'
+    )
+    parser.add_argument(
+        '--merge-max-chars',
+        type=int,
+        metavar='N',
+        help='--merge-speaker時、結合後の1発言の最大文字数'
+    )
     parser.add_argument(
         '--no-timestamp',
         action='store_true',
@@ -205,6 +248,11 @@ def main():
     
     args = parser.parse_args()
     
+    if args.merge_max_gap is not None and args.merge_max_gap < 0:
+        parser.error('--merge-max-gap には0以上の値を指定してください')
+    if args.merge_max_chars is not None and args.merge_max_chars <= 0:
+        parser.error('--merge-max-chars には正の値を指定してください')
+    
     # ファイル存在チェック
     if not args.input.exists():
         print(f'エラー: ファイルが見つかりません: {args.input}')
@@ -218,7 +266,10 @@ def main():
     # オプション: 連続話者を結合
     if args.merge_speaker:
         print('同一話者の連続発言を結合しています...')
-        transcript = merge_consecutive_speakers(transcript)
+        max_gap_ms = (int(args.merge_max_gap * 1000)
+                      if args.merge_max_gap is not None else None)
+        transcript = list(merge_consecutive_speakers(
+            transcript, max_gap_ms=max_gap_ms, max_chars=args.merge_max_chars))
         print(f'  → {len(transcript)}件に結合')
     
     # ChatView形式に変換
@@ -0,0 +1,80 @@
+"""
+話者ヘッダー判定（match_speaker_header）のファジングテスト
+
+1. ランダムな行で旧実装の正規表現 ^(.+?)\\s{2,}(\\d+:\\d+) と結果を比較
+2. バックトラックを誘発する入力で、処理時間が行の長さに対して線形であることを確認
+
+使い方:
+    python -m pytest tools/tests
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transcript2chatview import match_speaker_header  # noqa: E402
+
+# 旧実装のパターン（比較用）
+LEGACY_PATTERN = re.compile(r'^(.+?)\s{2,}(\d+:\d+)')
+
+ALPHABET = 'ab 田中:0123456789\t　'
+
+
+def test_matches_legacy_pattern(iterations=20000, seed=0):
+    """ランダムな行で旧実装と同じ話者名・タイムスタンプになるか確認"""
+    rng = random.Random(seed)
+    for _ in range(iterations):
+        line = ''.join(rng.choice(ALPHABET)
+                       for _ in range(rng.randint(1, 30))).strip()
+        if not line:
+            continue
+        legacy = LEGACY_PATTERN.match(line)
+        result = match_speaker_header(line)
+        if legacy is None:
+            assert result is None, (line, result)
+            continue
+        assert result is not None, (line, legacy.groups())
+        speaker, timestamp = result
+        assert speaker == legacy.group(1).strip(), (line, result)
+        # h:mm:ss にも対応したため、旧実装の mm:ss は前方一致で比較
+        assert timestamp.startswith(legacy.group(2)), (line, result)
+
+
+# 旧実装で O(n^2) のバックトラックが起きる行（n は行の長さの目安）
+ADVERSARIAL_LINES = {
+    'spaces': lambda n: 'a' + ' ' * n + 'x',
+    'repeated_gaps': lambda n: 'a' + '  1' * (n // 3) + 'x',
+    'spaces_then_digits': lambda n: 'a' + ' ' * n + '1' * n + 'x',
+    'mixed_whitespace': lambda n: '田中' + ' \t' * (n // 2),
+}
+
+
+def elapsed(line, repeat=5):
+    """判定にかかった最短時間（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        match_speaker_header(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize('make_line', ADVERSARIAL_LINES.values(),
+                         ids=ADVERSARIAL_LINES.keys())
+def test_linear_time(make_line, base=20000, factor=8, max_ratio=24):
+    """入力を factor 倍にしたときの時間の伸びが線形の範囲に収まるか確認"""
+    small = make_line(base)
+    large = make_line(base * factor)
+    t_small = max(elapsed(small), 1e-6)
+    t_large = elapsed(large)
+    ratio = t_large / t_small
+    # 二次時間なら factor**2 = 64 倍になる
+    assert ratio < max_ratio, (
+        f'not linear: len {len(small)} → {len(large)}: '
+        f'{t_small * 1e3:.3f}ms → {t_large * 1e3:.3f}ms (x{ratio:.1f})')
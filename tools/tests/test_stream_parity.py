@@ -0,0 +1,157 @@
+"""
+ストリーミング読み込み（--stream）とメッセージ索引（--message-index）のテスト
+
+1. 同じDOCXを python-docx（DOM）と --stream で変換し、マークダウンと
+   アイコンが一致することを確認（Teams形式 / WEBVTT形式 / 従来形式）
+2. .idx に記録したバイト位置と長さが、出力したマークダウンの各メッセージを
+   指していることを確認
+
+使い方:
+    python -m pytest tools/tests
+"""
+
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transcript2chatview import convert_file  # noqa: E402
+
+chatview_index = pytest.importorskip('chatview_index')
+
+SPEAKERS = ('田中太郎', '鈴木花子', 'Sato Jiro')
+
+
+def png_bytes(rgb):
+    """1ピクセルのPNG（アイコン画像の代わり）"""
+    def chunk(kind, data):
+        body = kind + data
+        return (struct.pack('>I', len(data)) + body
+                + struct.pack('>I', zlib.crc32(body) & 0xffffffff))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(b'\x00' + bytes(rgb)))
+            + chunk(b'IEND', b''))
+
+
+def build_teams_docx(path, tmp_path, count=120):
+    """Teams通常形式（アイコン画像 + "話者名  mm:ss" + 改行 + 本文）のDOCX"""
+    doc = Document()
+    icons = []
+    for i, _ in enumerate(SPEAKERS):
+        icon_path = tmp_path / f'icon{i}.png'
+        icon_path.write_bytes(png_bytes((60 * i, 120, 200)))
+        icons.append(icon_path)
+    for i in range(count):
+        # 同じ話者が続く区間も作る（結合と索引の境界の確認用）
+        speaker = (i // 3) % len(SPEAKERS)
+        paragraph = doc.add_paragraph()
+        paragraph.add_run().add_picture(str(icons[speaker]))
+        header = paragraph.add_run(f'{SPEAKERS[speaker]}  {i // 60}:{i % 60:02d}')
+        header.add_break(WD_BREAK.LINE)
+        paragraph.add_run(f'発言{i}です。')
+        if i % 10 == 0:
+            doc.add_paragraph('')
+    doc.save(path)
+
+
+def build_webvtt_docx(path, count=120):
+    """WEBVTT形式（タイムスタンプ行 + <v 話者名>本文</v>）のDOCX"""
+    doc = Document()
+    doc.add_paragraph('WEBVTT')
+    for i in range(count):
+        doc.add_paragraph(
+            f'00:{i // 60:02d}:{i % 60:02d}.000 --> 00:{i // 60:02d}:{i % 60:02d}.800\n'
+            f'<v {SPEAKERS[i % len(SPEAKERS)]}>発言{i}です。</v>')
+    doc.save(path)
+
+
+def build_legacy_docx(path, count=120):
+    """従来形式（タイムスタンプ / 話者名 / 本文 が別段落）のDOCX"""
+    doc = Document()
+    for i in range(count):
+        doc.add_paragraph(
+            f'0:{i // 60}:{i % 60}.000 --> 0:{i // 60}:{i % 60}.900')
+        doc.add_paragraph(SPEAKERS[(i // 2) % len(SPEAKERS)])
+        doc.add_paragraph(f'発言{i}です。')
+        doc.add_paragraph('')
+    doc.save(path)
+
+
+@pytest.fixture(params=['teams', 'webvtt', 'legacy'])
+def transcript_docx(request, tmp_path):
+    path = tmp_path / f'{request.param}.docx'
+    if request.param == 'teams':
+        build_teams_docx(path, tmp_path)
+    elif request.param == 'webvtt':
+        build_webvtt_docx(path)
+    else:
+        build_legacy_docx(path)
+    return path
+
+
+def icon_files(output_dir):
+    icons_dir = output_dir / 'icons'
+    if not icons_dir.is_dir():
+        return {}
+    return {path.name: path.read_bytes() for path in icons_dir.iterdir()}
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'merge_speaker': True},
+    {'embed_icons': True},
+])
+def test_stream_matches_dom(transcript_docx, tmp_path, options):
+    """--stream の出力が python-docx で読み込んだ場合と同じになる"""
+    dom_path = tmp_path / 'dom' / 'out.md'
+    stream_path = tmp_path / 'stream' / 'out.md'
+    dom_count = convert_file(transcript_docx, dom_path, verbose=False, **options)
+    stream_count = convert_file(transcript_docx, stream_path, stream=True,
+                                verbose=False, **options)
+
+    assert dom_count == stream_count > 0
+    assert stream_path.read_bytes() == dom_path.read_bytes()
+    assert icon_files(stream_path.parent) == icon_files(dom_path.parent)
+    if transcript_docx.stem == 'teams' and not options.get('embed_icons'):
+        assert len(icon_files(dom_path.parent)) == len(SPEAKERS)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+@pytest.mark.parametrize('merge_speaker', [False, True])
+def test_message_index_offsets(transcript_docx, tmp_path, stream, merge_speaker):
+    """.idx の各レコードがマークダウンのメッセージ（ヘッダー行と本文）を指す"""
+    output_path = tmp_path / 'out' / 'meeting.md'
+    count = convert_file(transcript_docx, output_path, stream=stream,
+                         merge_speaker=merge_speaker, message_index=True,
+                         verbose=False)
+    markdown = output_path.read_bytes()
+    headers = [i for i, line in enumerate(markdown.split(b'\n'))
+               if line.startswith(b'@')]
+
+    index_path = chatview_index.message_index_path(output_path)
+    with chatview_index.MessageIndex(index_path) as index:
+        messages = list(index)
+        assert len(messages) == count == len(headers)
+
+        end = 0
+        for message in messages:
+            # メッセージは重ならず、出力の順に並ぶ
+            assert message.offset >= end
+            end = message.offset + message.length
+            chunk = markdown[message.offset:end]
+            assert message.offset == 0 or markdown[message.offset - 1:message.offset] == b'\n'
+            assert markdown[end:end + 1] == b'\n'
+
+            header, _, body = chunk.decode('utf-8').partition('\n')
+            assert header.startswith('@')
+            assert message.speaker in header
+            assert body.strip()
+            assert index.read(message) == chunk.decode('utf-8')
+            assert message.start_ms <= message.end_ms
@@ -1,53 +1,863 @@
 #!/usr/bin/env python3
 """
-Microsoft Teams DOCX文字起こしをChatView形式のマークダウンに変換するツール
+Microsoft Teams DOCX文字起こし（およびWebVTT / SRT字幕）をChatView形式のマークダウンに変換するツール
 
 使い方:
-    python transcript2chatview.py input.docx -o output.md
+    python transcript2chatview.py input.docx -o output.md      # 形式（Teams / WEBVTT / 従来形式）は自動判定
+    python transcript2chatview.py meeting.vtt -o output.md     # WebVTT / SRT字幕を直接変換
     python transcript2chatview.py input.docx --merge-speaker   # 同一話者の連続発言を結合
+    python transcript2chatview.py input.docx --merge-speaker --merge-max-gap 30 --merge-max-chars 2000  # 結合の上限を指定
     python transcript2chatview.py input.docx --no-timestamp    # タイムスタンプ非表示
     python transcript2chatview.py input.docx --no-icon         # アイコン絵文字非表示
     python transcript2chatview.py input.docx --embed-icons     # アイコンをBase64で埋め込み（デフォルトは別ファイル保存）
+    python transcript2chatview.py input.docx --embed-icons --icon-refs  # 埋め込みアイコンを話者ごとに1回だけ定義
+    python transcript2chatview.py input.docx --icon-size 40 --icon-format webp  # アイコンを縮小・再圧縮（Pillowが必要）
+    python transcript2chatview.py input.docx --stream          # 巨大なDOCXをストリーミングで読み込み
+    python transcript2chatview.py input.docx -o meeting.md --page-minutes 30  # 30分ごとに meeting.part001.md … と目次に分割
+    python transcript2chatview.py input.docx -o meeting.md --message-index  # meeting.idx に各メッセージの位置・話者・時刻を記録
+    python transcript2chatview.py exports/ --output-dir out/ --index meetings.sqlite  # 発言を全文検索索引に登録
+    python transcript2chatview.py search meetings.sqlite 予算 見直し --speaker "田中"  # 索引から発言を検索
+    python transcript2chatview.py serve --port 8765 -j 4  # 常駐して POST /convert で変換（GET /stats で秒間件数とレイテンシ）
+    python transcript2chatview.py serve --socket /run/t2c.sock  # Unixソケットで待ち受け
+    python transcript2chatview.py serve --path-root /data  # POST /convert?path= で /data の下のファイルの変換を許可
+    python transcript2chatview.py input.docx -o out.md --svg out.svg  # 拡張機能と同じレイアウトのSVGも出力
+    python transcript2chatview.py input.docx -o out.md --svg out.svg --svg-font NotoSansCJK-Regular.ttc  # 折り返しに使うフォント
+    python transcript2chatview.py input.docx -o out.md --profile  # 段階ごとの処理時間をJSONで表示
+    python transcript2chatview.py input.docx -o out.md --profile-cprofile --profile-output prof.json  # pstatsも保存
+    python transcript2chatview.py input.docx -o out.md --profile --profile-memory  # 段階ごとのメモリ使用量も表示
+    python transcript2chatview.py exports/ --output-dir out/ -j 8  # ディレクトリを並列バッチ変換
+    python transcript2chatview.py "exports/**/*.docx"          # globパターンでバッチ変換
+    python transcript2chatview.py exports/ --force             # 変更のないファイルも再変換
+    python transcript2chatview.py exports/ --icon-workers 8    # アイコンを書き込むスレッド数
+    python transcript2chatview.py --watch inbox/ --output-dir out/ -j 4  # フォルダを監視して追加・変更されたファイルを変換
+    python transcript2chatview.py --watch //server/share/inbox --watch-poll  # ネットワーク共有はポーリングで監視
     python transcript2chatview.py input.docx --merge-speaker --no-timestamp --no-icon  # 複数オプション併用
 """
 
 import argparse
+import copy
+import glob
+import hashlib
+import importlib.util
+import io
+import itertools
+import json
+import os
 import re
 import base64
+import posixpath
+import signal
+import sys
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager, nullcontext
 from pathlib import Path
 from docx import Document
 from docx.oxml.ns import qn
+from lxml import etree
 
+try:
+    import resource  # Unix のみ（最大RSSの取得に使用）
+except ImportError:
+    resource = None
 
-def extract_paragraph_images(docx_file, output_dir=None, use_files=True):
+try:
+    from chatview_index import MessageIndexWriter, message_index_path  # --message-index でのみ使用
+except ImportError:
+    MessageIndexWriter = None
+
+
+# 話者ヘッダーの区切り（Teams形式: "話者名  mm:ss" または "話者名  h:mm:ss"）
+# 空白の連続は先頭位置からしか試さない（否定後読み）ため、本文のような
+# 長い行でもバックトラックせず行の長さに対して線形時間で判定できる
+SPEAKER_HEADER_PATTERN = re.compile(r'(?<!\s)\s{2,}(\d+:\d+(?::\d+)?)')
+
+# WEBVTT形式のタイムスタンプ行と話者タグ（<v 話者名>テキスト</v>）
+CUE_PATTERN = re.compile(r'(\d+:\d+:\d+\.\d+)\s*-->\s*(\d+:\d+:\d+\.\d+)')
+VOICE_PATTERN = re.compile(r'<v\s+([^>]+)>(.*?)</v>')
+
+# 字幕ファイル（.vtt / .srt）のタイミング行（VTTは時間の省略と "."、SRTは "," 区切り）
+CAPTION_TIMING_PATTERN = re.compile(
+    r'^((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})')
+# <v 話者名> / <v.クラス 話者名> の開始タグと、それ以外のタグ
+VOICE_TAG_PATTERN = re.compile(r'<v(?:\.[^\s>]*)?\s+([^>]+)>')
+CAPTION_TAG_PATTERN = re.compile(r'</?[^>]*>')
+
+# 話者タグのない字幕の話者名
+UNKNOWN_SPEAKER = '話者'
+
+# 対応する入力ファイルの拡張子
+DOCX_SUFFIXES = ('.docx',)
+CAPTION_SUFFIXES = ('.vtt', '.srt')
+INPUT_SUFFIXES = DOCX_SUFFIXES + CAPTION_SUFFIXES
+
+# 形式判定に使う先頭の段落数（空段落を除く）
+FORMAT_SNIFF_PARAGRAPHS = 50
+
+# DOCX (OOXML) の名前空間
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+
+
+def match_speaker_header(line):
+    """
+    行がTeams形式の話者ヘッダーなら話者名とタイムスタンプを返す
+    
+    最初の「2文字以上の空白 + タイムスタンプ」より前を話者名とする。
+    
+    Args:
+        line: 段落の1行目
+        
+    Returns:
+        tuple: (話者名, タイムスタンプ文字列)、ヘッダーでなければNone
+    """
+    # 話者名は1文字以上必要なので2文字目から探す
+    header_match = SPEAKER_HEADER_PATTERN.search(line, 1)
+    if header_match is None:
+        return None
+    return line[:header_match.start()].strip(), header_match.group(1)
+
+
+def parse_timestamp_ms(timestamp):
+    """
+    タイムスタンプ文字列をミリ秒に変換
+    
+    "mm:ss"、"h:mm:ss"、"h:mm:ss.fff"（SRTの "," 区切りも可）に対応
+    
+    Args:
+        timestamp: タイムスタンプ文字列
+        
+    Returns:
+        int: ミリ秒
+    """
+    seconds_part, _, fraction = timestamp.strip().replace(',', '.').partition('.')
+    total = 0
+    for part in seconds_part.split(':'):
+        total = total * 60 + int(part)
+    millis = int((fraction + '000')[:3]) if fraction else 0
+    return total * 1000 + millis
+
+
+def format_timestamp_ms(ms):
+    """
+    ミリ秒を HH:MM:SS.mmm 形式に変換
+    
+    Args:
+        ms: ミリ秒
+        
+    Returns:
+        str: タイムスタンプ文字列（例: 00:02:27.000）
+    """
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}'
+
+
+class Utterance(namedtuple('Utterance', 'start_ms end_ms speaker text icon',
+                           defaults=('',))):
+    """
+    文字起こしの1発言
+
+    開始・終了時刻は整数ミリ秒で保持し、HH:MM:SS.mmm への整形は
+    マークダウン出力時にだけ行う。話者名は sys.intern で共有するため、
+    同じ話者の発言が何千件あっても文字列は1つだけになる。話者を整数IDに
+    しないのは、マークダウン・索引・全文検索のどれもが話者名を必要とし、
+    IDにすると名前の表を各段階に持ち回ることになるため（1発言あたりの
+    メモリは参照1つで同じ）。
+
+    Attributes:
+        start_ms: 開始時刻（ミリ秒）
+        end_ms: 終了時刻（ミリ秒）
+        speaker: 話者名（intern済み）
+        text: 発言内容
+        icon: アイコンのパスまたはdata URI（なければ空文字）
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_strings(cls, start, end, speaker, text, icon=''):
+        """タイムスタンプ文字列から Utterance を作成"""
+        return cls(parse_timestamp_ms(start), parse_timestamp_ms(end),
+                   sys.intern(speaker), text, icon)
+
+    @property
+    def start(self):
+        """開始時刻（HH:MM:SS.mmm）"""
+        return format_timestamp_ms(self.start_ms)
+
+    @property
+    def end(self):
+        """終了時刻（HH:MM:SS.mmm）"""
+        return format_timestamp_ms(self.end_ms)
+
+
+class ConversionProfile:
+    """
+    変換の段階ごとの処理時間と件数を記録する（--profile）
+
+    段階は入れ子にでき、内側の段階の時間は外側の段階から差し引く。
+    パース → 結合 → 変換 → 書き出しはジェネレーターでつながっていて
+    処理が交互に進むため、各段階の正味の時間はこの方法でしか求められない。
+    enabled=False の場合は何も記録せず、計測のオーバーヘッドもない。
+
+    trace_memory=True の場合は tracemalloc で段階ごとの割り当て量
+    （段階終了時の現在値と、その段階の実行中のピーク）も記録し、
+    段階の終了時点で割り当てが最も多かったときの上位の割り当て箇所を報告する。
+    lxml（libxml2）が確保するDOMのメモリは tracemalloc では追跡できない
+    ため、プロセスの最大RSSの増加分も段階ごとに記録する。
+    """
+
+    # レポートに出力する段階の順序
+    STAGES = ('load', 'detect', 'parse', 'images', 'merge', 'render', 'write', 'index')
+
+    # 割り当て箇所を報告する件数
+    TOP_ALLOCATIONS = 10
+
+    # 前回のスナップショットからこの倍率以上に増えたら取り直す
+    # （スナップショットの回数は割り当て量の対数に比例する）
+    SNAPSHOT_GROWTH = 1.5
+
+    def __init__(self, enabled=True, trace_memory=False):
+        """
+        Args:
+            enabled: Falseの場合は何も記録しない
+            trace_memory: Trueの場合は tracemalloc でメモリ使用量も記録する
+        """
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = {}  # 段階名 -> {'wall_s', 'cpu_s', 'calls'}
+        self.counters = {}
+        self.memory = {}  # 段階名 -> {'current_bytes', 'peak_bytes', 'rss_growth_bytes'}
+        self._stack = []  # [段階名, 開始wall, 開始cpu, 内側のwall, 内側のcpu]
+        self._peak_bytes = 0
+        self._rss_bytes = _max_rss_bytes() if self.trace_memory else 0
+        self._snapshot = None
+        self._snapshot_stage = None
+        self._snapshot_bytes = 0
+        self._started_tracing = False
+        if self.trace_memory:
+            import tracemalloc  # --profile-memory でのみ使用
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._wall_end = None
+        self._cpu_end = None
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextmanager
+    def _measure(self, name):
+        if self.trace_memory:
+            # ここまでの区間のピークは外側の段階のもの
+            self._memory_checkpoint()
+        frame = [name, time.perf_counter(), time.process_time(), 0.0, 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - frame[1]
+            cpu = time.process_time() - frame[2]
+            if self.trace_memory:
+                overhead = time.perf_counter()
+                self._memory_checkpoint(stage_end=True)
+                overhead = time.perf_counter() - overhead
+            else:
+                overhead = 0.0
+            self._stack.pop()
+            stats = self.stages.setdefault(
+                name, {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0})
+            stats['wall_s'] += wall - frame[3]
+            stats['cpu_s'] += cpu - frame[4]
+            stats['calls'] += 1
+            if self._stack:
+                # スナップショットにかかった時間も外側の段階には含めない
+                self._stack[-1][3] += wall + overhead
+                self._stack[-1][4] += cpu + overhead
+
+    def _memory_checkpoint(self, stage_end=False):
+        """
+        前回のチェックポイントからの割り当てのピークを実行中の段階に記録
+
+        stage_end=True の場合は段階終了時の現在値も記録し、割り当て量が
+        十分に増えていればスナップショットを取り直す。
+        """
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self._peak_bytes = max(self._peak_bytes, peak)
+        rss = _max_rss_bytes()
+        rss_growth = rss - self._rss_bytes
+        self._rss_bytes = rss
+        if not self._stack:
+            return
+        
+        name = self._stack[-1][0]
+        memory = self.memory.setdefault(
+            name, {'current_bytes': 0, 'peak_bytes': 0, 'rss_growth_bytes': 0})
+        memory['peak_bytes'] = max(memory['peak_bytes'], peak)
+        memory['rss_growth_bytes'] += rss_growth
+        if not stage_end:
+            return
+        
+        memory['current_bytes'] = current
+        if (self._snapshot is None
+                or current >= self._snapshot_bytes * self.SNAPSHOT_GROWTH):
+            self._snapshot = tracemalloc.take_snapshot()
+            self._snapshot_stage = name
+            self._snapshot_bytes = current
+
+    def stage(self, name):
+        """with文の間を段階 name の時間として記録するコンテキストマネージャー"""
+        if not self.enabled:
+            return nullcontext()
+        return self._measure(name)
+
+    def timed(self, iterable, name):
+        """
+        イテラブルの各要素の取り出しにかかった時間を段階 name として記録
+
+        取り出した要素を受け取る側の処理時間は含まない。
+        """
+        if not self.enabled:
+            return iterable
+        return self._timed(iter(iterable), name)
+
+    def _timed(self, iterator, name):
+        while True:
+            with self._measure(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, key, n=1):
+        """カウンター key に n を加える"""
+        if self.enabled:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def set(self, key, value):
+        """カウンター key を value にする"""
+        if self.enabled:
+            self.counters[key] = value
+
+    def stop(self):
+        """計測を終了する（このインスタンスが開始した tracemalloc も止める）"""
+        if self._wall_end is not None:
+            return
+        self._wall_end = time.perf_counter()
+        self._cpu_end = time.process_time()
+        if self.trace_memory:
+            self._memory_checkpoint()
+            if self._started_tracing:
+                import tracemalloc
+                tracemalloc.stop()
+
+    def _top_allocations(self):
+        """割り当て量が最大だった時点のスナップショットの上位の割り当て箇所"""
+        if self._snapshot is None:
+            return []
+        import tracemalloc
+        snapshot = self._snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+        return [
+            {
+                'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                'size_bytes': stat.size,
+                'count': stat.count,
+            }
+            for stat in snapshot.statistics('lineno')[:self.TOP_ALLOCATIONS]
+        ]
+
+    def report(self):
+        """
+        計測結果をJSONに変換できるdictで返す
+
+        Returns:
+            dict: {'wall_s', 'cpu_s', 'stages': {段階名: {...}}, 'counters': {...}}
+                  trace_memory=True の場合は 'memory' も含む
+        """
+        wall_end = self._wall_end if self._wall_end is not None else time.perf_counter()
+        cpu_end = self._cpu_end if self._cpu_end is not None else time.process_time()
+        order = {name: i for i, name in enumerate(self.STAGES)}
+        stages = {}
+        for name in sorted(self.stages, key=lambda n: order.get(n, len(order))):
+            stages[name] = {
+                key: round(value, 6) if isinstance(value, float) else value
+                for key, value in self.stages[name].items()}
+            if name in self.memory:
+                stages[name]['memory'] = dict(self.memory[name])
+        report = {
+            'wall_s': round(wall_end - self._wall_start, 6),
+            'cpu_s': round(cpu_end - self._cpu_start, 6),
+            'stages': stages,
+            'counters': dict(self.counters),
+        }
+        if self.trace_memory:
+            report['memory'] = {
+                'peak_bytes': self._peak_bytes,
+                'max_rss_bytes': self._rss_bytes,
+                'top_allocations_stage': self._snapshot_stage,
+                'top_allocations_current_bytes': self._snapshot_bytes,
+                'top_allocations': self._top_allocations(),
+            }
+        return report
+
+
+def _max_rss_bytes():
+    """プロセスの最大RSS（バイト、取得できない環境では0）"""
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS はバイト、Linux などはキロバイト
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+# 計測しない場合に使う共有インスタンス
+_NO_PROFILE = ConversionProfile(enabled=False)
+
+
+class DocxConversionContext:
+    """
+    1回の変換で共有するDOCXコンテキスト
+
+    DOCXパッケージを一度だけ開いてXMLを構築し、画像抽出・本文パース・
+    形式判定の各処理に同じ段落リストと画像リレーションシップを渡す。
+    """
+
+    def __init__(self, docx_file):
+        """
+        Args:
+            docx_file: DOCXファイルのパス
+        """
+        self.path = docx_file
+        self.document = Document(docx_file)
+        self.paragraphs = self.document.paragraphs
+        self._paragraph_texts = None
+        self._image_parts = None
+
+    @classmethod
+    def open(cls, source):
+        """
+        パスまたは既存のコンテキストからコンテキストを取得
+
+        Args:
+            source: DOCXファイルのパス、またはDocxConversionContext
+
+        Returns:
+            DocxConversionContext: 既存のコンテキストならそのまま返す
+        """
+        if isinstance(source, cls):
+            return source
+        return cls(source)
+
+    @property
+    def paragraph_texts(self):
+        """段落テキストのリスト（para.textの再構築は初回のみ）"""
+        if self._paragraph_texts is None:
+            self._paragraph_texts = [para.text for para in self.paragraphs]
+        return self._paragraph_texts
+
+    def paragraph_image_ids(self, para_idx):
+        """
+        段落内の画像のrIdを出現順に返す（最初のdrawingを優先）
+        
+        Args:
+            para_idx: 段落のインデックス
+            
+        Returns:
+            list: [rId, ...]
+        """
+        return paragraph_image_ids(self.paragraphs[para_idx]._element)
+
+    @property
+    def image_parts(self):
+        """画像リレーションシップ {rId: ImagePart}"""
+        if self._image_parts is None:
+            self._image_parts = {}
+            for rel in self.document.part.rels.values():
+                if "image" in rel.reltype.lower():
+                    self._image_parts[rel.rId] = rel.target_part
+        return self._image_parts
+
+
+def write_icon_file(icon_path, image_data):
+    """
+    アイコン画像を書き込む（一時ファイルに書いてから置き換え）
+    
+    並列変換や複数スレッドで同じ画像を書き込んでも壊れたファイルが
+    見えることはない。
+    
+    Args:
+        icon_path: 保存先のパス
+        image_data: 画像のバイト列
+    """
+    icon_path = Path(icon_path)
+    icon_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = icon_path.with_name(
+        f".{icon_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(image_data)
+    os.replace(tmp_path, icon_path)
+
+
+class IconWriter:
+    """
+    アイコン画像の書き込みをスレッドプールで行う
+    
+    ファイル名は画像のハッシュから決まるため、マークダウンに書く参照パスは
+    書き込みの完了を待たずに返せる。パースは書き込みの完了を待たずに続き、
+    flush() で全件の完了を待つ（失敗した書き込みがあればここで例外になる）。
+    ネットワークドライブなど書き込みの遅い出力先でもパースが止まらない。
+    
+    未完了の書き込みは max_pending 件までで、それを超えると空きを待つ。
+    """
+
+    def __init__(self, max_workers=4, max_pending=None):
+        """
+        Args:
+            max_workers: 書き込みスレッド数
+            max_pending: 未完了の書き込みの上限（Noneの場合は max_workers の4倍）
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='icon-writer')
+        self._slots = threading.BoundedSemaphore(max_pending or max_workers * 4)
+        self._futures = []
+        self._pending_paths = set()
+
+    def write(self, icon_path, image_data):
+        """
+        アイコン画像の書き込みを予約する（同じパスへの書き込みは1回だけ）
+        
+        Returns:
+            bool: 新たに書き込みを予約した場合はTrue
+        """
+        icon_path = Path(icon_path)
+        if icon_path in self._pending_paths:
+            return False
+        self._pending_paths.add(icon_path)
+        self._slots.acquire()
+        future = self._executor.submit(write_icon_file, icon_path, image_data)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        return True
+
+    def is_pending(self, icon_path):
+        """書き込みを予約済みのパスならTrue"""
+        return Path(icon_path) in self._pending_paths
+
+    def flush(self):
+        """予約済みの書き込みがすべて完了するまで待つ"""
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        """書き込みの完了を待ってスレッドを終了する"""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # 変換自体が失敗した場合は書き込みの例外で上書きしない
+            self._executor.shutdown(wait=True)
+
+
+def has_pillow():
+    """Pillowがインストールされているか（読み込みは実際に画像を変換するときまで遅らせる）"""
+    return importlib.util.find_spec('PIL') is not None
+
+
+class IconNormalizer:
+    """
+    アイコン画像を表示サイズに縮小・再圧縮する（--icon-size / --icon-format）
+    
+    Teamsはプロフィール画像を元の解像度のまま埋め込むが、ChatViewでは
+    20px程度で表示するため、Pillowで正方形に切り抜いて縮小し、PNGまたは
+    WebPで保存し直す。元画像より小さくする場合だけ縮小し、拡大はしない。
+    結果は元画像のSHA-1ごとにキャッシュし、同じ画像は1回だけ処理する。
+    """
+
+    FORMATS = {'png': 'image/png', 'webp': 'image/webp'}
+
+    def __init__(self, size=None, image_format='png'):
+        """
+        Args:
+            size: 一辺の最大ピクセル数（Noneの場合は縮小せず再圧縮のみ）
+            image_format: 出力形式（'png' または 'webp'）
+            
+        Raises:
+            RuntimeError: Pillowがない、またはWebPに対応していない場合
+        """
+        try:
+            from PIL import features
+        except ImportError:
+            raise RuntimeError(
+                '--icon-size / --icon-format には Pillow が必要です（pip install Pillow）') from None
+        if image_format not in self.FORMATS:
+            raise ValueError(f'未対応のアイコン形式です: {image_format}')
+        if image_format == 'webp' and not features.check('webp'):
+            raise RuntimeError('インストールされているPillowはWebPに対応していません')
+        self.size = size
+        self.format = image_format
+        self.content_type = self.FORMATS[image_format]
+        self._cache = {}  # 元画像のSHA-1 -> 変換後のバイト列（変換できなければNone）
+
+    def filename(self, digest):
+        """
+        変換後のアイコンのファイル名（元画像のハッシュと変換条件から決まる）
+        
+        ファイルがすでにあれば、次回以降は画像を変換せずに再利用できる。
+        """
+        tag = f'{self.size}px' if self.size else 'orig'
+        return f'{digest}.{tag}.{self.format}'
+
+    def normalize(self, image_data, digest):
+        """
+        画像を縮小・再圧縮する
+        
+        Args:
+            image_data: 元画像のバイト列
+            digest: 元画像のSHA-1（16進数）
+            
+        Returns:
+            bytes: 変換後の画像（読み込めない形式の場合はNone）
+        """
+        if digest in self._cache:
+            return self._cache[digest]
+        
+        from PIL import Image, ImageOps
+        try:
+            with Image.open(io.BytesIO(image_data)) as img:
+                img.load()
+                if self.size and (img.width > self.size or img.height > self.size):
+                    img = ImageOps.fit(img, (self.size, self.size),
+                                       Image.Resampling.LANCZOS)
+                if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                    img = img.convert('RGBA')
+                output = io.BytesIO()
+                if self.format == 'webp':
+                    img.save(output, 'WEBP', quality=85, method=6)
+                else:
+                    img.save(output, 'PNG', optimize=True)
+                result = output.getvalue()
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # EMFなどPillowで読めない画像は元のまま使う
+            result = None
+        
+        self._cache[digest] = result
+        return result
+
+
+def store_icon_image(image_data, content_type, output_dir=None,
+                     use_files=True, icons_dir=None, profile=None,
+                     icon_writer=None, icon_normalizer=None):
+    """
+    アイコン画像をコンテンツアドレス方式で保存、またはBase64エンコード
+    
+    ファイルは画像バイト列のSHA-1をファイル名として保存する
+    （例: icons/<sha1>.png）。同じ画像は何度現れても1回しか書き込まず、
+    同じアイコンディレクトリを使う会議間でも共有される。
+    
+    Args:
+        image_data: 画像のバイト列
+        content_type: 画像のContent-Type（例: image/png）
+        output_dir: マークダウンの出力ディレクトリ（参照パスの基準）
+        use_files: Trueの場合はファイルとして保存、Falseの場合はBase64エンコード
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+        profile: 書き込んだ画像数を記録するConversionProfile
+        icon_writer: 書き込みを任せるIconWriter（Noneの場合はその場で書き込む）
+        icon_normalizer: 縮小・再圧縮に使うIconNormalizer（Noneの場合は元のまま）
+        
+    Returns:
+        dict: {'path': str} or {'data_uri': str, 'content_type': str}
+    """
+    if profile is None:
+        profile = _NO_PROFILE
+    
+    digest = hashlib.sha1(image_data).hexdigest()
+    
+    if use_files and output_dir:
+        # ファイルとして保存（内容のハッシュをファイル名にする）
+        icons_dir = Path(icons_dir) if icons_dir else Path(output_dir) / 'icons'
+        icon_path = None
+        if icon_normalizer is not None:
+            # 変換済みのファイルがあれば画像を変換せずに再利用
+            icon_path = icons_dir / icon_normalizer.filename(digest)
+            if not icon_path.exists() and not (
+                    icon_writer is not None and icon_writer.is_pending(icon_path)):
+                normalized = icon_normalizer.normalize(image_data, digest)
+                if normalized is None:
+                    icon_path = None
+                else:
+                    image_data = normalized
+                    profile.count('images_normalized')
+        if icon_path is None:
+            ext = content_type.split('/')[-1]
+            icon_path = icons_dir / f"{digest}.{ext}"
+        
+        pending = icon_writer is not None and icon_writer.is_pending(icon_path)
+        if not pending and not icon_path.exists():
+            if icon_writer is not None:
+                icon_writer.write(icon_path, image_data)
+            else:
+                write_icon_file(icon_path, image_data)
+            profile.count('images_written')
+            profile.count('image_bytes_written', len(image_data))
+        
+        # マークダウンからの相対パス（区切りは常に /）
+        rel_path = os.path.relpath(icon_path, output_dir)
+        return {'path': Path(rel_path).as_posix()}
+    
+    if icon_normalizer is not None:
+        normalized = icon_normalizer.normalize(image_data, digest)
+        if normalized is not None:
+            image_data = normalized
+            content_type = icon_normalizer.content_type
+            profile.count('images_normalized')
+    
+    # Base64エンコード
+    base64_image = base64.b64encode(image_data).decode('utf-8')
+    data_uri = f"data:{content_type};base64,"
+    data_uri += f"{base64_image}"
+    
+    return {
+        'data_uri': data_uri,
+        'content_type': content_type
+    }
+
+
+_BLIP_EMBED_XPATH = etree.XPath(
+    './/w:drawing//a:blip/@r:embed',
+    namespaces={'w': W_NS, 'a': A_NS, 'r': R_NS})
+
+
+def paragraph_image_ids(p_element):
+    """
+    w:p要素に含まれる画像のrIdを出現順に取得
+    
+    Args:
+        p_element: 段落のw:p要素
+        
+    Returns:
+        list: [rId, ...]
+    """
+    return [str(rid) for rid in _BLIP_EMBED_XPATH(p_element)]
+
+
+class SpeakerIconResolver:
+    """
+    話者の初出時にだけ画像を取り出してアイコンを登録する
+
+    パーサーが話者を検出したときに呼び出し、まだアイコンのない話者の
+    段落からだけ画像を読み込む。全話者のアイコンが決まった後は
+    段落内の画像を探索しないため、画像処理は話者数に比例する。
+    """
+
+    def __init__(self, load_image, output_dir=None, use_files=True,
+                 icons_dir=None, profile=None, icon_writer=None,
+                 icon_normalizer=None):
+        """
+        Args:
+            load_image: rIdを受け取り (画像バイト列, content_type) または
+                        Noneを返す関数
+            output_dir: マークダウンの出力ディレクトリ
+            use_files: Trueの場合はファイルとして保存、Falseの場合はBase64エンコード
+            icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+            profile: 画像処理の時間と件数を記録するConversionProfile
+            icon_writer: 書き込みを任せるIconWriter（Noneの場合はその場で書き込む）
+            icon_normalizer: 縮小・再圧縮に使うIconNormalizer（Noneの場合は元のまま）
+        """
+        self.load_image = load_image
+        self.output_dir = output_dir
+        self.use_files = use_files
+        self.icons_dir = icons_dir
+        self.profile = profile if profile is not None else _NO_PROFILE
+        self.icon_writer = icon_writer
+        self.icon_normalizer = icon_normalizer
+        self.speaker_icons = {}  # 話者名 -> path or data_uri
+        self._stored = {}  # rId -> path or data_uri
+
+    def icon_for(self, speaker, image_ids):
+        """
+        話者のアイコン参照を返す（未登録ならこの段落の画像から登録）
+        
+        Args:
+            speaker: 話者名
+            image_ids: 段落内の画像rIdのリストを返す関数（必要なときだけ呼ぶ）
+            
+        Returns:
+            str: アイコンのパスまたはdata URI（画像がなければ空文字）
+        """
+        if speaker in self.speaker_icons:
+            return self.speaker_icons[speaker]
+        
+        for embed_id in image_ids():
+            if embed_id not in self._stored:
+                with self.profile.stage('images'):
+                    image = self.load_image(embed_id)
+                    if image is None:
+                        continue
+                    image_data, content_type = image
+                    img_info = store_icon_image(
+                        image_data, content_type, self.output_dir,
+                        use_files=self.use_files, icons_dir=self.icons_dir,
+                        profile=self.profile, icon_writer=self.icon_writer,
+                        icon_normalizer=self.icon_normalizer)
+                self.profile.count('images_loaded')
+                self._stored[embed_id] = img_info.get(
+                    'path', img_info.get('data_uri'))
+            self.speaker_icons[speaker] = self._stored[embed_id]
+            return self.speaker_icons[speaker]  # 最初の画像のみ使用
+        
+        return ''
+
+
+def extract_paragraph_images(docx_file, output_dir=None, use_files=True,
+                             icons_dir=None, icon_writer=None,
+                             icon_normalizer=None):
     """
     DOCXファイルから段落ごとに画像を抽出
     
     Args:
-        docx_file: DOCXファイルのパス
+        docx_file: DOCXファイルのパス、またはDocxConversionContext
         output_dir: 画像ファイルを保存するディレクトリ（use_files=Trueの場合）
         use_files: Trueの場合はファイルとして保存、Falseの場合はBase64エンコード
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+        icon_writer: 書き込みを任せるIconWriter（Noneの場合はその場で書き込む。
+                     渡した場合は呼び出し側で flush() してからファイルを使う）
+        icon_normalizer: 縮小・再圧縮に使うIconNormalizer（Noneの場合は元のまま）
         
     Returns:
         dict: {paragraph_index: {'path': str} or {'data_uri': str, 'content_type': str}}
     """
-    doc = Document(docx_file)
+    ctx = DocxConversionContext.open(docx_file)
     
     # すべての画像リレーションシップを取得
-    image_parts = {}
-    for rel in doc.part.rels.values():
-        if "image" in rel.reltype.lower():
-            image_parts[rel.rId] = rel.target_part
-    
-    # 画像保存用ディレクトリを作成
-    if use_files and output_dir:
-        icons_dir = Path(output_dir) / 'icons'
-        icons_dir.mkdir(parents=True, exist_ok=True)
+    image_parts = ctx.image_parts
     
     # 段落ごとに画像を抽出
     paragraph_images = {}
+    stored_images = {}  # rId -> 保存結果（同じ画像は1回だけ処理）
     
-    for para_idx, para in enumerate(doc.paragraphs):
+    for para_idx, para in enumerate(ctx.paragraphs):
         # 段落内のdrawing要素を検索
         para_element = para._element
         ns = {
@@ -66,33 +876,14 @@ def extract_paragraph_images(docx_file, output_dir=None, use_files=True):
             for blip in blips:
                 embed_id = blip.get(qn('r:embed'))
                 if embed_id and embed_id in image_parts:
-                    image_part = image_parts[embed_id]
-                    image_data = image_part.blob
-                    content_type = image_part.content_type
-                    
-                    if use_files and output_dir:
-                        # ファイルとして保存
-                        ext = content_type.split('/')[-1]
-                        icon_filename = f"speaker_{para_idx:03d}.{ext}"
-                        icon_path = icons_dir / icon_filename
-                        
-                        with open(icon_path, 'wb') as f:
-                            f.write(image_data)
-                        
-                        paragraph_images[para_idx] = {
-                            'path': f"icons/{icon_filename}"
-                        }
-                    else:
-                        # Base64エンコード
-                        base64_image = base64.b64encode(
-                            image_data).decode('utf-8')
-                        data_uri = f"data:{content_type};base64,"
-                        data_uri += f"{base64_image}"
-                        
-                        paragraph_images[para_idx] = {
-                            'data_uri': data_uri,
-                            'content_type': content_type
-                        }
+                    if embed_id not in stored_images:
+                        image_part = image_parts[embed_id]
+                        stored_images[embed_id] = store_icon_image(
+                            image_part.blob, image_part.content_type,
+                            output_dir, use_files=use_files,
+                            icons_dir=icons_dir, icon_writer=icon_writer,
+                            icon_normalizer=icon_normalizer)
+                    paragraph_images[para_idx] = stored_images[embed_id]
                     break  # 最初の画像のみ使用
             
             if para_idx in paragraph_images:
@@ -101,343 +892,1818 @@ def extract_paragraph_images(docx_file, output_dir=None, use_files=True):
     return paragraph_images
 
 
-def parse_teams_docx_simple(docx_file, output_dir=None, use_icon_files=True):
+def parse_teams_docx_simple(docx_file, output_dir=None, use_icon_files=True,
+                            icons_dir=None):
+    """
+    Teams通常形式のDOCXファイルをパース（iter_teams_docx_simple のリスト版）
+    
+    Args:
+        docx_file: DOCXファイルパス、またはDocxConversionContext
+        output_dir: アイコン画像を保存するディレクトリ
+        use_icon_files: Trueの場合は画像ファイルとして保存、
+                        Falseの場合はBase64埋め込み
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+        
+    Returns:
+        list: [Utterance, ...]
+    """
+    return list(iter_teams_docx_simple(
+        docx_file, output_dir, use_icon_files=use_icon_files,
+        icons_dir=icons_dir))
+
+
+def iter_teams_docx_simple(docx_file, output_dir=None, use_icon_files=True,
+                           icons_dir=None, profile=None, icon_writer=None,
+                           icon_normalizer=None):
     """
-    Teams通常形式のDOCXファイルをパース
+    Teams通常形式のDOCXファイルをパース（ジェネレーター）
     話者名 タイムスタンプ
     本文
     の形式に対応（1つの段落内に改行で含まれる場合も対応）
     画像アイコンも抽出して話者と紐づけ
     
     Args:
-        docx_file: DOCXファイルパス
+        docx_file: DOCXファイルパス、またはDocxConversionContext
         output_dir: アイコン画像を保存するディレクトリ
         use_icon_files: Trueの場合は画像ファイルとして保存、
                         Falseの場合はBase64埋め込み
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+        profile: 処理時間と件数を記録するConversionProfile
+        icon_writer: アイコンの書き込みを任せるIconWriter（Noneの場合はその場で書き込む）
+        icon_normalizer: アイコンの縮小・再圧縮に使うIconNormalizer（Noneの場合は元のまま）
+        
+    Yields:
+        Utterance: 発言
     """
-    doc = Document(docx_file)
+    if profile is None:
+        profile = _NO_PROFILE
     
-    # 段落ごとの画像を抽出
-    paragraph_images = extract_paragraph_images(
-        docx_file, output_dir, use_files=use_icon_files)
+    with profile.stage('load'):
+        ctx = DocxConversionContext.open(docx_file)
+        image_parts = ctx.image_parts
+        paragraph_texts = ctx.paragraph_texts
+    profile.set('paragraphs', len(paragraph_texts))
+    profile.set('images_found', len(image_parts))
     
-    transcript = []
-    speaker_icons = {}  # 話者名 -> path or data_uri のマッピング
+    def load_image(embed_id):
+        image_part = image_parts.get(embed_id)
+        if image_part is None:
+            return None
+        return image_part.blob, image_part.content_type
     
-    # 話者情報のパターン
-    speaker_pattern = re.compile(r'^(.+?)\s{2,}(\d+:\d+)')
+    # 画像は話者の初出時にだけ取り出す（同じコンテキストを共有）
+    icons = SpeakerIconResolver(
+        load_image, output_dir, use_files=use_icon_files, icons_dir=icons_dir,
+        profile=profile, icon_writer=icon_writer,
+        icon_normalizer=icon_normalizer)
     
-    for para_idx, para in enumerate(doc.paragraphs):
-        text = para.text.strip()
+    for para_idx, para_text in enumerate(paragraph_texts):
+        text = para_text.strip()
         if not text:
             continue
         
-        # 段落内の改行で分割
-        lines = text.split('\n')
+        # 最初の行が話者情報かチェック（1段落につき1回だけ判定）
+        first_line, _, rest = text.partition('\n')
+        header = match_speaker_header(first_line)
+        if header is None:
+            continue
         
-        # 最初の行が話者情報かチェック
-        if lines and speaker_pattern.match(lines[0]):
-            first_line = lines[0]
-            speaker_match = speaker_pattern.match(first_line)
-            
-            if speaker_match:
-                speaker = speaker_match.group(1).strip()
-                timestamp = '00:' + speaker_match.group(2)  # 00:を追加
+        speaker, timestamp = header  # mm:ss または h:mm:ss
+        
+        # 初めて見る話者の場合のみ、この段落の画像をアイコンとして登録
+        icon_ref = icons.icon_for(
+            speaker, lambda: ctx.paragraph_image_ids(para_idx))
+        
+        # 残りの行を本文とする
+        content = rest.strip()
+        
+        if content:  # 本文がある場合のみ追加
+            start_ms = parse_timestamp_ms(timestamp)
+            yield Utterance(
+                start_ms, start_ms, sys.intern(speaker), content, icon_ref)
+
+
+def _read_docx_image_targets(zf):
+    """
+    DOCXパッケージから画像リレーションシップを読み込む
+    
+    Args:
+        zf: 開いているzipfile.ZipFile
+        
+    Returns:
+        dict: {rId: (パッケージ内パス, content_type)}
+    """
+    # Content-Typeの対応表（拡張子の既定値と個別指定）
+    defaults = {}
+    overrides = {}
+    ct_root = etree.fromstring(zf.read('[Content_Types].xml'))
+    for elem in ct_root:
+        if elem.tag == f'{{{CT_NS}}}Default':
+            defaults[elem.get('Extension', '').lower()] = elem.get('ContentType')
+        elif elem.tag == f'{{{CT_NS}}}Override':
+            overrides[elem.get('PartName', '').lstrip('/')] = elem.get('ContentType')
+    
+    try:
+        rels_root = etree.fromstring(zf.read('word/_rels/document.xml.rels'))
+    except KeyError:
+        return {}
+    
+    targets = {}
+    for rel in rels_root.iter(f'{{{PKG_REL_NS}}}Relationship'):
+        if 'image' not in rel.get('Type', '').lower():
+            continue
+        if rel.get('TargetMode') == 'External':
+            continue
+        part_name = posixpath.normpath(posixpath.join('word', rel.get('Target')))
+        ext = part_name.rsplit('.', 1)[-1].lower()
+        content_type = overrides.get(part_name) or defaults.get(ext, f'image/{ext}')
+        targets[rel.get('Id')] = (part_name, content_type)
+    
+    return targets
+
+
+def _run_text(run):
+    """w:r要素のテキストを python-docx の Run.text と同じ規則で取得"""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == f'{{{W_NS}}}t':
+            parts.append(child.text or '')
+        elif tag in (f'{{{W_NS}}}tab', f'{{{W_NS}}}ptab'):
+            parts.append('\t')
+        elif tag == f'{{{W_NS}}}br':
+            if child.get(f'{{{W_NS}}}type', 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag == f'{{{W_NS}}}cr':
+            parts.append('\n')
+        elif tag == f'{{{W_NS}}}noBreakHyphen':
+            parts.append('-')
+    return ''.join(parts)
+
+
+def _paragraph_text(p):
+    """w:p要素のテキストを python-docx の Paragraph.text と同じ規則で取得"""
+    parts = []
+    for child in p:
+        if child.tag == f'{{{W_NS}}}r':
+            parts.append(_run_text(child))
+        elif child.tag == f'{{{W_NS}}}hyperlink':
+            for run in child.iterchildren(f'{{{W_NS}}}r'):
+                parts.append(_run_text(run))
+    return ''.join(parts)
+
+
+def _open_docx_zip(docx_file):
+    """DOCXをZIPとして開く（開いている zipfile.ZipFile はそのまま使い、閉じない）"""
+    if isinstance(docx_file, zipfile.ZipFile):
+        return nullcontext(docx_file)
+    return zipfile.ZipFile(docx_file)
+
+
+def iter_docx_paragraphs(docx_file):
+    """
+    python-docxを使わずにDOCXの段落をストリーミングで読み込む
+    
+    word/document.xml を lxml.etree.iterparse で走査し、本文直下の
+    w:p 要素を1つずつ返したあとで要素を解放するため、ファイルサイズに
+    関係なくメモリ使用量はほぼ一定になる。段落インデックスは
+    python-docx の Document.paragraphs と一致する。
+    
+    Args:
+        docx_file: DOCXファイルのパス、または開いている zipfile.ZipFile（閉じない）
+        
+    Yields:
+        tuple: (paragraph_index, text, w:p要素)
+               要素は次の段落を取得するまでの間だけ有効
+               （画像が必要な場合は paragraph_image_ids で取得する）
+    """
+    body_tag = f'{{{W_NS}}}body'
+    p_tag = f'{{{W_NS}}}p'
+    
+    with _open_docx_zip(docx_file) as zf:
+        with zf.open('word/document.xml') as xml_file:
+            body = None
+            para_idx = 0
+            for event, elem in etree.iterparse(
+                    xml_file, events=('start', 'end'), huge_tree=True):
+                if event == 'start':
+                    if body is None and elem.tag == body_tag:
+                        body = elem
+                    continue
                 
-                # この段落に画像があれば、話者と紐づけ
-                if para_idx in paragraph_images:
-                    # 初めて見る話者の場合のみアイコンを登録
-                    if speaker not in speaker_icons:
-                        img_info = paragraph_images[para_idx]
-                        if 'path' in img_info:
-                            speaker_icons[speaker] = img_info['path']
-                        else:
-                            speaker_icons[speaker] = img_info['data_uri']
+                # 本文直下の要素のみ処理（表内などの段落は python-docx と同様に対象外）
+                if body is None or elem.getparent() is not body:
+                    continue
                 
-                # 残りの行を本文として結合
-                content_lines = lines[1:]
-                content = '\n'.join(content_lines).strip()
+                if elem.tag == p_tag:
+                    yield para_idx, _paragraph_text(elem), elem
+                    para_idx += 1
                 
-                if content:  # 本文がある場合のみ追加
-                    # 話者に紐づいたアイコンを使用
-                    icon_ref = speaker_icons.get(speaker, '')
-                    
-                    transcript.append({
-                        'start': timestamp + '.000',
-                        'end': timestamp + '.000',
-                        'speaker': speaker,
-                        'icon': icon_ref,
-                        'text': content
-                    })
-    
-    return transcript
+                # 処理済みの要素を解放
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del body[0]
 
 
-def parse_webvtt_from_docx(docx_file):
+def parse_teams_docx_stream(docx_file, output_dir=None, use_icon_files=True,
+                            icons_dir=None):
     """
-    Teams DOCXファイル（WEBVTT形式を含む）をパースして構造化データに変換
+    Teams通常形式のDOCXファイルをストリーミングでパース（リスト版）
     
     Args:
-        docx_file: DOCXファイルのパス
+        docx_file: DOCXファイルパス
+        output_dir: アイコン画像を保存するディレクトリ
+        use_icon_files: Trueの場合は画像ファイルとして保存、
+                        Falseの場合はBase64埋め込み
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
         
     Returns:
-        list: [{'start': str, 'end': str, 'speaker': str, 'text': str}, ...]
+        list: [Utterance, ...]
     """
-    doc = Document(docx_file)
-    transcript = []
-    
-    # すべての段落を結合してテキストとして取得
-    full_text = '\n'.join([para.text for para in doc.paragraphs])
+    return list(iter_teams_docx_stream(
+        docx_file, output_dir, use_icon_files=use_icon_files,
+        icons_dir=icons_dir))
+
+
+def iter_teams_docx_stream(docx_file, output_dir=None, use_icon_files=True,
+                           icons_dir=None, profile=None, icon_writer=None,
+                           icon_normalizer=None, paragraphs=None):
+    """
+    Teams通常形式のDOCXファイルをストリーミングでパース（ジェネレーター）
     
-    # デバッグ: 最初の500文字を表示
-    # print(f"DEBUG: Full text preview:\n{full_text[:500]}\n")
-    # print(f"DEBUG: Total lines: {len(full_text.split(chr(10)))}\n")
+    parse_teams_docx_simple と同じレコードを返すが、DOCX全体のDOMを
+    保持しないため巨大な文字起こしでもメモリ使用量が一定になる。
+    画像は話者のアイコンとして使われる段落のものだけを取り出す。
     
-    # WEBVTT形式のパターン: <v 話者名>テキスト</v>
-    # タイムスタンプ行とテキスト行を抽出
-    lines = full_text.split('\n')
+    Args:
+        docx_file: DOCXファイルパス、または開いている zipfile.ZipFile（閉じない）
+        output_dir: アイコン画像を保存するディレクトリ
+        use_icon_files: Trueの場合は画像ファイルとして保存、
+                        Falseの場合はBase64埋め込み
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+        profile: 処理時間と件数を記録するConversionProfile
+        icon_writer: アイコンの書き込みを任せるIconWriter（Noneの場合はその場で書き込む）
+        icon_normalizer: アイコンの縮小・再圧縮に使うIconNormalizer（Noneの場合は元のまま）
+        paragraphs: iter_docx_paragraphs と同じ (インデックス, テキスト, w:p要素) の
+                    イテラブル（形式判定で読み始めた段落を続けて使う場合。
+                    Noneの場合は docx_file から読む）
+        
+    Yields:
+        Utterance: 発言
+    """
+    if profile is None:
+        profile = _NO_PROFILE
     
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
+    with _open_docx_zip(docx_file) as zf:
+        with profile.stage('load'):
+            image_targets = _read_docx_image_targets(zf)
+        profile.set('images_found', len(image_targets))
         
-        # タイムスタンプ行を検出
-        timestamp_match = re.match(
-            r'(\d+:\d+:\d+\.\d+)\s*-->\s*(\d+:\d+:\d+\.\d+)', line)
+        def load_image(embed_id):
+            if embed_id not in image_targets:
+                return None
+            part_name, content_type = image_targets[embed_id]
+            return zf.read(part_name), content_type
         
-        if timestamp_match:
-            start_time = timestamp_match.group(1)
-            end_time = timestamp_match.group(2)
-            
-            # 次の行がVTT形式のテキスト
-            i += 1
-            if i < len(lines):
-                text_line = lines[i].strip()
-                
-                # <v 話者名>テキスト</v> の形式をパース
-                vtt_match = re.match(r'<v\s+([^>]+)>(.*?)</v>', text_line)
-                
-                if vtt_match:
-                    speaker = vtt_match.group(1).strip()
-                    text = vtt_match.group(2).strip()
-                    
-                    transcript.append({
-                        'start': start_time,
-                        'end': end_time,
-                        'speaker': speaker,
-                        'text': text
-                    })
+        # 画像は話者の初出時にだけパッケージから取り出す
+        icons = SpeakerIconResolver(
+            load_image, output_dir, use_files=use_icon_files,
+            icons_dir=icons_dir, profile=profile, icon_writer=icon_writer,
+            icon_normalizer=icon_normalizer)
         
-        i += 1
+        if paragraphs is None:
+            paragraphs = iter_docx_paragraphs(zf)
+        for para_idx, para_text, p_element in paragraphs:
+            profile.set('paragraphs', para_idx + 1)
+            text = para_text.strip()
+            if not text:
+                continue
+            
+            # 最初の行が話者情報かチェック（1段落につき1回だけ判定）
+            first_line, _, rest = text.partition('\n')
+            header = match_speaker_header(first_line)
+            if header is None:
+                continue
+            
+            speaker, timestamp = header  # mm:ss または h:mm:ss
+            
+            # 初めて見る話者の場合のみ、この段落の画像をアイコンとして登録
+            icon_ref = icons.icon_for(
+                speaker, lambda: paragraph_image_ids(p_element))
+            
+            # 残りの行を本文とする
+            content = rest.strip()
+            
+            if content:  # 本文がある場合のみ追加
+                start_ms = parse_timestamp_ms(timestamp)
+                yield Utterance(
+                    start_ms, start_ms, sys.intern(speaker), content, icon_ref)
+
+
+def parse_webvtt_from_docx(docx_file):
+    """
+    Teams DOCXファイル（WEBVTT形式を含む）をパースして構造化データに変換
+    
+    Args:
+        docx_file: DOCXファイルのパス、またはDocxConversionContext
+        
+    Returns:
+        list: [Utterance, ...]
+    """
+    ctx = DocxConversionContext.open(docx_file)
+    return list(iter_webvtt_paragraphs(ctx.paragraph_texts))
+
+
+def iter_webvtt_paragraphs(paragraph_texts):
+    """
+    段落テキストからWEBVTT形式の発言を取り出す（ジェネレーター）
+    
+    タイムスタンプ行の次の行が <v 話者名>テキスト</v> の場合に1発言とする。
+    段落内の改行も行区切りとして扱う。
+    
+    Args:
+        paragraph_texts: 段落テキストのイテラブル
+        
+    Yields:
+        Utterance: 発言
+    """
+    cue = None  # 直前のタイムスタンプ行
+    for para_text in paragraph_texts:
+        for raw_line in para_text.split('\n'):
+            line = raw_line.strip()
+            
+            # タイムスタンプ行の次の行がVTT形式のテキスト
+            if cue is not None:
+                start_time, end_time = cue
+                cue = None
+                vtt_match = VOICE_PATTERN.match(line)
+                if vtt_match:
+                    speaker = vtt_match.group(1).strip()
+                    text = vtt_match.group(2).strip()
+                    yield Utterance.from_strings(
+                        start_time, end_time, speaker, text)
+                continue
+            
+            # タイムスタンプ行を検出
+            timestamp_match = CUE_PATTERN.match(line)
+            if timestamp_match:
+                cue = timestamp_match.groups()
+
+
+def iter_legacy_paragraphs(paragraph_texts):
+    """
+    従来形式（タイムスタンプ / 話者名 / 本文 が別段落）の発言を取り出す
+    
+    Args:
+        paragraph_texts: 段落テキストのイテラブル
+        
+    Yields:
+        Utterance: 発言
+    """
+    current_entry = {}
+    state = 'waiting_timestamp'
+    
+    for para_text in paragraph_texts:
+        text = para_text.strip()
+        
+        # 空行をスキップ
+        if not text:
+            continue
+        
+        # タイムスタンプ行を検出
+        timestamp_match = CUE_PATTERN.match(text)
+        
+        if timestamp_match:
+            # 前のエントリを確定
+            if current_entry and current_entry.get('text'):
+                yield Utterance.from_strings(**current_entry)
+            
+            # 新しいエントリを開始
+            current_entry = {
+                'start': timestamp_match.group(1),
+                'end': timestamp_match.group(2),
+                'speaker': None,
+                'text': ''
+            }
+            state = 'waiting_speaker'
+            
+        elif state == 'waiting_speaker' and current_entry.get('speaker') is None:
+            # 話者名行
+            current_entry['speaker'] = text
+            state = 'waiting_text'
+            
+        elif state == 'waiting_text' and current_entry.get('speaker'):
+            # テキスト内容行（複数行の可能性あり）
+            if current_entry['text']:
+                current_entry['text'] += ' ' + text
+            else:
+                current_entry['text'] = text
+    
+    # 最後のエントリを確定
+    if current_entry and current_entry.get('text'):
+        yield Utterance.from_strings(**current_entry)
+
+
+def detect_transcript_format(paragraph_texts, max_paragraphs=FORMAT_SNIFF_PARAGRAPHS):
+    """
+    先頭の段落から文字起こしの形式を判定
+    
+    Args:
+        paragraph_texts: 段落テキストのイテラブル（先頭だけ読む）
+        max_paragraphs: 判定に使う空でない段落数
+        
+    Returns:
+        str: 'teams'（話者名  mm:ss）、'webvtt'（<v 話者名>）、
+             'legacy'（タイムスタンプ / 話者名 / 本文）、判定できなければNone
+    """
+    has_cue = False
+    has_voice = False
+    has_speaker_header = False
+    
+    checked = 0
+    for para_text in paragraph_texts:
+        text = para_text.strip()
+        if not text:
+            continue
+        for line in text.split('\n'):
+            line = line.strip()
+            if CUE_PATTERN.match(line):
+                has_cue = True
+            elif VOICE_PATTERN.match(line):
+                has_voice = True
+        if match_speaker_header(text.partition('\n')[0]):
+            has_speaker_header = True
+        checked += 1
+        if checked >= max_paragraphs:
+            break
+    
+    if has_cue and has_voice:
+        return 'webvtt'
+    if has_speaker_header:
+        return 'teams'
+    if has_cue:
+        return 'legacy'
+    return None
+
+
+def iter_teams_docx(docx_file, output_dir=None, use_icon_files=True,
+                    icons_dir=None, stream=False, profile=None, icon_writer=None,
+                    icon_normalizer=None):
+    """
+    形式を判定し、該当する1つのパーサーだけで発言を取り出す（ジェネレーター）
+    
+    DOCXは1度だけ開き、形式判定とパースで同じ段落を共有する。
+    アイコン画像を抽出するのはTeams形式と判定された場合だけ。
+    
+    Args:
+        docx_file: DOCXファイルのパス、またはDocxConversionContext
+        output_dir: アイコン画像を保存するディレクトリ
+        use_icon_files: Trueの場合は画像ファイルとして保存、
+                        Falseの場合はBase64埋め込み
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+        stream: Trueの場合はpython-docxを使わずストリーミングで読み込む
+        profile: 処理時間と件数を記録するConversionProfile
+        icon_writer: アイコンの書き込みを任せるIconWriter（Noneの場合はその場で書き込む）
+        icon_normalizer: アイコンの縮小・再圧縮に使うIconNormalizer（Noneの場合は元のまま）
+        
+    Yields:
+        Utterance: 発言
+    """
+    if profile is None:
+        profile = _NO_PROFILE
+    
+    if stream:
+        with zipfile.ZipFile(docx_file) as zf:
+            # 判定で読んだ先頭の段落は取っておき、パースでは続きとつなげて読む
+            paragraphs = iter_docx_paragraphs(zf)
+            head = []
+            with profile.stage('detect'):
+                transcript_format = detect_transcript_format(
+                    _buffer_paragraph_texts(paragraphs, head))
+            paragraphs = itertools.chain(head, paragraphs)
+            if transcript_format == 'teams':
+                yield from iter_teams_docx_stream(
+                    zf, output_dir, use_icon_files=use_icon_files,
+                    icons_dir=icons_dir, profile=profile, icon_writer=icon_writer,
+                    icon_normalizer=icon_normalizer, paragraphs=paragraphs)
+                return
+            
+            def stream_texts():
+                for para_idx, text, _ in paragraphs:
+                    profile.set('paragraphs', para_idx + 1)
+                    yield text
+            
+            yield from _iter_paragraph_transcript(transcript_format, stream_texts())
+        return
+    
+    with profile.stage('load'):
+        ctx = DocxConversionContext.open(docx_file)
+        paragraph_texts = ctx.paragraph_texts
+    with profile.stage('detect'):
+        transcript_format = detect_transcript_format(paragraph_texts)
+    if transcript_format == 'teams':
+        yield from iter_teams_docx_simple(
+            ctx, output_dir, use_icon_files=use_icon_files,
+            icons_dir=icons_dir, profile=profile, icon_writer=icon_writer,
+            icon_normalizer=icon_normalizer)
+        return
+    profile.set('paragraphs', len(paragraph_texts))
+    yield from _iter_paragraph_transcript(transcript_format, paragraph_texts)
+
+
+def _buffer_paragraph_texts(paragraphs, head):
+    """
+    iter_docx_paragraphs の段落テキストを返しながら、読んだ段落を head に残す
+    
+    iter_docx_paragraphs の要素は次の段落を読むと解放されるため、
+    後で画像を探せるようにコピーして残す。
+    """
+    for para_idx, text, p_element in paragraphs:
+        head.append((para_idx, text, copy.deepcopy(p_element)))
+        yield text
+
+
+def _iter_paragraph_transcript(transcript_format, paragraph_texts):
+    """WEBVTT形式・従来形式の段落テキストから発言を取り出す"""
+    if transcript_format == 'webvtt':
+        return iter_webvtt_paragraphs(paragraph_texts)
+    # 判定できない場合も従来形式として読む（画像の書き込みなどの副作用はない）
+    return iter_legacy_paragraphs(paragraph_texts)
+
+
+def parse_teams_docx(docx_file, output_dir=None, use_icon_files=True,
+                     icons_dir=None):
+    """
+    Teams DOCXファイルをパースして構造化データに変換
+    
+    先頭の段落から形式（Teams通常形式 / WEBVTT / 従来形式）を判定し、
+    該当するパーサーだけを実行する。
+    
+    Args:
+        docx_file: DOCXファイルのパス、またはDocxConversionContext
+        output_dir: アイコン画像を保存するディレクトリ（Noneの場合はBase64埋め込み）
+        use_icon_files: Trueの場合は画像ファイルとして保存、
+                        Falseの場合はBase64埋め込み
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+        
+    Returns:
+        list: [Utterance, ...]
+    """
+    return list(iter_teams_docx(
+        docx_file, output_dir, use_icon_files=use_icon_files,
+        icons_dir=icons_dir))
+
+
+def iter_caption_file(caption_file, profile=None):
+    """
+    WebVTT (.vtt) / SubRip (.srt) の字幕ファイルを1行ずつ読み込んで発言を取り出す
+    
+    DOCXを経由せず、ファイルを先頭から順に読むだけなのでメモリ使用量は一定。
+    複数行のキューは空白で結合し、<v 話者名> タグごとに別の発言とする。
+    タグのない行は直前の話者の続きとして扱う。
+    
+    Args:
+        caption_file: 字幕ファイルのパス
+        profile: 読み込んだ行数を記録するConversionProfile
+        
+    Yields:
+        Utterance: 発言
+    """
+    if profile is None:
+        profile = _NO_PROFILE
+    
+    def flush(cue, segments):
+        start_ms, end_ms = cue
+        for speaker, parts in segments:
+            text = ' '.join(parts).strip()
+            if text:
+                yield Utterance(start_ms, end_ms, speaker, text)
+    
+    cue = None  # 読み込み中のキューの (開始, 終了)
+    segments = []  # [(話者名, [本文, ...]), ...]
+    
+    with open(caption_file, encoding='utf-8-sig') as f:
+        for line_count, raw_line in enumerate(f, 1):
+            profile.set('lines', line_count)
+            line = raw_line.strip()
+            
+            if cue is None:
+                # タイミング行を探す（WEBVTTヘッダー、キュー番号、NOTEなどは読み飛ばす）
+                timing_match = CAPTION_TIMING_PATTERN.match(line)
+                if timing_match:
+                    cue = (parse_timestamp_ms(timing_match.group(1)),
+                           parse_timestamp_ms(timing_match.group(2)))
+                    segments = []
+                continue
+            
+            # 空行でキューが終わる
+            if not line:
+                yield from flush(cue, segments)
+                cue = None
+                continue
+            
+            # 話者タグごとに発言を分ける
+            voice_matches = list(VOICE_TAG_PATTERN.finditer(line))
+            if not voice_matches:
+                if not segments:
+                    segments.append((UNKNOWN_SPEAKER, []))
+                segments[-1][1].append(CAPTION_TAG_PATTERN.sub('', line))
+                continue
+            
+            prefix = CAPTION_TAG_PATTERN.sub('', line[:voice_matches[0].start()]).strip()
+            if prefix:
+                if not segments:
+                    segments.append((UNKNOWN_SPEAKER, []))
+                segments[-1][1].append(prefix)
+            for i, voice_match in enumerate(voice_matches):
+                end = (voice_matches[i + 1].start()
+                       if i + 1 < len(voice_matches) else len(line))
+                speaker = sys.intern(voice_match.group(1).strip())
+                text = CAPTION_TAG_PATTERN.sub('', line[voice_match.end():end])
+                segments.append((speaker, [text]))
+    
+    # 末尾に空行がない場合の最後のキュー
+    if cue is not None:
+        yield from flush(cue, segments)
+
+
+def parse_caption_file(caption_file):
+    """
+    WebVTT / SRT 字幕ファイルをパース（iter_caption_file のリスト版）
+    
+    Args:
+        caption_file: 字幕ファイルのパス
+        
+    Returns:
+        list: [Utterance, ...]
+    """
+    return list(iter_caption_file(caption_file))
+
+
+def iter_transcript_file(input_path, output_dir=None, use_icon_files=True,
+                         icons_dir=None, stream=False, profile=None,
+                         icon_writer=None, icon_normalizer=None):
+    """
+    拡張子から入力形式を判定して発言を取り出す（ジェネレーター）
+    
+    Args:
+        input_path: 入力ファイル（.docx / .vtt / .srt）のパス
+        output_dir: アイコン画像を保存するディレクトリ
+        use_icon_files: Trueの場合は画像ファイルとして保存、
+                        Falseの場合はBase64埋め込み
+        icons_dir: アイコンの保存先（Noneの場合は output_dir/icons）
+        stream: DOCXをpython-docxを使わずストリーミングで読み込むか
+        profile: 処理時間と件数を記録するConversionProfile
+        icon_writer: アイコンの書き込みを任せるIconWriter（Noneの場合はその場で書き込む）
+        icon_normalizer: アイコンの縮小・再圧縮に使うIconNormalizer（Noneの場合は元のまま）
+        
+    Yields:
+        Utterance: 発言
+    """
+    if profile is None:
+        profile = _NO_PROFILE
+    
+    input_path = Path(input_path)
+    if input_path.suffix.lower() in CAPTION_SUFFIXES:
+        return iter_caption_file(input_path, profile=profile)
+    
+    if stream:
+        source = input_path
+    else:
+        with profile.stage('load'):
+            source = DocxConversionContext(input_path)
+    return iter_teams_docx(
+        source, output_dir, use_icon_files=use_icon_files,
+        icons_dir=icons_dir, stream=stream, profile=profile,
+        icon_writer=icon_writer, icon_normalizer=icon_normalizer)
+
+
+def merge_consecutive_speakers(transcript, max_gap_ms=None, max_chars=None):
+    """
+    同一話者の連続した発言を結合（ジェネレーター）
+    
+    任意のイテラブルを1件ずつ読み、同じ話者の発言をバッファに集めて
+    話者が変わったときに1回だけ結合して返す。長い独演でも文字列の
+    再コピーが発生せず、全体をメモリに保持する必要もない。
+    
+    Args:
+        transcript: パースされた文字起こしデータ（Utteranceのイテラブル）
+        max_gap_ms: 前の発言の終了から次の発言の開始までがこれを超えたら
+                    結合しない（ミリ秒、Noneの場合は無制限）
+        max_chars: 結合後の本文がこの文字数を超える場合は新しい発言にする
+                   （Noneの場合は無制限）
+        
+    Yields:
+        Utterance: 結合後の発言
+    """
+    current = None
+    fragments = []  # 結合待ちの本文
+    length = 0  # 結合後の本文の文字数
+    end_ms = 0
+    
+    for entry in transcript:
+        if (current is not None
+                and entry.speaker == current.speaker
+                and (max_gap_ms is None or entry.start_ms - end_ms <= max_gap_ms)
+                and (max_chars is None
+                     or length + 1 + len(entry.text) <= max_chars)):
+            # 同じ話者なら本文をバッファに追加（終了時刻を更新）
+            fragments.append(entry.text)
+            length += 1 + len(entry.text)
+            end_ms = entry.end_ms
+            continue
+        
+        # 違う話者（または上限超過）なら確定して新規開始
+        if current is not None:
+            yield current._replace(text=' '.join(fragments), end_ms=end_ms)
+        current = entry
+        fragments = [entry.text]
+        length = len(entry.text)
+        end_ms = entry.end_ms
+    
+    # 最後のエントリを確定
+    if current is not None:
+        yield current._replace(text=' '.join(fragments), end_ms=end_ms)
+
+
+def get_speaker_icon(speaker_name, speaker_index):
+    """
+    話者に応じたアイコン絵文字を返す
+    
+    Args:
+        speaker_name: 話者名
+        speaker_index: 話者の出現順（0始まり）
+        
+    Returns:
+        str: 絵文字アイコン
+    """
+    # 話者ごとに異なるアイコンを割り当て
+    icons = ['👨', '👩', '🧑', '👴', '👵', '👦', '👧', '🧔', '👱', '👨‍💼']
+    return icons[speaker_index % len(icons)]
+
+
+def icon_reference_definition(icon_id, data_uri):
+    """
+    Base64アイコンの参照定義行を作成
+    
+    ヘッダーからは <img src="icon:ID" ...> で参照し、ChatView拡張機能が
+    プレビュー時に定義行を取り除いて実データに置き換える。
+    
+    Args:
+        icon_id: アイコンID（例: s1）
+        data_uri: 画像のdata URI
+        
+    Returns:
+        str: 参照定義行（例: [icon:s1]: data:image/png;base64,...）
+    """
+    return f'[icon:{icon_id}]: {data_uri}'
+
+
+def convert_to_chatview_markdown(transcript, show_timestamp=True, show_icon=True,
+                                 icon_refs=False, page_messages=None,
+                                 page_bytes=None, page_minutes=None):
+    """
+    パースした文字起こしをChatView形式のマークダウンに変換
+    
+    Args:
+        transcript: パースされたデータ（Utteranceのイテラブル）
+        show_timestamp: タイムスタンプを表示するか
+        show_icon: アイコンを表示するか
+        icon_refs: Trueの場合、Base64アイコンを話者ごとに1回だけ参照定義として
+                   出力し、各ヘッダーからは短いIDで参照する
+        page_messages: 1ページの最大メッセージ数（ページ分割する場合）
+        page_bytes: 1ページの最大バイト数（ページ分割する場合）
+        page_minutes: 1ページの時間幅（分、ページ分割する場合）
+        
+    Returns:
+        str: ChatView形式のマークダウン
+             （ページ分割を指定した場合は各ページのマークダウンのリスト）
+    """
+    if page_messages or page_bytes or page_minutes:
+        return ['\n'.join(page.lines) for page in iter_chatview_pages(
+            transcript, page_messages=page_messages, page_bytes=page_bytes,
+            page_minutes=page_minutes, show_timestamp=show_timestamp,
+            show_icon=show_icon, icon_refs=icon_refs)]
+    return '\n'.join(iter_chatview_markdown(
+        transcript, show_timestamp=show_timestamp, show_icon=show_icon,
+        icon_refs=icon_refs))
+
+
+def _iter_chatview_messages(transcript, show_timestamp=True, show_icon=True,
+                            icon_refs=False):
+    """
+    発言ごとにChatView形式のヘッダーと本文を作成（ジェネレーター）
+    
+    ロールとアイコンは話者の初出時に割り当て、以降の発言でも同じものを使う。
+    
+    Args:
+        transcript: パースされたデータ（Utteranceのイテラブル）
+        show_timestamp: タイムスタンプを表示するか
+        show_icon: アイコンを表示するか
+        icon_refs: Base64アイコンをIDで参照するか
+        
+    Yields:
+        tuple: (Utterance, ヘッダー行, 本文, アイコン参照定義)
+               アイコン参照定義は (ID, 定義行)、参照しない場合はNone
+    """
+    # 話者ごとにuserとassistantを交互に割り当て
+    speaker_roles = {}
+    speaker_icons = {}
+    speaker_definitions = {}
+    role_toggle = ['ai', 'me']
+    role_index = 0
+    
+    for entry in transcript:
+        speaker = entry.speaker
+        text = entry.text.strip()
+        
+        # entryにアイコンが含まれているかチェック
+        entry_icon = entry.icon
+        
+        # 初出の話者にロールとアイコンを割り当て
+        if speaker not in speaker_roles:
+            speaker_roles[speaker] = role_toggle[role_index % 2]
+            speaker_definitions[speaker] = None
+            # entryにアイコンがあればそれを使用、なければデフォルト絵文字
+            if entry_icon:
+                # ファイルパスかBase64かを判定
+                if icon_refs and entry_icon.startswith('data:image'):
+                    # 定義は出力側で1回だけ書き、ヘッダーからはIDで参照
+                    icon_id = f's{role_index + 1}'
+                    if show_icon:
+                        speaker_definitions[speaker] = (
+                            icon_id, icon_reference_definition(icon_id, entry_icon))
+                    img_tag = f'<img src="icon:{icon_id}" '
+                    img_tag += 'width="20" height="20" />'
+                    speaker_icons[speaker] = img_tag
+                elif entry_icon.startswith('data:image'):
+                    # Base64画像の場合はHTMLのimg形式で埋め込む
+                    img_tag = f'<img src="{entry_icon}" '
+                    img_tag += 'width="20" height="20" />'
+                    speaker_icons[speaker] = img_tag
+                else:
+                    # ファイルパスの場合もimg形式
+                    img_tag = f'<img src="{entry_icon}" '
+                    img_tag += 'width="20" height="20" />'
+                    speaker_icons[speaker] = img_tag
+            else:
+                speaker_icons[speaker] = get_speaker_icon(
+                    speaker, role_index)
+            role_index += 1
+        
+        role = speaker_roles[speaker]
+        icon = speaker_icons[speaker]
+        
+        # ChatView形式で出力
+        if show_icon and icon:
+            header = f'@{role}[{icon} {speaker}]'
+        else:
+            header = f'@{role}[{speaker}]'
+        
+        if show_timestamp:
+            # 時刻の整形は出力時にだけ行う
+            header += f'{{{format_timestamp_ms(entry.start_ms)}}}'
+        
+        yield entry, header, text, speaker_definitions[speaker]
+
+
+def iter_chatview_markdown(transcript, show_timestamp=True, show_icon=True,
+                           icon_refs=False, message_index=None):
+    """
+    パースした文字起こしをChatView形式のマークダウンに変換（ジェネレーター）
+    
+    行を1つずつ返すため、出力全体をメモリに保持せずに書き出せる。
+    '\\n'.join した結果は convert_to_chatview_markdown と同じになる。
+    
+    Args:
+        transcript: パースされたデータ（Utteranceのイテラブル）
+        show_timestamp: タイムスタンプを表示するか
+        show_icon: アイコンを表示するか
+        icon_refs: Trueの場合、Base64アイコンを話者ごとに1回だけ参照定義として
+                   出力し、各ヘッダーからは短いIDで参照する
+        message_index: 各メッセージの位置を記録する MessageIndexWriter
+                       （write_markdown_lines で書き出した場合のバイト位置）
+        
+    Yields:
+        str: マークダウンの1行（改行なし）
+    """
+    defined = set()
+    position = 0  # ここまでに返した行のバイト数（行の間の改行を含む）
+    for entry, header, text, definition in _iter_chatview_messages(
+            transcript, show_timestamp=show_timestamp, show_icon=show_icon,
+            icon_refs=icon_refs):
+        # 話者の初出時に1回だけ定義し、以降はIDで参照
+        if definition is not None and definition[0] not in defined:
+            defined.add(definition[0])
+            if message_index is not None:
+                position += _lines_bytes((definition[1], ''))
+            yield definition[1]
+            yield ''
+        if message_index is not None:
+            length = _message_bytes(header, text)
+            message_index.add(position, length, entry.start_ms, entry.end_ms,
+                              entry.speaker)
+            position += length + 2 * NEWLINE_BYTES  # 本文の後の改行と空行
+        yield header
+        yield text
+        yield ''
+
+
+class ChatViewPage(namedtuple('ChatViewPage',
+                              'number lines message_count start_ms end_ms speakers '
+                              'messages')):
+    """
+    ページ分割したChatView形式のマークダウンの1ページ
+
+    Attributes:
+        number: ページ番号（1から）
+        lines: マークダウンの行のリスト（改行なし）
+        message_count: メッセージ数
+        start_ms: 最初の発言の開始時刻（ミリ秒）
+        end_ms: 最後の発言の終了時刻（ミリ秒）
+        speakers: 登場する話者（初出順のタプル）
+        messages: 各メッセージの (ページ内のバイト位置, バイト長, 開始ms, 終了ms, 話者)
+                  のリスト（メッセージ索引用）
+    """
+    __slots__ = ()
+
+
+# テキストモードで書き出すと改行がOSの改行コードになるため、バイト数はそれに合わせる
+NEWLINE_BYTES = len(os.linesep)
+
+
+def _text_bytes(text):
+    """ファイルに書き出したときのUTF-8でのバイト数（本文中の改行の変換を含む）"""
+    size = len(text.encode('utf-8'))
+    if NEWLINE_BYTES > 1:
+        size += text.count('\n') * (NEWLINE_BYTES - 1)
+    return size
+
+
+def _lines_bytes(lines):
+    """各行の後の改行を含めた、ファイルに書き出したときのバイト数"""
+    return sum(_text_bytes(line) + NEWLINE_BYTES for line in lines)
+
+
+def _message_bytes(header, text):
+    """メッセージ（ヘッダー行と本文、末尾の改行を除く）のファイル上のバイト数"""
+    return _text_bytes(header) + NEWLINE_BYTES + _text_bytes(text)
+
+
+def iter_chatview_pages(transcript, page_messages=None, page_bytes=None,
+                        page_minutes=None, show_timestamp=True, show_icon=True,
+                        icon_refs=False):
+    """
+    ChatView形式のマークダウンをページに分割して返す（ジェネレーター）
+    
+    メッセージ数・バイト数・時間幅のいずれかの上限を超える前に次のページに
+    切り替える（複数指定した場合は最初に達した条件で区切る）。時間幅は
+    会議の先頭からの区間（0〜30分、30〜60分、…）で区切り、発言のない区間は
+    ページにしない。話者のロールとアイコンはページをまたいでも同じで、
+    --icon-refs の参照定義は各ページで話者が最初に登場する前に出力し直す。
+    1ページに収まらない長さの1メッセージは、そのメッセージだけのページにする。
+    
+    Args:
+        transcript: パースされたデータ（Utteranceのイテラブル）
+        page_messages: 1ページの最大メッセージ数
+        page_bytes: 1ページの最大バイト数（UTF-8）
+        page_minutes: 1ページの時間幅（分）
+        show_timestamp: タイムスタンプを表示するか
+        show_icon: アイコンを表示するか
+        icon_refs: Base64アイコンを話者ごとに参照定義として出力するか
+        
+    Yields:
+        ChatViewPage: 1ページ分のマークダウンと概要
+    """
+    window_ms = int(page_minutes * 60000) if page_minutes else None
+    number = 0
+    lines = None
+    
+    for entry, header, text, definition in _iter_chatview_messages(
+            transcript, show_timestamp=show_timestamp, show_icon=show_icon,
+            icon_refs=icon_refs):
+        block = [header, text, '']
+        window = entry.start_ms // window_ms if window_ms else None
+        
+        if lines is not None:
+            needs_definition = (definition is not None
+                                and definition[0] not in defined)
+            block_bytes = _lines_bytes(block)
+            if needs_definition:
+                block_bytes += _lines_bytes((definition[1], ''))
+            if ((page_messages and message_count >= page_messages)
+                    or (window_ms and window != page_window)
+                    or (page_bytes and size + block_bytes > page_bytes)):
+                yield ChatViewPage(number, lines, message_count, start_ms,
+                                   end_ms, tuple(speakers), messages)
+                lines = None
+        
+        if lines is None:
+            number += 1
+            lines = []
+            message_count = 0
+            size = 0
+            start_ms = entry.start_ms
+            end_ms = entry.start_ms
+            speakers = {}  # 初出順を保つため辞書をセットとして使う
+            messages = []
+            defined = set()
+            page_window = window
+        
+        if definition is not None and definition[0] not in defined:
+            defined.add(definition[0])
+            size += _lines_bytes((definition[1], ''))
+            lines.extend((definition[1], ''))
+        messages.append((size, _message_bytes(header, text), entry.start_ms,
+                         entry.end_ms, entry.speaker))
+        lines.extend(block)
+        size += _lines_bytes(block)
+        message_count += 1
+        end_ms = max(end_ms, entry.end_ms, entry.start_ms)
+        speakers[entry.speaker] = None
+    
+    if lines is not None:
+        yield ChatViewPage(number, lines, message_count, start_ms, end_ms,
+                           tuple(speakers), messages)
+
+
+def page_output_path(output_path, number):
+    """
+    ページのファイル名（meeting.md → meeting.part001.md）
+    
+    Args:
+        output_path: 目次のマークダウンファイルのパス
+        number: ページ番号（1から）
+        
+    Returns:
+        Path: ページのマークダウンファイルのパス
+    """
+    output_path = Path(output_path)
+    return output_path.with_name(
+        f'{output_path.stem}.part{number:03d}{output_path.suffix}')
+
+
+def iter_page_index_markdown(output_path, pages):
+    """
+    ページへのリンクを並べた目次のマークダウン（ジェネレーター）
+    
+    Args:
+        output_path: 目次のマークダウンファイルのパス
+        pages: ChatViewPage のイテラブル（lines は使わない）
+        
+    Yields:
+        str: マークダウンの1行（改行なし）
+    """
+    pages = list(pages)
+    total = sum(page.message_count for page in pages)
+    yield f'# {Path(output_path).stem}'
+    yield ''
+    yield f'{total}件のメッセージを{len(pages)}ページに分割しています。'
+    yield ''
+    for page in pages:
+        name = page_output_path(output_path, page.number).name
+        yield (f'{page.number}. [{name}]({name}) '
+               f'{format_timestamp_ms(page.start_ms)} – '
+               f'{format_timestamp_ms(page.end_ms)}'
+               f'（{page.message_count}件）: {", ".join(page.speakers)}')
+    yield ''
+
+
+def write_chatview_pages(pages, output_path, message_index=False):
+    """
+    ページごとのマークダウンと目次を書き出す
+    
+    output_path（例: meeting.md）を目次にし、各ページを meeting.part001.md、
+    meeting.part002.md … に書き出す。以前の変換で作られた、今回より後の
+    番号のページは削除する。
+    
+    Args:
+        pages: ChatViewPage のイテラブル
+        output_path: 目次のマークダウンファイルのパス
+        message_index: 各ページの隣にメッセージ索引（meeting.part001.idx …）も
+                       書き出すか
+        
+    Returns:
+        tuple: (書き出したページの ChatViewPage のリスト（lines と messages は空）,
+                書き込んだ行数（目次を含む）)
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    written = []
+    line_count = 0
+    for page in pages:
+        page_path = page_output_path(output_path, page.number)
+        with open(page_path, 'w', encoding='utf-8') as f:
+            line_count += write_markdown_lines(page.lines, f)
+        if message_index:
+            with MessageIndexWriter(message_index_path(page_path)) as index:
+                for message in page.messages:
+                    index.add(*message)
+        written.append(page._replace(lines=(), messages=()))
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        line_count += write_markdown_lines(
+            iter_page_index_markdown(output_path, written), f)
+    
+    # ページ数が減った場合に古いページが残らないようにする
+    number = len(written) + 1
+    while page_output_path(output_path, number).exists():
+        page_output_path(output_path, number).unlink()
+        if MessageIndexWriter is not None:
+            message_index_path(page_output_path(output_path, number)).unlink(
+                missing_ok=True)
+        number += 1
+    
+    return written, line_count
+
+
+def write_markdown_lines(lines, file):
+    """
+    マークダウンの行を順次書き出す
+    
+    行の間にだけ改行を入れるため、'\\n'.join(lines) を書き込んだ場合と
+    同じ内容になる。
     
-    return transcript
+    Args:
+        lines: マークダウンの行のイテラブル
+        file: 書き込み先のテキストファイルオブジェクト
+        
+    Returns:
+        int: 書き込んだ行数
+    """
+    count = 0
+    for line in lines:
+        if count:
+            file.write('\n')
+        file.write(line)
+        count += 1
+        if count == 1:
+            # 最初の出力はすぐに届ける（標準出力へのパイプなど）
+            file.flush()
+    return count
+
+
+def _counted(iterable, stats, key):
+    """イテラブルを素通ししながら件数を stats[key] に数える"""
+    for item in iterable:
+        stats[key] += 1
+        yield item
+
+
+def _counted_bytes(lines, profile):
+    """行を素通ししながらUTF-8での書き込みバイト数を profile に数える"""
+    for i, line in enumerate(lines):
+        profile.count('bytes_written', len(line.encode('utf-8')) + (1 if i else 0))
+        yield line
 
 
-def parse_teams_docx(docx_file):
+def _tee(iterable, consumer):
+    """要素を素通ししながら consumer にも渡す"""
+    for item in iterable:
+        consumer(item)
+        yield item
+
+
+def convert_file(input_path, output_path=None, merge_speaker=False,
+                 show_timestamp=True, show_icon=True, embed_icons=False,
+                 icon_refs=False, merge_max_gap=None, merge_max_chars=None,
+                 stream=False, icons_dir=None, icon_workers=4, icon_size=None,
+                 icon_format=None, page_messages=None, page_bytes=None,
+                 page_minutes=None, message_index=False, search_index=None,
+                 svg_path=None, svg_font=None, verbose=True, profile=None):
     """
-    Teams DOCXファイルをパースして構造化データに変換
+    1つの文字起こしファイルをChatView形式に変換
     
     Args:
-        docx_file: DOCXファイルのパス
+        input_path: 入力ファイル（.docx / .vtt / .srt）のパス
+        output_path: 出力マークダウンファイル（Noneの場合は標準出力）
+        merge_speaker: 同一話者の連続発言を結合するか
+        show_timestamp: タイムスタンプを表示するか
+        show_icon: アイコンを表示するか
+        embed_icons: アイコンをBase64でマークダウンに埋め込むか
+        icon_refs: 埋め込みアイコンを話者ごとに1回だけ定義して参照するか
+        merge_max_gap: 結合する発言間の最大間隔（秒、Noneの場合は無制限）
+        merge_max_chars: 結合後の1発言の最大文字数（Noneの場合は無制限）
+        stream: python-docxを使わずストリーミングで読み込むか
+        icons_dir: アイコンの保存先（Noneの場合は出力先の icons/）
+        icon_workers: アイコンを書き込むスレッド数（0の場合はパース中にその場で書き込む）
+        icon_size: アイコンを縮小する一辺のピクセル数（Noneの場合は元のサイズ）
+        icon_format: アイコンを再圧縮する形式（'png' / 'webp'、Noneの場合は
+                     icon_size 指定時のみ 'png'）
+        page_messages: 1ページの最大メッセージ数（ページ分割する場合）
+        page_bytes: 1ページの最大バイト数（ページ分割する場合）
+        page_minutes: 1ページの時間幅（分、ページ分割する場合）
+        message_index: 出力マークダウンの隣にメッセージ索引（.idx）を書き出すか
+        search_index: 発言を登録する全文検索索引のSQLiteファイル
+                      （Noneの場合は登録しない）
+        svg_path: 拡張機能のSVGエクスポートと同じレイアウトのSVGの保存先
+                  （Noneの場合は出力しない）
+        svg_font: SVGの折り返しの幅を測るフォント（Noneの場合は既定の候補から
+                  探し、なければ拡張機能と同じ推定値）
+        verbose: 進捗メッセージを表示するか
+        profile: 段階ごとの処理時間と件数を記録するConversionProfile
         
     Returns:
-        list: [{'start': str, 'end': str, 'speaker': str, 'text': str}, ...]
+        int: 出力したエントリ数
     """
-    # まず通常のTeams形式を試す
-    transcript = parse_teams_docx_simple(docx_file)
-    if transcript:
-        return transcript
+    if profile is None:
+        profile = _NO_PROFILE
+    log = print if verbose else (lambda *a, **k: None)
+    input_path = Path(input_path)
+    paged = bool(page_messages or page_bytes or page_minutes)
+    if paged and not output_path:
+        raise ValueError('ページ分割には出力ファイル（目次）の指定が必要です')
+    if message_index and not output_path:
+        raise ValueError('メッセージ索引には出力ファイルの指定が必要です')
     
-    # 次にWEBVTT形式を試す
-    transcript = parse_webvtt_from_docx(docx_file)
-    if transcript:
-        return transcript
+    # 出力ディレクトリを決定
+    if output_path:
+        output_path = Path(output_path)
+        output_dir = output_path.parent
+    else:
+        output_dir = input_path.parent
     
-    # WEBVTT形式でない場合、従来の形式でパース
-    doc = Document(docx_file)
-    transcript = []
-    current_entry = {}
-    state = 'waiting_timestamp'
+    # パース → 結合 → 変換 → 書き出し をジェネレーターでつなぎ、
+    # 文字起こし全体やマークダウン全体をメモリに保持しない
+    log(f'文字起こしファイルを読み込んでいます: {input_path}')
+    stats = {'parsed': 0, 'merged': 0}
+    
+    # アイコンの書き込みはスレッドプールに任せ、パースを止めない
+    # （参照パスは画像のハッシュから決まるので、書き込みの完了は最後に待つ）
+    use_icon_files = not embed_icons  # デフォルトはファイル保存
+    icon_writer = (IconWriter(max_workers=icon_workers)
+                   if use_icon_files and icon_workers else None)
+    icon_normalizer = (IconNormalizer(icon_size, icon_format or 'png')
+                       if icon_size or icon_format else None)
     
-    for para in doc.paragraphs:
-        text = para.text.strip()
+    with ExitStack() as stack:
+        if icon_writer is not None:
+            stack.enter_context(icon_writer)
         
-        # 空行をスキップ
-        if not text:
-            continue
+        # 全文検索索引: マークダウンと同じ結合後の発言を、変換しながら一時テーブルに
+        # まとめて書き込み、最後に1つのトランザクションで会議の発言を置き換える
+        search_writer = None
+        if search_index:
+            from chatview_search import TranscriptSearchIndex
+            search_db = stack.enter_context(TranscriptSearchIndex(search_index))
+            search_writer = stack.enter_context(search_db.begin_meeting(
+                Path(output_path or input_path).resolve(),
+                source=input_path.resolve(),
+                markdown=output_path.resolve() if output_path else None))
         
-        # タイムスタンプ行を検出
-        timestamp_match = re.match(r'(\d+:\d+:\d+\.\d+)\s*-->\s*(\d+:\d+:\d+\.\d+)', text)
+        # 拡張子（.docx / .vtt / .srt）とDOCXの内容から形式を判定して
+        # 1つのパーサーだけを実行
+        transcript = iter_transcript_file(
+            input_path,
+            output_dir=output_dir,
+            use_icon_files=use_icon_files,
+            icons_dir=icons_dir,
+            stream=stream,
+            profile=profile,
+            icon_writer=icon_writer,
+            icon_normalizer=icon_normalizer
+        )
+        transcript = _counted(profile.timed(transcript, 'parse'), stats, 'parsed')
         
-        if timestamp_match:
-            # 前のエントリを保存
-            if current_entry and current_entry.get('text'):
-                transcript.append(current_entry)
-            
-            # 新しいエントリを開始
-            current_entry = {
-                'start': timestamp_match.group(1),
-                'end': timestamp_match.group(2),
-                'speaker': None,
-                'text': ''
-            }
-            state = 'waiting_speaker'
-            
-        elif state == 'waiting_speaker' and current_entry.get('speaker') is None:
-            # 話者名行
-            current_entry['speaker'] = text
-            state = 'waiting_text'
-            
-        elif state == 'waiting_text' and current_entry.get('speaker'):
-            # テキスト内容行（複数行の可能性あり）
-            if current_entry['text']:
-                current_entry['text'] += ' ' + text
+        # オプション: 連続話者を結合
+        if merge_speaker:
+            log('同一話者の連続発言を結合します')
+            max_gap_ms = (int(merge_max_gap * 1000)
+                          if merge_max_gap is not None else None)
+            transcript = profile.timed(merge_consecutive_speakers(
+                transcript, max_gap_ms=max_gap_ms, max_chars=merge_max_chars),
+                'merge')
+        transcript = _counted(transcript, stats, 'merged')
+        
+        if search_writer is not None:
+            transcript = _tee(transcript, search_writer.add)
+        
+        # ChatView形式に変換
+        log('ChatView形式のマークダウンに変換しています...')
+        if paged:
+            pages = iter_chatview_pages(
+                transcript,
+                page_messages=page_messages,
+                page_bytes=page_bytes,
+                page_minutes=page_minutes,
+                show_timestamp=show_timestamp,
+                show_icon=show_icon,
+                icon_refs=icon_refs
+            )
+            pages = profile.timed(pages, 'render')
+        else:
+            index_writer = (MessageIndexWriter(message_index_path(output_path))
+                            if message_index else None)
+            lines = iter_chatview_markdown(
+                transcript,
+                show_timestamp=show_timestamp,
+                show_icon=show_icon,
+                icon_refs=icon_refs,
+                message_index=index_writer
+            )
+            lines = profile.timed(lines, 'render')
+        
+        # SVGはマークダウンの行を横取りして同時に組み立てる
+        svg_renderer = None
+        if svg_path:
+            from chatview_svg import GlyphWidthTable, SvgChatRenderer
+            svg_renderer = SvgChatRenderer(
+                output_dir, glyph_widths=GlyphWidthTable.load(svg_font))
+            if paged:
+                pages = _tee(pages, lambda page: svg_renderer.feed_lines(page.lines))
             else:
-                current_entry['text'] = text
+                lines = _tee(lines, svg_renderer.feed)
+        
+        # 出力
+        if paged:
+            # 各ページを meeting.part001.md … に、目次を output_path に書き出す
+            with profile.stage('write'):
+                written_pages, line_count = write_chatview_pages(
+                    pages, output_path, message_index=message_index)
+            profile.set('lines_written', line_count)
+            profile.set('pages_written', len(written_pages))
+            if profile.enabled:
+                profile.set('bytes_written', output_path.stat().st_size + sum(
+                    page_output_path(output_path, page.number).stat().st_size
+                    for page in written_pages))
+        elif output_path:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with profile.stage('write'):
+                with open(output_path, 'w', encoding='utf-8') as f, \
+                        index_writer if index_writer is not None else nullcontext():
+                    profile.set('lines_written', write_markdown_lines(lines, f))
+            if profile.enabled:
+                profile.set('bytes_written', output_path.stat().st_size)
+        else:
+            print('\n--- 変換結果 ---\n')
+            if profile.enabled:
+                lines = _counted_bytes(lines, profile)
+            with profile.stage('write'):
+                profile.set('lines_written', write_markdown_lines(lines, sys.stdout))
+            sys.stdout.write('\n')
+        
+        # 参照しているアイコンがすべて書き込まれるまで待つ
+        if icon_writer is not None:
+            with profile.stage('images'):
+                icon_writer.flush()
+        
+        if search_writer is not None:
+            with profile.stage('index'):
+                search_writer.commit()
+            log(f'全文検索索引に登録しました: {search_index}')
     
-    # 最後のエントリを追加
-    if current_entry and current_entry.get('text'):
-        transcript.append(current_entry)
+    # SVGはアイコンファイルの書き込みが終わってから保存（アイコンを埋め込むため）
+    if svg_renderer is not None:
+        try:
+            with profile.stage('write'):
+                svg_renderer.save(svg_path)
+        finally:
+            svg_renderer.close()
+        log(f'SVGを保存しました: {svg_path}')
+    
+    if output_path:
+        log(f'  → {stats["parsed"]}件のエントリを検出')
+        if merge_speaker:
+            log(f'  → {stats["merged"]}件に結合')
+        if paged:
+            log(f'  → {len(written_pages)}ページに分割'
+                f'（{page_output_path(output_path, 1).name} …）')
+        log(f'変換完了: {output_path}')
     
-    return transcript
+    profile.set('utterances_parsed', stats['parsed'])
+    profile.set('utterances_merged', stats['merged'])
+    return stats['merged']
 
 
-def merge_consecutive_speakers(transcript):
+def collect_input_files(inputs, suffixes=INPUT_SUFFIXES):
     """
-    同一話者の連続した発言を結合
+    ファイル・ディレクトリ・globパターンから入力ファイルを収集
     
     Args:
-        transcript: パースされた文字起こしデータ
+        inputs: 入力パス（文字列またはPath）のリスト
+        suffixes: ディレクトリ指定時に再帰的に探すファイルの拡張子
         
     Returns:
-        list: 結合後のデータ
+        list: [(入力ファイル, 基準ディレクトリ), ...]
+              基準ディレクトリは出力ツリーをミラーする際の起点
     """
-    if not transcript:
-        return []
+    files = []
+    seen = set()
     
-    merged = []
-    current = transcript[0].copy()
+    def add(path, root):
+        resolved = path.resolve()
+        # Wordの一時ファイル（~$xxx.docx）は除外
+        if resolved in seen or path.name.startswith('~$'):
+            return
+        seen.add(resolved)
+        files.append((path, root))
     
-    for entry in transcript[1:]:
-        if entry['speaker'] == current['speaker']:
-            # 同じ話者なら結合
-            current['text'] += ' ' + entry['text']
-            current['end'] = entry['end']  # 終了時刻を更新
+    for item in inputs:
+        item_str = str(item)
+        path = Path(item_str)
+        if path.is_dir():
+            for found in sorted(path.rglob('*')):
+                if found.is_file() and found.suffix.lower() in suffixes:
+                    add(found, path)
+        elif glob.has_magic(item_str):
+            # globの固定部分を基準ディレクトリとする
+            root_parts = []
+            for part in Path(item_str).parts:
+                if glob.has_magic(part):
+                    break
+                root_parts.append(part)
+            root = Path(*root_parts) if root_parts else Path('.')
+            for found in sorted(glob.glob(item_str, recursive=True)):
+                found = Path(found)
+                if found.is_file():
+                    add(found, root)
         else:
-            # 違う話者なら保存して新規開始
-            merged.append(current)
-            current = entry.copy()
+            add(path, path.parent)
     
-    # 最後のエントリを追加
-    merged.append(current)
+    return files
+
+
+def _batch_output_path(input_path, root, output_dir=None):
+    """
+    バッチ変換時の出力先を決定
     
-    return merged
+    output_dirが指定されていれば入力ツリーをミラーし、
+    指定がなければ入力ファイルの隣に .md を出力する
+    """
+    if output_dir is None:
+        return input_path.with_suffix('.md')
+    return Path(output_dir) / input_path.relative_to(root).with_suffix('.md')
 
 
-def get_speaker_icon(speaker_name, speaker_index):
+def _output_priority(input_path):
+    """同じ出力名になる入力のうち、どれが元の名前を使うかの順序（DOCX → VTT → SRT）"""
+    suffix = input_path.suffix.lower()
+    rank = INPUT_SUFFIXES.index(suffix) if suffix in INPUT_SUFFIXES else len(INPUT_SUFFIXES)
+    return rank, str(input_path)
+
+
+def _batch_output_paths(files, output_dir=None):
     """
-    話者に応じたアイコン絵文字を返す
+    バッチ変換の入力ファイルごとの出力先を、衝突しないように決定
+    
+    同じディレクトリに拡張子だけが違う入力（Teamsが両方を書き出す meet.docx と
+    meet.vtt など）があると出力がどちらも meet.md になるため、DOCX → VTT → SRT の
+    順で最初の1つだけが meet.md を使い、残りは入力ファイル名に .md を付けた名前
+    （meet.vtt.md）にする。大文字・小文字を区別しないファイルシステムがあるため、
+    大文字・小文字だけが違う出力名も衝突として扱う。
     
     Args:
-        speaker_name: 話者名
-        speaker_index: 話者の出現順（0始まり）
+        files: collect_input_filesの戻り値 [(入力ファイル, 基準ディレクトリ), ...]
+        output_dir: 出力ツリーのルート（Noneの場合は入力ファイルの隣に出力）
         
     Returns:
-        str: 絵文字アイコン
+        list: [(入力ファイル, 出力ファイル), ...]（files と同じ順）
     """
-    # 話者ごとに異なるアイコンを割り当て
-    icons = ['👨', '👩', '🧑', '👴', '👵', '👦', '👧', '🧔', '👱', '👨‍💼']
-    return icons[speaker_index % len(icons)]
+    outputs = [(input_path, _batch_output_path(input_path, root, output_dir))
+               for input_path, root in files]
+    groups = {}
+    for input_path, output_path in outputs:
+        groups.setdefault(str(output_path).casefold(), []).append(input_path)
+    primary = {key: min(inputs, key=_output_priority)
+               for key, inputs in groups.items()}
+    return [
+        (input_path,
+         output_path if primary[str(output_path).casefold()] == input_path
+         else output_path.with_name(input_path.name + '.md'))
+        for input_path, output_path in outputs
+    ]
+
+
+# 差分変換マニフェストのファイル名（出力ディレクトリごとに作成）
+MANIFEST_FILENAME = '.transcript2chatview-manifest.json'
+
+# 出力形式のバージョン（出力内容が変わる修正をしたら上げ、既存のキャッシュを無効化する）
+OUTPUT_FORMAT_VERSION = 2
 
+# 出力内容に影響しないため、キャッシュ判定に含めないオプション
+CACHE_NEUTRAL_OPTIONS = {'stream', 'icon_workers'}
 
-def convert_to_chatview_markdown(transcript, show_timestamp=True, show_icon=True):
+# キャッシュによりスキップした場合のメッセージ
+SKIPPED_MESSAGE = 'スキップ（変更なし）'
+
+
+def file_digest(path, chunk_size=1024 * 1024):
     """
-    パースした文字起こしをChatView形式のマークダウンに変換
+    ファイル内容のSHA-256ハッシュを計算
     
     Args:
-        transcript: パースされたデータ
-        show_timestamp: タイムスタンプを表示するか
-        show_icon: アイコンを表示するか
+        path: ファイルのパス
+        chunk_size: 読み込み単位（バイト）
         
     Returns:
-        str: ChatView形式のマークダウン
+        str: 16進数のハッシュ文字列
     """
-    markdown_lines = []
-    
-    # 話者ごとにuserとassistantを交互に割り当て
-    speaker_roles = {}
-    speaker_icons = {}
-    role_toggle = ['ai', 'me']
-    role_index = 0
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def options_fingerprint(options):
+    """
+    出力に影響する変換オプションを比較可能な形に正規化
     
-    for entry in transcript:
-        speaker = entry['speaker']
-        text = entry['text'].strip()
-        timestamp = entry['start']
-        
-        # entryにアイコンが含まれているかチェック
-        entry_icon = entry.get('icon', '')
+    Args:
+        options: convert_fileに渡す変換オプション
         
-        # 初出の話者にロールとアイコンを割り当て
-        if speaker not in speaker_roles:
-            speaker_roles[speaker] = role_toggle[role_index % 2]
-            # entryにアイコンがあればそれを使用、なければデフォルト絵文字
-            if entry_icon:
-                # ファイルパスかBase64かを判定
-                if entry_icon.startswith('data:image'):
-                    # Base64画像の場合はHTMLのimg形式で埋め込む
-                    img_tag = f'<img src="{entry_icon}" '
-                    img_tag += 'width="20" height="20" />'
-                    speaker_icons[speaker] = img_tag
-                else:
-                    # ファイルパスの場合もimg形式
-                    img_tag = f'<img src="{entry_icon}" '
-                    img_tag += 'width="20" height="20" />'
-                    speaker_icons[speaker] = img_tag
-            else:
-                speaker_icons[speaker] = get_speaker_icon(
-                    speaker, role_index)
-            role_index += 1
+    Returns:
+        dict: キャッシュ判定用のオプション
+    """
+    return {
+        key: value for key, value in sorted(options.items())
+        if key not in CACHE_NEUTRAL_OPTIONS
+    }
+
+
+class ConversionManifest:
+    """
+    出力ディレクトリごとの差分変換マニフェスト
+    
+    出力ファイル名をキーに、入力DOCXのハッシュと変換オプションを記録する。
+    ハッシュとオプションが一致し出力ファイルが存在する場合は再変換を省略できる。
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory: マニフェストを置く出力ディレクトリ
+        """
+        self.directory = Path(directory)
+        self.path = self.directory / MANIFEST_FILENAME
+        self.entries = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+                self.entries = data.get('files', {})
+            except (ValueError, OSError):
+                # 壊れたマニフェストは無視して作り直す
+                self.entries = {}
+
+    def is_current(self, output_path, input_path, digest, options):
+        """出力が同じ入力ファイルから、同じ入力ハッシュ・オプションで作られていればTrue"""
+        entry = self.entries.get(Path(output_path).name)
+        return (
+            entry is not None
+            and self.source(output_path) == Path(input_path).resolve()
+            and entry.get('format') == OUTPUT_FORMAT_VERSION
+            and entry.get('sha256') == digest
+            and entry.get('options') == options_fingerprint(options)
+            and Path(output_path).exists()
+        )
+
+    def source(self, output_path):
+        """出力ファイルを作った入力ファイルの絶対パス（記録がなければNone）"""
+        entry = self.entries.get(Path(output_path).name)
+        if entry is None or not entry.get('source'):
+            return None
+        return Path(entry['source']).resolve()
+
+    def record(self, output_path, input_path, digest, options):
+        """変換結果をマニフェストに記録"""
+        self.entries[Path(output_path).name] = {
+            'source': str(Path(input_path).resolve()),
+            'sha256': digest,
+            'options': options_fingerprint(options),
+            'format': OUTPUT_FORMAT_VERSION,
+        }
+        self._dirty = True
+
+    def save(self):
+        """変更があればマニフェストを書き出す（一時ファイル経由で置き換え）"""
+        if not self._dirty:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(
+            json.dumps({'version': 1, 'files': self.entries},
+                       ensure_ascii=False, indent=2),
+            encoding='utf-8')
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def _convert_batch_item(input_path, output_path, options):
+    """プロセスプール用: 1ファイルを変換して (成功したか, メッセージ) を返す"""
+    try:
+        count = convert_file(input_path, output_path, verbose=False, **options)
+        return True, f'{count}件'
+    except Exception as e:  # 1ファイルの失敗でバッチ全体を止めない
+        return False, f'{type(e).__name__}: {e}'
+
+
+def convert_batch(files, output_dir=None, jobs=None, options=None,
+                  force=False):
+    """
+    複数ファイルをプロセスプールで並列変換
+    
+    出力ディレクトリごとのマニフェストと入力ハッシュ・オプションが一致する
+    ファイルは変換を省略する。
+    拡張子だけが違う入力（meet.docx と meet.vtt）は _batch_output_paths で
+    別の出力名にするため、同じ出力ファイルを2つのワーカーが書くことはない。
+    
+    Args:
+        files: collect_input_filesの戻り値 [(入力ファイル, 基準ディレクトリ), ...]
+        output_dir: 出力ツリーのルート（Noneの場合は入力ファイルの隣に出力）
+        jobs: ワーカープロセス数（Noneの場合はCPU数）
+        options: convert_fileに渡す変換オプション
+        force: Trueの場合はマニフェストを無視してすべて再変換
         
-        role = speaker_roles[speaker]
-        icon = speaker_icons[speaker]
+    Returns:
+        list: [(入力ファイル, 出力ファイル, 成功したか, メッセージ), ...]
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    options = dict(options or {})
+    results = []
+    manifests = {}  # 出力ディレクトリ -> ConversionManifest
+    
+    # 出力ツリー全体で1つのアイコンストアを共有
+    if output_dir is not None and not options.get('icons_dir'):
+        options['icons_dir'] = str(Path(output_dir) / 'icons')
+    
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for input_path, output_path in _batch_output_paths(files, output_dir):
+            manifest_dir = output_path.parent
+            if manifest_dir not in manifests:
+                manifests[manifest_dir] = ConversionManifest(manifest_dir)
+            manifest = manifests[manifest_dir]
+            
+            try:
+                digest = file_digest(input_path)
+            except OSError as e:
+                results.append((input_path, output_path, False,
+                                f'{type(e).__name__}: {e}'))
+                continue
+            
+            # 変更がなければスキップ
+            if not force and manifest.is_current(output_path, input_path, digest, options):
+                results.append((input_path, output_path, True, SKIPPED_MESSAGE))
+                continue
+            
+            future = executor.submit(
+                _convert_batch_item, input_path, output_path, options)
+            futures[future] = (input_path, output_path, manifest, digest)
         
-        # ChatView形式で出力
-        if show_icon and icon:
-            header = f'@{role}[{icon} {speaker}]'
+        for future in as_completed(futures):
+            input_path, output_path, manifest, digest = futures[future]
+            try:
+                ok, message = future.result()
+            except Exception as e:  # ワーカーの異常終了など
+                ok, message = False, f'{type(e).__name__}: {e}'
+            status = '✓' if ok else '✗'
+            print(f'  {status} {input_path}: {message}')
+            results.append((input_path, output_path, ok, message))
+            if ok:
+                manifest.record(output_path, input_path, digest, options)
+    
+    for manifest in manifests.values():
+        manifest.save()
+    
+    return results
+
+
+def print_batch_summary(results):
+    """
+    バッチ変換の結果サマリーを表示
+    
+    Args:
+        results: convert_batchの戻り値
+    """
+    skipped = [r for r in results if r[2] and r[3] == SKIPPED_MESSAGE]
+    succeeded = [r for r in results if r[2] and r[3] != SKIPPED_MESSAGE]
+    failed = [r for r in results if not r[2]]
+    
+    print('\n--- バッチ変換結果 ---')
+    for input_path, output_path, ok, message in sorted(
+            results, key=lambda r: str(r[0])):
+        if ok:
+            print(f'  ✓ {input_path} → {output_path} ({message})')
         else:
-            header = f'@{role}[{speaker}]'
-        
-        if show_timestamp:
-            header += f'{{{timestamp}}}'
-        
-        markdown_lines.append(header)
-        
-        markdown_lines.append(text)
-        markdown_lines.append('')
+            print(f'  ✗ {input_path}: {message}')
+    print(f'\n成功: {len(succeeded)}件 / スキップ: {len(skipped)}件 / '
+          f'失敗: {len(failed)}件 / 合計: {len(results)}件')
+
+
+def write_profile_report(profile, input_path, output_path=None,
+                         report_path=None, profiler=None):
+    """
+    --profile のレポートを書き出す
     
-    return '\n'.join(markdown_lines)
+    Args:
+        profile: 変換に使ったConversionProfile
+        input_path: 入力ファイル
+        output_path: 出力マークダウンファイル（標準出力の場合はNone）
+        report_path: JSONレポートの保存先（Noneの場合は標準エラー出力）
+        profiler: --profile-cprofile の場合の cProfile.Profile
+    """
+    report = {
+        'input': str(input_path),
+        'output': str(output_path) if output_path else None,
+    }
+    report.update(profile.report())
+    
+    if profiler is not None:
+        stats_path = (Path(report_path).with_suffix('.pstats') if report_path
+                      else Path('transcript2chatview.pstats'))
+        profiler.dump_stats(stats_path)
+        report['pstats'] = str(stats_path)
+    
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if report_path:
+        Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(report_path).write_text(text + '\n', encoding='utf-8')
+    else:
+        print(text, file=sys.stderr)
 
 
 def main():
+    # search サブコマンド（変換の引数とは別に解析する）
+    if len(sys.argv) > 1 and sys.argv[1] == 'search':
+        try:
+            import chatview_search
+        except ImportError:
+            print('エラー: search には transcript2chatview.py と同じディレクトリの chatview_search.py が必要です')
+            return 1
+        return chatview_search.main(sys.argv[2:], prog='transcript2chatview.py search')
+    # serve サブコマンド（常駐して変換リクエストを受け付ける）
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        try:
+            import chatview_serve
+        except ImportError:
+            print('エラー: serve には transcript2chatview.py と同じディレクトリの chatview_serve.py が必要です')
+            return 1
+        return chatview_serve.main(sys.argv[2:], prog='transcript2chatview.py serve')
+    
     parser = argparse.ArgumentParser(
-        description='Microsoft Teams DOCX文字起こしをChatView形式に変換'
+        description='Microsoft Teams DOCX文字起こし（WebVTT / SRT字幕）をChatView形式に変換'
     )
     parser.add_argument(
         'input',
-        type=Path,
-        help='入力DOCXファイル'
+        nargs='*',
+        help='入力ファイル（.docx / .vtt / .srt、複数ファイル・ディレクトリ・globパターン指定でバッチ変換）'
     )
     parser.add_argument(
         '-o', '--output',
         type=Path,
         help='出力マークダウンファイル（省略時は標準出力）'
     )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        help='バッチ変換の出力先ディレクトリ（入力ツリーをミラー、省略時は入力ファイルの隣に出力）'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help='バッチ変換の並列ワーカー数（省略時はCPU数）'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='バッチ変換で変更のないファイルも再変換（マニフェストを無視）'
+    )
+    parser.add_argument(
+        '--watch',
+        type=Path,
+        metavar='DIR',
+        help='ディレクトリを監視し、追加・変更された文字起こしを変換し続ける（Ctrl+Cで終了、出力先は --output-dir）'
+    )
+    parser.add_argument(
+        '--watch-poll',
+        action='store_true',
+        help='--watch で inotify を使わずポーリングする（変更イベントの届かないネットワーク共有向け）'
+    )
+    parser.add_argument(
+        '--watch-settle',
+        type=float,
+        metavar='SECONDS',
+        help='--watch で、サイズと更新時刻がこの秒数変わらなくなってから変換（デフォルト: 2）'
+    )
     parser.add_argument(
         '--merge-speaker',
         action='store_true',
         help='同一話者の連続発言を結合'
     )
+    parser.add_argument(
+        '--merge-max-gap',
+        type=float,
+        metavar='SECONDS',
+        help='--merge-speaker時、発言の間隔がこの秒数を超えたら結合しない'
+    )
+    parser.add_argument(
+        '--merge-max-chars',
+        type=int,
+        metavar='N',
+        help='--merge-speaker時、結合後の1発言の最大文字数'
+    )
     parser.add_argument(
         '--no-timestamp',
         action='store_true',
@@ -453,54 +2719,265 @@ def main():
         action='store_true',
         help='アイコンをBase64でマークダウンに埋め込む（デフォルトは別ファイル保存）'
     )
+    parser.add_argument(
+        '--icon-refs',
+        action='store_true',
+        help='--embed-icons時、アイコンを話者ごとに1回だけ定義し各ヘッダーから参照（出力サイズを削減）'
+    )
+    parser.add_argument(
+        '--icons-dir',
+        type=Path,
+        help='アイコンの保存先（省略時は出力先の icons/、バッチ変換では --output-dir/icons を共有）'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='python-docxを使わずストリーミングで読み込む（巨大なDOCX向け、メモリ使用量一定）'
+    )
+    parser.add_argument(
+        '--page-messages',
+        type=int,
+        metavar='N',
+        help='出力をN件のメッセージごとのページ（output.part001.md …）に分割し、-o のファイルを目次にする'
+    )
+    parser.add_argument(
+        '--page-bytes',
+        type=int,
+        metavar='BYTES',
+        help='1ページがこのバイト数を超えないようにページ分割（--page-messages などと併用可）'
+    )
+    parser.add_argument(
+        '--page-minutes',
+        type=float,
+        metavar='MINUTES',
+        help='会議の先頭からこの分数ごとの区間でページ分割（例: 30）'
+    )
+    parser.add_argument(
+        '--message-index',
+        action='store_true',
+        help='出力マークダウンの隣に、各メッセージのバイト位置・話者・時刻を記録した索引（.idx）を作成'
+    )
+    parser.add_argument(
+        '--index',
+        type=Path,
+        metavar='DB',
+        help='変換した発言をSQLite FTS5の全文検索索引に登録（search サブコマンドで検索）'
+    )
+    parser.add_argument(
+        '--svg',
+        type=Path,
+        metavar='FILE',
+        help='VS Code拡張機能のSVGエクスポートと同じレイアウトのSVGも出力（1ファイルの変換のみ）'
+    )
+    parser.add_argument(
+        '--svg-font',
+        type=Path,
+        metavar='FILE',
+        help='--svg の折り返しの幅を測るフォント（Pillowが必要、省略時はヒラギノ・メイリオ・Noto Sans CJKを探し、なければ推定値）'
+    )
+    parser.add_argument(
+        '--icon-size',
+        type=int,
+        metavar='N',
+        help='アイコンを一辺Nピクセルに縮小（Pillowが必要、例: 40）'
+    )
+    parser.add_argument(
+        '--icon-format',
+        choices=sorted(IconNormalizer.FORMATS),
+        help='アイコンを再圧縮する形式（--icon-size 指定時のデフォルト: png）'
+    )
+    parser.add_argument(
+        '--icon-workers',
+        type=int,
+        default=4,
+        metavar='N',
+        help='アイコン画像を書き込むスレッド数（デフォルト: 4、0でパース中にその場で書き込む）'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='段階ごとの処理時間・件数をJSONで出力'
+    )
+    parser.add_argument(
+        '--profile-cprofile',
+        action='store_true',
+        help='--profile のレポートに加えて cProfile で変換全体を計測し、pstatsを保存'
+    )
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help='--profile のレポートに tracemalloc による段階ごとのメモリ使用量と上位の割り当て箇所を追加（処理は遅くなる）'
+    )
+    parser.add_argument(
+        '--profile-output',
+        type=Path,
+        metavar='FILE',
+        help='--profile のJSONレポートの保存先（省略時は標準エラー出力、pstatsは同名の .pstats）'
+    )
     
     args = parser.parse_args()
     
+    if args.watch and args.input:
+        parser.error('--watch と入力ファイルは同時に指定できません')
+    if not args.watch and not args.input:
+        parser.error('入力ファイルを指定してください')
+    if args.icon_workers < 0:
+        parser.error('--icon-workers には0以上の値を指定してください')
+    if args.merge_max_gap is not None and args.merge_max_gap < 0:
+        parser.error('--merge-max-gap には0以上の値を指定してください')
+    if args.merge_max_chars is not None and args.merge_max_chars <= 0:
+        parser.error('--merge-max-chars には正の値を指定してください')
+    
+    options = {
+        'merge_speaker': args.merge_speaker,
+        'merge_max_gap': args.merge_max_gap,
+        'merge_max_chars': args.merge_max_chars,
+        'show_timestamp': not args.no_timestamp,
+        'show_icon': not args.no_icon,
+        'embed_icons': args.embed_icons,
+        'icon_refs': args.icon_refs,
+        'stream': args.stream,
+        'icons_dir': str(args.icons_dir) if args.icons_dir else None,
+        'icon_workers': args.icon_workers,
+        'icon_size': args.icon_size,
+        'icon_format': args.icon_format,
+        'page_messages': args.page_messages,
+        'page_bytes': args.page_bytes,
+        'page_minutes': args.page_minutes,
+        'message_index': args.message_index,
+        'search_index': str(args.index) if args.index else None,
+    }
+    
+    if (args.icon_size or args.icon_format) and not has_pillow():
+        print('エラー: --icon-size / --icon-format には Pillow が必要です（pip install Pillow）')
+        return 1
+    
+    if args.svg:
+        try:
+            import chatview_svg  # 変換時に読み込むため、ここでは有無だけ確認
+        except ImportError:
+            print('エラー: --svg には transcript2chatview.py と同じディレクトリの chatview_svg.py が必要です')
+            return 1
+    for name in ('page_messages', 'page_bytes', 'page_minutes'):
+        value = getattr(args, name)
+        if value is not None and value <= 0:
+            print(f'エラー: --{name.replace("_", "-")} には正の値を指定してください')
+            return 1
+    
+    if args.index:
+        try:
+            import chatview_search  # 変換時に読み込むため、ここでは有無だけ確認
+        except ImportError:
+            print('エラー: --index には transcript2chatview.py と同じディレクトリの chatview_search.py が必要です')
+            return 1
+    
+    if args.message_index and MessageIndexWriter is None:
+        print('エラー: --message-index には transcript2chatview.py と同じディレクトリの chatview_index.py が必要です')
+        return 1
+    
+    if args.svg_font and not has_pillow():
+        print('エラー: --svg-font には Pillow が必要です（pip install Pillow）')
+        return 1
+    
+    if args.watch:
+        if not args.watch.is_dir():
+            print(f'エラー: ディレクトリが見つかりません: {args.watch}')
+            return 1
+        if args.output:
+            print('エラー: --watch では -o ではなく --output-dir を指定してください')
+            return 1
+        if args.profile or args.profile_memory or args.profile_cprofile:
+            print('エラー: --profile は1ファイルの変換でのみ使用できます')
+            return 1
+        if args.svg:
+            print('エラー: --svg は1ファイルの変換でのみ使用できます')
+            return 1
+        if args.watch_settle is not None and args.watch_settle < 0:
+            print('エラー: --watch-settle には0以上の値を指定してください')
+            return 1
+        try:
+            import chatview_watch
+        except ImportError:
+            print('エラー: --watch には transcript2chatview.py と同じディレクトリの chatview_watch.py が必要です')
+            return 1
+        settle = args.watch_settle
+        if settle is None:
+            settle = chatview_watch.WATCH_SETTLE_SECONDS
+        # サービスとして動かす場合の停止（SIGTERM）もCtrl+Cと同じく実行中の変換を待って終了
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+        results = chatview_watch.watch_directory(
+            args.watch, output_dir=args.output_dir, jobs=args.jobs, options=options,
+            settle=settle, poll=args.watch_poll, stop_event=stop_event)
+        if results:
+            print_batch_summary(results)
+        return 0 if all(r[2] for r in results) else 1
+    
+    # 複数入力・ディレクトリ・globの場合はバッチ変換
+    is_batch = len(args.input) > 1 or any(
+        Path(item).is_dir() or glob.has_magic(item) for item in args.input)
+    
+    if is_batch:
+        if args.output:
+            print('エラー: バッチ変換では -o ではなく --output-dir を指定してください')
+            return 1
+        if args.profile or args.profile_memory or args.profile_cprofile:
+            print('エラー: --profile は1ファイルの変換でのみ使用できます')
+            return 1
+        if args.svg:
+            print('エラー: --svg は1ファイルの変換でのみ使用できます')
+            return 1
+        
+        files = collect_input_files(args.input)
+        if not files:
+            print('エラー: 変換対象のファイルが見つかりません')
+            return 1
+        
+        print(f'{len(files)}件のファイルを変換しています...')
+        results = convert_batch(
+            files, output_dir=args.output_dir, jobs=args.jobs, options=options,
+            force=args.force)
+        print_batch_summary(results)
+        return 0 if all(r[2] for r in results) else 1
+    
+    input_path = Path(args.input[0])
+    
     # ファイル存在チェック
-    if not args.input.exists():
-        print(f'エラー: ファイルが見つかりません: {args.input}')
+    if not input_path.exists():
+        print(f'エラー: ファイルが見つかりません: {input_path}')
         return 1
     
-    # 出力ディレクトリを決定
-    if args.output:
-        output_dir = args.output.parent
-    else:
-        output_dir = args.input.parent
-    
-    # DOCXファイルをパース
-    print(f'文字起こしファイルを読み込んでいます: {args.input}')
-    transcript = parse_teams_docx_simple(
-        args.input,
-        output_dir=output_dir,
-        use_icon_files=not args.embed_icons  # デフォルトはファイル保存
-    )
-    print(f'  → {len(transcript)}件のエントリを検出')
-    
-    # オプション: 連続話者を結合
-    if args.merge_speaker:
-        print('同一話者の連続発言を結合しています...')
-        transcript = merge_consecutive_speakers(transcript)
-        print(f'  → {len(transcript)}件に結合')
-    
-    # ChatView形式に変換
-    print('ChatView形式のマークダウンに変換しています...')
-    markdown = convert_to_chatview_markdown(
-        transcript,
-        show_timestamp=not args.no_timestamp,
-        show_icon=not args.no_icon
-    )
-    
-    # 出力
-    if args.output:
-        args.output.write_text(markdown, encoding='utf-8')
-        print(f'変換完了: {args.output}')
-    else:
-        print('\n--- 変換結果 ---\n')
-        print(markdown)
+    if (args.page_messages or args.page_bytes or args.page_minutes) and not args.output:
+        print('エラー: ページ分割では -o で目次のマークダウンファイルを指定してください')
+        return 1
+    if args.message_index and not args.output:
+        print('エラー: --message-index では -o で出力ファイルを指定してください')
+        return 1
+    
+    if not (args.profile or args.profile_memory or args.profile_cprofile):
+        convert_file(input_path, args.output, svg_path=args.svg,
+                     svg_font=args.svg_font, **options)
+        return 0
+    
+    profile = ConversionProfile(trace_memory=args.profile_memory)
+    profiler = None
+    if args.profile_cprofile:
+        import cProfile  # --profile-cprofile でのみ使用
+        profiler = cProfile.Profile()
+    if profiler:
+        profiler.enable()
+    try:
+        convert_file(input_path, args.output, svg_path=args.svg,
+                     svg_font=args.svg_font, profile=profile, **options)
+    finally:
+        if profiler:
+            profiler.disable()
+        profile.stop()
+        write_profile_report(profile, input_path, args.output,
+                             args.profile_output, profiler)
     
     return 0
 
 
 if __name__ == '__main__':
     exit(main())
-